@@ -1,20 +1,45 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query, Header
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Dict, List, Any, Optional, Union
-import uuid
+from typing import Dict, List, Any, AsyncIterator, Optional, Tuple, Union
 import json
 import os
+import copy
+import asyncio
+import tempfile
 from datetime import datetime
 
 # Use try-except for imports to handle different import paths
 try:
     from src.backend.LLMcontrols.components import registry
-    from src.backend.LLMcontrols.graph import Graph
-    from src.backend.LLMcontrols.llm import OpenAILLM
+    from src.backend.LLMcontrols.graph import (
+        ExecutionPlan, FlowCompileError, VersionedCache, ComponentCache, FlowArtifactCaches,
+        apply_flow_operations, compile_flow
+    )
+    from src.backend.LLMcontrols.graph.executor import FlowExecutor
+    from src.backend.LLMcontrols.llm import (
+        client_pool, response_cache, request_coalescer, llm_scheduler, semantic_cache, llm_resilience, CallPolicy,
+        LLMBatcher
+    )
+    from src.backend.LLMcontrols.storage import create_flow_store, create_job_store, RunArtifactStore
+    from src.backend.LLMcontrols.jobs import JobQueue
+    from src.backend.LLMcontrols.storage.jobs import FINISHED_STATES
+    from src.backend.LLMcontrols.metrics import FLOW_ERRORS
 except ImportError:
     from backend.LLMcontrols.components import registry
-    from backend.LLMcontrols.graph import Graph
-    from backend.LLMcontrols.llm import OpenAILLM
+    from backend.LLMcontrols.graph import (
+        ExecutionPlan, FlowCompileError, VersionedCache, ComponentCache, FlowArtifactCaches,
+        apply_flow_operations, compile_flow
+    )
+    from backend.LLMcontrols.graph.executor import FlowExecutor
+    from backend.LLMcontrols.llm import (
+        client_pool, response_cache, request_coalescer, llm_scheduler, semantic_cache, llm_resilience, CallPolicy,
+        LLMBatcher
+    )
+    from backend.LLMcontrols.storage import create_flow_store, create_job_store, RunArtifactStore
+    from backend.LLMcontrols.jobs import JobQueue
+    from backend.LLMcontrols.storage.jobs import FINISHED_STATES
+    from backend.LLMcontrols.metrics import FLOW_ERRORS
 
 # Create the router
 router = APIRouter()
@@ -44,17 +69,46 @@ class Flow(BaseModel):
     edges: List[Edge]
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+    execution_order: Optional[List[str]] = None
+    version: Optional[int] = None
+
+class FlowOperation(BaseModel):
+    """A single incremental edit to a flow.
+    
+    op is one of add_node, remove_node, update_node, move_node, add_edge or
+    remove_edge; see graph.apply_flow_operations for the fields each uses.
+    """
+    op: str
+    id: Optional[str] = None
+    node: Optional[Dict[str, Any]] = None
+    edge: Optional[Dict[str, Any]] = None
+    data: Optional[Dict[str, Any]] = None
+    position: Optional[Dict[str, int]] = None
+
+class FlowPatch(BaseModel):
+    """Request model for incrementally editing a flow."""
+    operations: List[FlowOperation]
 
 class ChatMessage(BaseModel):
     """Chat message model."""
     role: str = "user"
     content: str
-    
+
 class FlowRunRequest(BaseModel):
     """Request model for running a flow."""
     flow_id: str
     inputs: Dict[str, Any] = Field(default_factory=dict)
-    
+    stream: bool = False
+    # Reuse the artifacts of nodes unchanged since an earlier run of the flow
+    incremental: bool = False
+
+class FlowBatchRunRequest(BaseModel):
+    """Request model for running a flow over many inputs."""
+    flow_id: str
+    inputs: List[Dict[str, Any]]
+    max_concurrency: int = Field(default=8, ge=1, le=256)
+    batch_size: int = Field(default=8, ge=1, le=256)
+
 class LLMRequest(BaseModel):
     """Request model for direct LLM calls."""
     model: str = "gpt-4o-mini"
@@ -63,6 +117,13 @@ class LLMRequest(BaseModel):
     system_message: Optional[str] = None
     stream: bool = False
     api_key: Optional[str] = None
+    cache: Optional[bool] = None
+    # Answer from a response to a similar earlier prompt, if one is cached
+    semantic_cache: bool = False
+    semantic_threshold: Optional[float] = Field(default=None, gt=0, le=1)
+    # Override the server's deadline (0 for none) and hedging percentile (0 for none)
+    timeout: Optional[float] = Field(default=None, ge=0)
+    hedge_percentile: Optional[float] = Field(default=None, ge=0, lt=100)
 
 class LLMResponse(BaseModel):
     """Response model for LLM calls."""
@@ -72,179 +133,511 @@ class LLMResponse(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
 
-# Sample data storage (replace with database in production)
-flows = {}
+# Number of server processes sharing the stores (set by run_server.py)
+SERVER_WORKERS = int(os.getenv("LLMCONTROLS_WORKERS", "1"))
+
+# Flow storage (SQLite by default, see storage.create_flow_store)
+flows = create_flow_store()
+# Compiled plans of recently run flows, revalidated against the stored version
+plan_cache = VersionedCache(max_flows=int(os.getenv("PLAN_CACHE_SIZE", "256")))
+# Components built for those plans (LLM clients, compiled templates, ...)
+component_cache = ComponentCache(max_flows=int(os.getenv("PLAN_CACHE_SIZE", "256")))
+# Memoized node artifacts of recent incremental runs, one bounded cache per flow
+artifact_caches = FlowArtifactCaches(
+    max_flows=int(os.getenv("ARTIFACT_CACHE_FLOWS", "128")),
+    max_entries_per_flow=int(os.getenv("ARTIFACT_CACHE_SIZE", "1024"))
+)
+
+def _compile_plan(flow_dict: Dict[str, Any]) -> None:
+    """Compile a flow about to be saved and attach its execution plan and order.
+    
+    Raises:
+        HTTPException: 400 listing the compile errors.
+    """
+    try:
+        plan = compile_flow(flow_dict, registry)
+    except FlowCompileError as e:
+        raise HTTPException(status_code=400, detail={"message": "Flow does not compile", "errors": e.errors})
+    flow_dict["plan"] = plan.to_dict()
+    flow_dict["execution_order"] = plan.execution_order
+
+def _load_plan(flow_id: str) -> Tuple[int, ExecutionPlan]:
+    """Get the graph version and execution plan of a stored flow, reusing this worker's cached copy.
+    
+    Plans and components are keyed by the graph version, which moving
+    nodes leaves unchanged.
+    """
+    version = flows.get_graph_version(flow_id)
+    
+    def load() -> Optional[Tuple[int, ExecutionPlan]]:
+        stored = flows.get_plan(flow_id)
+        if stored is None:
+            return None
+        stored_version, plan, nodes = stored
+        if plan is not None:
+            try:
+                return stored_version, ExecutionPlan.from_dict(plan, nodes)
+            except ValueError:
+                pass
+        # Saved before plans existed, or in an older plan format
+        flow = flows.get(flow_id)
+        if flow is None:
+            return None
+        try:
+            return stored_version, compile_flow(flow, registry)
+        except FlowCompileError as e:
+            raise HTTPException(status_code=400, detail={"message": "Flow does not compile", "errors": e.errors})
+    
+    plan = plan_cache.get(flow_id, version, load) if version is not None else None
+    if plan is None:
+        raise HTTPException(status_code=404, detail="Flow not found")
+    return version, plan
+
+async def _run_job(job_id: str, request: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute a queued run; its artifacts are stored under the job ID."""
+    run_request = FlowRunRequest(**{**request, "stream": False})
+    return await _run_flow_measured(run_request, run_id=job_id)
+
+# Queued runs, executed in the background by a bounded pool of workers
+job_queue = JobQueue(
+    create_job_store(),
+    _run_job,
+    workers=int(os.getenv("JOB_WORKERS", "4"))
+)
+
+@router.on_event("startup")
+async def start_job_queue():
+    job_queue.start()
+
+# Node artifacts of recent runs, fetched on demand by run_id. With several
+# workers they are written through to a shared directory so any worker can
+# serve them.
+run_artifacts = RunArtifactStore(
+    max_memory_bytes=int(os.getenv("RUN_ARTIFACTS_MAX_MEMORY", str(64 * 1024 * 1024))),
+    spill_dir=os.getenv("RUN_ARTIFACTS_DIR") or (
+        os.path.join(tempfile.gettempdir(), "llmcontrols-artifacts") if SERVER_WORKERS > 1 else None
+    ),
+    write_through=SERVER_WORKERS > 1
+)
+
+@router.on_event("shutdown")
+async def stop_job_queue():
+    await job_queue.stop()
+    # Removes this worker's own temporary spill directory; shared ones are kept
+    run_artifacts.close()
+
+def _sse_event(payload: Dict[str, Any]) -> str:
+    """Format a payload as a server-sent event."""
+    return f"data: {json.dumps(payload, default=str)}\n\n"
+
+async def _sse_stream(events: AsyncIterator[Dict[str, Any]], extra: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+    """Serialize LLM stream events as server-sent events.
+    
+    extra is merged into the final end/error event.
+    """
+    async for event in events:
+        if extra and event["type"] in ("end", "error"):
+            event = {**event, **extra}
+        yield _sse_event(event)
+
+def _streaming_response(events: AsyncIterator[str]) -> StreamingResponse:
+    """Wrap server-sent events in a response that proxies will not buffer."""
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # Load default components
 registry.load_default_components()
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison, as required for If-None-Match
+    return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
 @router.get("/components")
-async def get_components():
-    """Get all available component types."""
-    return registry.get_all_components()
+async def get_components(if_none_match: Optional[str] = Header(None)):
+    """Get all available component types.
+    
+    The catalog is served pre-serialized with an ETag; clients polling with
+    If-None-Match get an empty 304 while it is unchanged.
+    """
+    payload, etag = registry.get_serialized()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+def _flow_etag(version: int) -> str:
+    # Versions are unique per store, so they identify the flow's content
+    return f'"flow-v{version}"'
 
 @router.get("/flows")
-async def get_flows():
-    """Get all flows."""
-    return list(flows.values())
+async def get_flows(
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    summary: bool = False,
+    since: Optional[int] = Query(None, ge=0)
+):
+    """Get flows, most recently updated first.
+    
+    Use offset/limit to paginate and summary=true to get only flow metadata
+    and node/edge counts instead of full flows.
+    
+    With since, only what changed after that store version is returned instead:
+    {"flows": [...], "deleted": [{"id", "deleted_at", "version"}], "cursor": ...}.
+    Start with since=0 and pass cursor back as since on the next call. A
+    response with "reset": true lists every flow, replacing the client's copy.
+    """
+    if since is None:
+        return flows.list(offset=offset, limit=limit, summary=summary)
+    # Versions are assigned under the store's write lock, so unlike timestamps
+    # a cursor never skips a save that was still committing
+    return flows.changes_since(since, summary=summary)
 
 @router.get("/flows/{flow_id}")
-async def get_flow(flow_id: str):
-    """Get a specific flow by ID."""
-    if flow_id not in flows:
+async def get_flow(flow_id: str, response: Response, if_none_match: Optional[str] = Header(None)):
+    """Get a specific flow by ID.
+    
+    The response carries an ETag of the flow's version; a matching
+    If-None-Match gets an empty 304 without loading the flow.
+    """
+    version = flows.get_version(flow_id)
+    if version is None:
         raise HTTPException(status_code=404, detail="Flow not found")
-    return flows[flow_id]
+    if _etag_matches(if_none_match, _flow_etag(version)):
+        return Response(status_code=304, headers={"ETag": _flow_etag(version)})
+    
+    flow = flows.get(flow_id)
+    if flow is None:
+        raise HTTPException(status_code=404, detail="Flow not found")
+    response.headers["ETag"] = _flow_etag(flow["version"])
+    response.headers["Cache-Control"] = "no-cache"
+    return flow
 
 @router.post("/flows", response_model=Flow)
 async def create_flow(flow: Flow):
-    """Create a new flow."""
+    """Create a new flow.
+    
+    The flow is compiled into its execution plan as it is saved; a flow that
+    does not compile is rejected with the list of errors.
+    """
     flow_dict = flow.dict()
     
-    # Add timestamps
-    now = datetime.now()
-    flow_dict["created_at"] = now
-    flow_dict["updated_at"] = now
+    # updated_at is stamped by the store as it saves
+    flow_dict["created_at"] = datetime.now()
+    _compile_plan(flow_dict)
     
-    flows[flow.id] = flow_dict
+    flows.save(flow_dict)
     return flow_dict
 
 @router.put("/flows/{flow_id}", response_model=Flow)
 async def update_flow(flow_id: str, flow: Flow):
-    """Update an existing flow."""
+    """Update an existing flow, recompiling its execution plan."""
     if flow_id != flow.id:
         raise HTTPException(status_code=400, detail="Flow ID in path must match flow ID in body")
     
     # Preserve created_at if flow exists
     flow_dict = flow.dict()
-    if flow_id in flows:
-        flow_dict["created_at"] = flows[flow_id].get("created_at", datetime.now())
+    existing = flows.get(flow_id)
+    if existing is not None:
+        flow_dict["created_at"] = existing.get("created_at") or datetime.now()
     else:
         flow_dict["created_at"] = datetime.now()
-        
-    flow_dict["updated_at"] = datetime.now()
     
-    flows[flow.id] = flow_dict
+    _compile_plan(flow_dict)
+    
+    flows.save(flow_dict)
+    return flow_dict
+
+@router.patch("/flows/{flow_id}", response_model=Flow)
+async def patch_flow(flow_id: str, patch: FlowPatch):
+    """Apply incremental edits to an existing flow.
+    
+    Only the touched nodes and edges are changed, and the cached execution
+    order is repaired only when an edit requires it. Patches that only move
+    nodes are saved without recompiling, keeping the flow's plan and the
+    caches built from it valid.
+    """
+    existing = flows.get(flow_id)
+    if existing is None:
+        raise HTTPException(status_code=404, detail="Flow not found")
+    
+    # Edit a copy so a failing operation leaves the stored flow untouched
+    flow_dict = copy.deepcopy(existing)
+    operations = [operation.dict(exclude_none=True) for operation in patch.operations]
+    try:
+        apply_flow_operations(flow_dict, operations)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if all(operation["op"] == "move_node" for operation in operations):
+        saved = flows.save_layout(flow_dict)
+        if saved is None:
+            raise HTTPException(status_code=404, detail="Flow not found")
+        return saved
+    
+    _compile_plan(flow_dict)
+    
+    flows.save(flow_dict)
     return flow_dict
 
 @router.delete("/flows/{flow_id}")
 async def delete_flow(flow_id: str):
     """Delete an existing flow."""
-    if flow_id not in flows:
+    if not flows.delete(flow_id):
         raise HTTPException(status_code=404, detail="Flow not found")
-    del flows[flow_id]
+    plan_cache.discard(flow_id)
+    component_cache.discard(flow_id)
+    artifact_caches.discard(flow_id)
     return {"detail": "Flow deleted"}
 
 @router.post("/run", response_model=Dict[str, Any])
 async def run_flow(request: FlowRunRequest):
     """Run a flow with input data."""
-    if request.flow_id not in flows:
-        raise HTTPException(status_code=404, detail="Flow not found")
-    
-    flow_data = flows[request.flow_id]
+    return await _run_flow_measured(request)
+
+async def _run_flow_measured(request: FlowRunRequest, run_id: Optional[str] = None):
+    """Run a flow, counting server errors.
     
-    # Parse flow data
+    The executor records the latency and errors of the runs themselves.
+    """
     try:
-        # Create graph from flow data
-        graph = Graph(
-            nodes=flow_data["nodes"],
-            edges=flow_data["edges"]
-        )
-        
-        # Execute flow (simplified for this example)
-        # In a real implementation, we would build and execute a proper LangChain flow
-        input_nodes = [node for node in graph.nodes if node.type == "chatInput"]
-        prompt_nodes = [node for node in graph.nodes if node.type == "prompt"]
-        llm_nodes = [node for node in graph.nodes if node.type == "llm"]
-        output_nodes = [node for node in graph.nodes if node.type == "chatOutput"]
-        
-        # Extract user input
-        user_input = request.inputs.get("input", "")
-        
-        # Process through prompt template if it exists
-        prompt = user_input
-        if prompt_nodes:
-            prompt_node = prompt_nodes[0]
-            template = prompt_node.data.get("template", "{input}")
-            prompt = template.replace("{input}", user_input)
-        
-        # Process through LLM if it exists
-        response_text = "No LLM node found in flow"
-        if llm_nodes:
-            llm_node = llm_nodes[0]
-            model_name = llm_node.data.get("model_name", "gpt-4o-mini")
-            temperature = float(llm_node.data.get("temperature", 0.7))
-            api_key = llm_node.data.get("api_key", os.getenv("OPENAI_API_KEY"))
-            
-            # Validate API key
-            if not api_key:
-                return {
-                    "result": "Error: OpenAI API key is required. Please add your API key to the LLM node.",
-                    "flow_id": request.flow_id,
-                    "inputs": request.inputs,
-                    "error": "Missing API key",
-                    "timestamp": datetime.now().isoformat()
-                }
-            
-            try:
-                # Create LLM
-                llm = OpenAILLM(
-                    model_name=model_name,
-                    temperature=temperature,
-                    api_key=api_key
-                )
-                
-                # Generate response
-                response = await llm.generate(prompt)
-                
-                if "error" in response:
-                    return {
-                        "result": f"Error: {response['error']}",
-                        "flow_id": request.flow_id,
-                        "inputs": request.inputs,
-                        "error": response["error"],
-                        "timestamp": datetime.now().isoformat()
-                    }
-                
-                response_text = response.get("text", "Error generating response")
-            except Exception as e:
-                error_message = str(e)
-                return {
-                    "result": f"Error: {error_message}",
-                    "flow_id": request.flow_id,
-                    "inputs": request.inputs,
-                    "error": error_message,
-                    "timestamp": datetime.now().isoformat()
-                }
-        
-        return {
-            "result": response_text,
+        return await _run_flow(request, run_id)
+    except HTTPException as e:
+        if e.status_code >= 500:
+            FLOW_ERRORS.inc(flow_id=request.flow_id)
+        raise
+
+def _result_text(results: Dict[str, Any]) -> str:
+    """The text shown for a run: what its first output node received."""
+    if not results:
+        return "No output node found in flow"
+    value = next(iter(results.values()))
+    if isinstance(value, dict) and "text" not in value:
+        # Output nodes return their inputs by handle
+        value = value.get("input", next(iter(value.values()), ""))
+    if isinstance(value, dict):
+        return str(value.get("text", ""))
+    return value if isinstance(value, str) else json.dumps(value, default=str)
+
+async def _run_flow(request: FlowRunRequest, run_id: Optional[str] = None):
+    """Run a flow's compiled plan and build the /run response.
+    
+    run_id names the run's stored artifacts; a new one is generated if omitted.
+    """
+    version, plan = _load_plan(request.flow_id)
+    
+    tokens: Optional[asyncio.Queue] = asyncio.Queue() if request.stream else None
+    executor = FlowExecutor(
+        plan,
+        flow_id=request.flow_id,
+        artifact_cache=artifact_caches.for_flow(request.flow_id) if request.incremental else None,
+        artifact_store=run_artifacts,
+        components=component_cache.for_flow(request.flow_id, version),
+        on_token=(lambda node_id, text: tokens.put_nowait({"type": "token", "text": text, "node_id": node_id}))
+        if tokens is not None else None
+    )
+    
+    def response(result: Dict[str, Any]) -> Dict[str, Any]:
+        # Keep intermediate artifacts out of the response; fetch them by run_id
+        body = {
+            "run_id": result["run_id"],
             "flow_id": request.flow_id,
             "inputs": request.inputs,
             "timestamp": datetime.now().isoformat()
         }
+        if "reused_nodes" in result:
+            body["reused_nodes"] = result["reused_nodes"]
+        if "error" in result:
+            return {"result": f"Error: {result['error']}", "error": result["error"], **body}
+        return {"result": _result_text(result["results"]), **body}
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error executing flow: {str(e)}")
+    if tokens is None:
+        return response(await executor.execute_async(request.inputs, run_id=run_id))
+    
+    run = asyncio.ensure_future(executor.execute_async(request.inputs, run_id=run_id))
+    
+    async def events():
+        try:
+            while True:
+                token = asyncio.ensure_future(tokens.get())
+                done, _ = await asyncio.wait({token, run}, return_when=asyncio.FIRST_COMPLETED)
+                if token in done:
+                    yield _sse_event(token.result())
+                    continue
+                token.cancel()
+                break
+            while not tokens.empty():
+                yield _sse_event(tokens.get_nowait())
+            
+            body = response(run.result())
+            if "error" in body:
+                yield _sse_event({"type": "error", **body})
+            else:
+                yield _sse_event({"type": "end", "text": body["result"], **body})
+        finally:
+            # The client went away mid-stream
+            if not run.done():
+                run.cancel()
+    
+    return _streaming_response(events())
+
+@router.post("/run/batch", response_model=Dict[str, Any])
+async def run_flow_batch(request: FlowBatchRunRequest):
+    """Run a flow over a list of inputs.
+    
+    Each item is a run of the flow's plan, as with /run, and at most
+    max_concurrency items are in flight. The calls an LLM node makes for
+    different items are sent together, in batched calls of up to
+    batch_size prompts. Results are returned in input order, each with its
+    run_id and its own error if any.
+    """
+    version, plan = _load_plan(request.flow_id)
+    components = component_cache.for_flow(request.flow_id, version)
+    batcher = LLMBatcher(max_batch_size=min(request.batch_size, request.max_concurrency))
+    semaphore = asyncio.Semaphore(request.max_concurrency)
+    
+    async def run_item(index: int, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            executor = FlowExecutor(
+                plan,
+                flow_id=request.flow_id,
+                artifact_store=run_artifacts,
+                components=components,
+                llm_batcher=batcher
+            )
+            result = await executor.execute_async(inputs)
+        item = {"index": index, "run_id": result["run_id"], "inputs": inputs}
+        if "error" in result:
+            return {**item, "result": f"Error: {result['error']}", "error": result["error"]}
+        return {**item, "result": _result_text(result["results"])}
+    
+    results = await asyncio.gather(*(run_item(i, inputs) for i, inputs in enumerate(request.inputs)))
+    return {
+        "flow_id": request.flow_id,
+        "results": results,
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.post("/runs", status_code=202)
+async def enqueue_run(request: FlowRunRequest):
+    """Queue a flow run and return its job ID immediately.
+    
+    Poll GET /runs/{job_id} or stream GET /runs/{job_id}/events for the
+    outcome. The job ID is also the run_id of the run's artifacts.
+    """
+    if request.flow_id not in flows:
+        raise HTTPException(status_code=404, detail="Flow not found")
+    job = job_queue.enqueue(request.flow_id, request.dict(exclude={"stream"}))
+    return {"job_id": job["id"], "status": job["status"], "flow_id": job["flow_id"]}
+
+@router.get("/runs/{job_id}")
+async def get_run_job(job_id: str):
+    """Get the state of a queued run, including its result once finished."""
+    job = job_queue.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return job
+
+@router.get("/runs/{job_id}/events")
+async def stream_run_job(job_id: str):
+    """Stream the state of a queued run as server-sent events until it finishes."""
+    job = job_queue.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    
+    async def events():
+        current = job
+        yield _sse_event({"type": "status", "job_id": job_id, "status": current["status"]})
+        while current is not None and current["status"] not in FINISHED_STATES:
+            previous_status = current["status"]
+            current = await job_queue.wait(job_id, timeout=15.0)
+            if current is None:
+                break
+            if current["status"] != previous_status:
+                yield _sse_event({"type": "status", "job_id": job_id, "status": current["status"]})
+            else:
+                # Keep the connection alive through proxies
+                yield ": keep-alive\n\n"
+        if current is not None:
+            yield _sse_event({"type": "end", **current})
+    
+    return _streaming_response(events())
+
+@router.get("/runs/{run_id}/artifacts")
+async def get_run_artifacts(run_id: str):
+    """List the node IDs with stored artifacts for a run."""
+    node_ids = run_artifacts.list(run_id)
+    if node_ids is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return {"run_id": run_id, "artifacts": node_ids}
+
+@router.get("/runs/{run_id}/artifacts/{node_id}")
+async def get_run_artifact(run_id: str, node_id: str):
+    """Get a single node artifact of a run."""
+    try:
+        artifact = run_artifacts.get(run_id, node_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return {"run_id": run_id, "node_id": node_id, "artifact": artifact}
 
 @router.post("/llm/chat", response_model=LLMResponse)
 async def chat_with_llm(request: LLMRequest):
     """Send a direct request to the LLM."""
     try:
-        llm = OpenAILLM(
+        llm = client_pool.get(
             model_name=request.model,
             temperature=request.temperature,
             api_key=request.api_key,
             streaming=request.stream
         )
+        policy = CallPolicy(timeout=request.timeout, hedge_percentile=request.hedge_percentile)
         
-        # Prepare prompt with system message if provided
-        prompt = request.prompt
-        if request.system_message:
-            prompt = f"{request.system_message}\n\n{prompt}"
+        if request.stream:
+            return _streaming_response(_sse_stream(llm.stream(
+                request.prompt,
+                system_message=request.system_message,
+                use_cache=request.cache,
+                use_semantic_cache=request.semantic_cache,
+                semantic_threshold=request.semantic_threshold,
+                policy=policy
+            )))
         
-        # Generate response
-        response = await llm.generate(prompt)
+        # Generate response, prepending the system message if provided
+        response = await llm.generate(
+            request.prompt,
+            system_message=request.system_message,
+            use_cache=request.cache,
+            use_semantic_cache=request.semantic_cache,
+            semantic_threshold=request.semantic_threshold,
+            policy=policy
+        )
         return response
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error calling LLM: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error calling LLM: {str(e)}") 
+
+@router.get("/llm/cache")
+async def get_llm_cache_stats():
+    """Get hit/miss counters for the LLM response cache and its semantic tier."""
+    return {**response_cache.stats(), "semantic": semantic_cache.stats()}
+
+@router.get("/llm/resilience")
+async def get_llm_resilience_stats():
+    """Get circuit breaker state, latency percentiles and hedge win rates per model."""
+    return llm_resilience.stats()
+
+@router.get("/llm/coalescing")
+async def get_llm_coalescing_stats():
+    """Get counters for identical in-flight LLM requests that were coalesced."""
+    return request_coalescer.stats()
+
+@router.get("/llm/scheduler")
+async def get_llm_scheduler_stats():
+    """Get rate-limit scheduler counters and per-model queue state."""
+    return llm_scheduler.stats()
\ No newline at end of file
@@ -1,8 +1,9 @@
 """Components module for defining available LangChain components."""
 
 from .base import Component, Field
+from .builders import NodeBuilder, RunContext
 from .registry import ComponentRegistry
 
 registry = ComponentRegistry()
 
-__all__ = ["Component", "Field", "registry"] 
\ No newline at end of file
+__all__ = ["Component", "Field", "NodeBuilder", "RunContext", "ComponentRegistry", "registry"] 
\ No newline at end of file
@@ -0,0 +1,218 @@
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from abc import ABC, abstractmethod
+
+from ..graph.template import compile_template
+from ..llm import client_pool, CallPolicy, OpenAILLM, LLMBatcher
+
+
+def _text(value: Any) -> str:
+    """The text carried by a node artifact (LLM responses are dicts with "text")."""
+    if isinstance(value, dict) and "text" in value:
+        return str(value["text"])
+    return value if isinstance(value, str) else str(value)
+
+
+def _optional_number(data: Dict[str, Any], key: str) -> Optional[float]:
+    """A numeric node setting, or None if it is not set.
+    
+    Raises:
+        ValueError: If the setting is not a number.
+    """
+    value = data.get(key)
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except TypeError:
+        raise ValueError(f"{key} must be a number")
+
+
+def _first_input(inputs: Dict[str, Any]) -> Any:
+    """The main input of a node: the "input" handle, else any connected one."""
+    if "input" in inputs:
+        return inputs["input"]
+    return next(iter(inputs.values()), "")
+
+
+class RunContext:
+    """What a NodeBuilder gets to know about the run executing a node."""
+    
+    __slots__ = ("input_data", "node_id", "on_token", "batcher")
+    
+    def __init__(
+        self,
+        input_data: Dict[str, Any],
+        node_id: str,
+        on_token: Optional[Callable[[str, str], None]] = None,
+        batcher: Optional[LLMBatcher] = None
+    ):
+        """Initialize the context.
+        
+        Args:
+            input_data: The input data of the run.
+            node_id: ID of the node being run.
+            on_token: Called with (node_id, text) for each streamed chunk of
+                output, when the caller wants partial output.
+            batcher: Batches the LLM calls of concurrent runs, when the run
+                is part of a batch.
+        """
+        self.input_data = input_data
+        self.node_id = node_id
+        self.on_token = on_token
+        self.batcher = batcher
+
+
+class NodeBuilder(ABC):
+    """Builds and runs the nodes of one component type.
+    
+    validate() checks a node's data when its flow is compiled, so bad
+    configuration is rejected at save time. build() turns the data into a
+    reusable component (a compiled template, parsed LLM settings, ...).
+    Executors cache what it returns for as long as the flow version is
+    unchanged, so expensive setup belongs there. run() is called on every
+    execution with the component and the node's inputs; it may return an
+    awaitable.
+    """
+    
+    # Input nodes produce the run's input; their artifacts depend on it
+    is_input = False
+    # Output nodes' artifacts are returned as the results of a run
+    is_output = False
+    
+    def validate(self, data: Dict[str, Any], handles: List[str]) -> List[str]:
+        """Return the problems with a node's data, given its connected input handles."""
+        return []
+    
+    def build(self, data: Dict[str, Any]) -> Any:
+        """Create the reusable component for a node. Defaults to its data."""
+        return data
+    
+    @abstractmethod
+    def run(self, component: Any, inputs: Dict[str, Any], context: RunContext) -> Any:
+        """Produce the node's artifact."""
+
+
+class ChatInputBuilder(NodeBuilder):
+    """Emits the "input" of the run."""
+    
+    is_input = True
+    
+    def run(self, component: Any, inputs: Dict[str, Any], context: RunContext) -> Any:
+        return context.input_data.get("input", "")
+
+
+class ChatOutputBuilder(NodeBuilder):
+    """Returns its inputs as a result of the run."""
+    
+    is_output = True
+    
+    def run(self, component: Any, inputs: Dict[str, Any], context: RunContext) -> Any:
+        return inputs
+
+
+class PromptBuilder(NodeBuilder):
+    """Renders a compiled template with the node's inputs as variables.
+    
+    Variables without a connected input are left as written, so templates
+    may keep placeholders (e.g. {role}) the flow does not fill in.
+    """
+    
+    def validate(self, data: Dict[str, Any], handles: List[str]) -> List[str]:
+        if not isinstance(data.get("template", ""), str):
+            return ["template must be a string"]
+        return []
+    
+    def build(self, data: Dict[str, Any]) -> Any:
+        return compile_template(data.get("template", ""))
+    
+    def run(self, component: Any, inputs: Dict[str, Any], context: RunContext) -> Any:
+        return component.render({key: _text(value) for key, value in inputs.items()}, strict=False)
+
+
+class LLMBuilder(NodeBuilder):
+    """Sends its input to a pooled LLM client configured from the node's data.
+    
+    The component holds the client's settings, not the client: it is taken
+    from client_pool on every run, so cached flows do not keep clients alive
+    past the pool's size limit and idle timeout.
+    """
+    
+    # Optional numeric settings: the check they must pass and how it is described
+    _LIMITS = (
+        ("semantic_threshold", lambda value: 0 < value <= 1, "between 0 and 1"),
+        ("timeout", lambda value: value >= 0, "0 (no deadline) or more"),
+        ("hedge_percentile", lambda value: 0 <= value < 100, "between 0 (no hedging) and 100"),
+    )
+    
+    def validate(self, data: Dict[str, Any], handles: List[str]) -> List[str]:
+        errors = []
+        if not isinstance(data.get("model_name", ""), str):
+            errors.append("model_name must be a string")
+        try:
+            float(data.get("temperature", 0.7))
+        except (TypeError, ValueError):
+            errors.append("temperature must be a number")
+        for key, check, description in self._LIMITS:
+            try:
+                value = _optional_number(data, key)
+            except ValueError:
+                errors.append(f"{key} must be a number")
+                continue
+            if value is not None and not check(value):
+                errors.append(f"{key} must be {description}")
+        return errors
+    
+    def build(self, data: Dict[str, Any]) -> Any:
+        """Read the node's client settings and call options.
+        
+        Returns:
+            The client's model, temperature and API key, and the cache and
+            resilience options of its calls.
+        """
+        settings = {
+            "model_name": data.get("model_name", "gpt-4o-mini"),
+            "temperature": float(data.get("temperature", 0.7)),
+            "api_key": data.get("api_key") or None,
+        }
+        options = {
+            "use_cache": data.get("cache"),
+            "use_semantic_cache": bool(data.get("semantic_cache")),
+            "semantic_threshold": _optional_number(data, "semantic_threshold"),
+            "policy": CallPolicy(
+                timeout=_optional_number(data, "timeout"),
+                hedge_percentile=_optional_number(data, "hedge_percentile"),
+                circuit_breaker=data.get("circuit_breaker")
+            ),
+        }
+        return settings, options
+    
+    @staticmethod
+    def client(component: Tuple[Dict[str, Any], Dict[str, Any]]) -> OpenAILLM:
+        """Get the pooled client for a component returned by build().
+        
+        Raises:
+            ValueError: If no API key is set on the node or in the environment.
+        """
+        return client_pool.get(**component[0])
+    
+    async def run(self, component: Any, inputs: Dict[str, Any], context: RunContext) -> Any:
+        client, options = self.client(component), component[1]
+        prompt = _text(_first_input(inputs))
+        if context.on_token is None:
+            if context.batcher is not None:
+                # Sent together with the same step's prompts of the batch's other runs
+                response = await context.batcher.generate((context.node_id, id(client)), client, prompt, options)
+            else:
+                response = await client.generate(prompt, **options)
+            if "error" in response:
+                raise RuntimeError(response["error"])
+            return response
+        
+        async for event in client.stream(prompt, **options):
+            if event["type"] == "token":
+                context.on_token(context.node_id, event["text"])
+            elif event["type"] == "error":
+                raise RuntimeError(event["error"])
+            else:
+                return {key: value for key, value in event.items() if key != "type"}
+        raise RuntimeError("LLM stream ended without a response")
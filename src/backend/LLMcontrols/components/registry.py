@@ -1,13 +1,27 @@
-from typing import Dict, List, Any, Optional, Type
+from typing import Dict, List, Any, Optional, Tuple, Type
+import hashlib
+import json
 import logging
 from .base import Component, Field
+from .builders import NodeBuilder, ChatInputBuilder, ChatOutputBuilder, PromptBuilder, LLMBuilder
 
 logger = logging.getLogger(__name__)
 
 class ComponentRegistry:
-    """Registry for available components."""
+    """Registry for available components.
+    
+    The catalog changes only when a component is registered, so its JSON
+    serialization is cached and rebuilt on the first read after a change.
+    version counts registrations.
+    
+    Each component type can have a NodeBuilder, looked up by executors in
+    a single dict access per node.
+    """
     
     def __init__(self):
+        self.version = 0
+        self._serialized: Optional[Tuple[bytes, str]] = None
+        self.builders: Dict[str, NodeBuilder] = {}
         self.components: Dict[str, Dict[str, Component]] = {
             "llms": {},
             "prompts": {},
@@ -22,15 +36,27 @@ class ComponentRegistry:
             "textsplitters": {},
         }
     
-    def register(self, component: Component, category: str) -> None:
-        """Register a component in the registry."""
+    def register(self, component: Component, category: str, builder: Optional[NodeBuilder] = None) -> None:
+        """Register a component in the registry, with the builder for its type if given."""
         if category not in self.components:
             logger.warning(f"Category {category} does not exist in the registry. Creating it.")
             self.components[category] = {}
         
         self.components[category][component.name] = component
+        self.version += 1
+        self._serialized = None
+        if builder is not None:
+            self.builders[component.type] = builder
         logger.info(f"Registered component {component.name} in category {category}")
     
+    def register_builder(self, component_type: str, builder: NodeBuilder) -> None:
+        """Set or replace the builder of a component type."""
+        self.builders[component_type] = builder
+    
+    def get_builder(self, component_type: str) -> Optional[NodeBuilder]:
+        """Get the builder of a component type, or None if it has none."""
+        return self.builders.get(component_type)
+    
     def get_component(self, category: str, name: str) -> Optional[Component]:
         """Get a component from the registry."""
         if category not in self.components:
@@ -52,6 +78,20 @@ class ComponentRegistry:
         
         return result
     
+    def get_serialized(self) -> Tuple[bytes, str]:
+        """Get the catalog as JSON and its ETag.
+        
+        Returns:
+            The JSON body of get_all_components and a strong ETag derived
+            from it, so worker processes with the same catalog agree on it.
+        """
+        serialized = self._serialized
+        if serialized is None:
+            payload = json.dumps(self.get_all_components(), separators=(",", ":"), default=str).encode()
+            etag = f'"{hashlib.sha256(payload).hexdigest()[:32]}"'
+            serialized = self._serialized = (payload, etag)
+        return serialized
+    
     def load_default_components(self) -> None:
         """Load default components into the registry."""
         # Chat Components
@@ -70,7 +110,8 @@ class ComponentRegistry:
                 ],
                 base_classes=["ChatInput"]
             ),
-            category="chat"
+            category="chat",
+            builder=ChatInputBuilder()
         )
         
         self.register(
@@ -88,7 +129,8 @@ class ComponentRegistry:
                 ],
                 base_classes=["ChatOutput"]
             ),
-            category="chat"
+            category="chat",
+            builder=ChatOutputBuilder()
         )
         
         # Prompts
@@ -117,7 +159,8 @@ class ComponentRegistry:
                 ],
                 base_classes=["BasePromptTemplate"]
             ),
-            category="prompts"
+            category="prompts",
+            builder=PromptBuilder()
         )
         
         # LLMs
@@ -148,8 +191,46 @@ class ComponentRegistry:
                         description="OpenAI API key",
                         required=True,
                     ),
+                    Field(
+                        name="cache",
+                        type="boolean",
+                        description="Cache responses (always on when temperature is 0)",
+                        required=False,
+                    ),
+                    Field(
+                        name="semantic_cache",
+                        type="boolean",
+                        description="Reuse responses to similar earlier prompts",
+                        required=False,
+                    ),
+                    Field(
+                        name="semantic_threshold",
+                        type="number",
+                        description="Minimum similarity (0-1) of a reused response",
+                        required=False,
+                    ),
+                    Field(
+                        name="timeout",
+                        type="number",
+                        description="Seconds before a call is abandoned (0 for no deadline)",
+                        required=False,
+                    ),
+                    Field(
+                        name="hedge_percentile",
+                        type="number",
+                        description="Send a backup request once a call is slower than this latency percentile",
+                        required=False,
+                    ),
+                    Field(
+                        name="circuit_breaker",
+                        type="boolean",
+                        description="Fail fast while the model is erroring",
+                        required=False,
+                        default=True,
+                    ),
                 ],
                 base_classes=["BaseLLM"]
             ),
-            category="llms"
+            category="llms",
+            builder=LLMBuilder()
         ) 
\ No newline at end of file
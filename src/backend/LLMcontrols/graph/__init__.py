@@ -1,5 +1,16 @@
 """Graph module for processing and executing Langchain flows."""
 
-from .base import Graph, Node, Edge
+from .base import Graph, Node, Edge, CycleError
+from .edits import apply_flow_operations, compute_execution_order
+from .template import CompiledTemplate, compile_template
+from .memo import ArtifactCache, FlowArtifactCaches
+from .cache import VersionedCache, ComponentCache
+from .plan import ExecutionPlan, PlanStep, FlowCompileError, compile_flow, compile_graph
 
-__all__ = ["Graph", "Node", "Edge"] 
\ No newline at end of file
+__all__ = [
+    "Graph", "Node", "Edge", "CycleError",
+    "apply_flow_operations", "compute_execution_order",
+    "CompiledTemplate", "compile_template",
+    "ArtifactCache", "FlowArtifactCaches", "VersionedCache", "ComponentCache",
+    "ExecutionPlan", "PlanStep", "FlowCompileError", "compile_flow", "compile_graph",
+] 
\ No newline at end of file
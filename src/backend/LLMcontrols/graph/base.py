@@ -1,9 +1,17 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
+from array import array
+import sys
 import uuid
 
+def _intern(value: Any) -> Any:
+    """Intern a string that repeats across a flow (node types, handles), so copies share one object."""
+    return sys.intern(value) if type(value) is str else value
+
 class Node:
     """A node in the flow graph, representing a LangChain component."""
     
+    __slots__ = ("id", "type", "data", "position", "_inputs", "_outputs")
+    
     def __init__(
         self,
         id: str,
@@ -20,17 +28,38 @@ class Node:
             position: The position of the node in the flow editor.
         """
         self.id = id
-        self.type = type
+        self.type = _intern(type)
         self.data = data
         self.position = position
-        self.inputs = {}
-        self.outputs = {}
+        # Unused by the engine, so only created when first accessed
+        self._inputs: Optional[Dict[str, Any]] = None
+        self._outputs: Optional[Dict[str, Any]] = None
+    
+    @property
+    def inputs(self) -> Dict[str, Any]:
+        if self._inputs is None:
+            self._inputs = {}
+        return self._inputs
+    
+    @inputs.setter
+    def inputs(self, value: Dict[str, Any]) -> None:
+        self._inputs = value
+    
+    @property
+    def outputs(self) -> Dict[str, Any]:
+        if self._outputs is None:
+            self._outputs = {}
+        return self._outputs
+    
+    @outputs.setter
+    def outputs(self, value: Dict[str, Any]) -> None:
+        self._outputs = value
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "Node":
         """Create a node from a dictionary."""
         return cls(
-            id=data.get("id", str(uuid.uuid4())),
+            id=data["id"] if "id" in data else str(uuid.uuid4()),
             type=data.get("type", ""),
             data=data.get("data", {}),
             position=data.get("position", {"x": 0, "y": 0})
@@ -49,6 +78,8 @@ class Node:
 class Edge:
     """An edge connecting two nodes in the flow graph."""
     
+    __slots__ = ("id", "source", "target", "sourceHandle", "targetHandle")
+    
     def __init__(
         self,
         id: str,
@@ -69,14 +100,14 @@ class Edge:
         self.id = id
         self.source = source
         self.target = target
-        self.sourceHandle = sourceHandle
-        self.targetHandle = targetHandle
+        self.sourceHandle = _intern(sourceHandle)
+        self.targetHandle = _intern(targetHandle)
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "Edge":
         """Create an edge from a dictionary."""
         return cls(
-            id=data.get("id", str(uuid.uuid4())),
+            id=data["id"] if "id" in data else str(uuid.uuid4()),
             source=data.get("source", ""),
             target=data.get("target", ""),
             sourceHandle=data.get("sourceHandle"),
@@ -94,8 +125,81 @@ class Edge:
         }
 
 
+class CycleError(ValueError):
+    """Raised when a graph contains a cycle and cannot be ordered."""
+    
+    def __init__(self, cycle: List[str]):
+        """Initialize the error.
+        
+        Args:
+            cycle: The node IDs along the cycle, with the first node repeated at the end.
+        """
+        self.cycle = cycle
+        super().__init__(
+            f"Graph has a cycle, cannot determine execution order: {' -> '.join(cycle)}"
+        )
+
+
+def _group(keys: array, count: int) -> Tuple[array, array]:
+    """Counting-sort edge indices by node index, keeping edge order; keys of -1 are left out.
+    
+    Returns:
+        offsets and grouped, where the edges of node i are
+        grouped[offsets[i]:offsets[i + 1]].
+    """
+    offsets = array("i", [0]) * (count + 1)
+    for key in keys:
+        if key >= 0:
+            offsets[key + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+    
+    grouped = array("i", [0]) * offsets[count]
+    cursor = offsets[:-1]
+    for edge_index, key in enumerate(keys):
+        if key >= 0:
+            grouped[cursor[key]] = edge_index
+            cursor[key] += 1
+    return offsets, grouped
+
+
+class _Adjacency:
+    """Compressed adjacency of a graph over integer node indices.
+    
+    Node i is graph.nodes[i]. Edge endpoints are stored as node indices,
+    -1 for nodes that are not in the graph, and edges are grouped by node
+    in compressed sparse row form: the edges into node i are
+    incoming[in_offsets[i]:in_offsets[i + 1]], and likewise for outgoing,
+    whose target indices are in out_targets. This takes a few flat arrays
+    instead of a list per node and direction.
+    """
+    
+    __slots__ = (
+        "index", "sources", "targets",
+        "in_offsets", "incoming", "out_offsets", "outgoing", "out_targets",
+    )
+    
+    def __init__(self, nodes: List[Node], edges: List[Edge]):
+        # Like node_map, the last of several nodes with the same ID wins
+        self.index: Dict[str, int] = {node.id: i for i, node in enumerate(nodes)}
+        index = self.index.get
+        self.sources = array("i", [index(edge.source, -1) for edge in edges])
+        self.targets = array("i", [index(edge.target, -1) for edge in edges])
+        
+        self.in_offsets, order = _group(self.targets, len(nodes))
+        self.incoming: List[Edge] = [edges[e] for e in order]
+        self.out_offsets, order = _group(self.sources, len(nodes))
+        self.outgoing: List[Edge] = [edges[e] for e in order]
+        self.out_targets = array("i", [self.targets[e] for e in order])
+
+
 class Graph:
-    """A graph representing a flow of LangChain components."""
+    """A graph representing a flow of LangChain components.
+    
+    Built for large flows kept in memory: nodes and edges use __slots__,
+    repeated strings are shared, and adjacency is held in integer arrays
+    built on first use rather than in per-node lists of edges.
+    """
     
     def __init__(self, nodes: List[Dict[str, Any]] = None, edges: List[Dict[str, Any]] = None):
         """Initialize a graph.
@@ -104,66 +208,166 @@ class Graph:
             nodes: The nodes in the graph.
             edges: The edges in the graph.
         """
-        self.nodes = [Node.from_dict(node) for node in (nodes or [])]
-        self.edges = [Edge.from_dict(edge) for edge in (edges or [])]
-        self.node_map = {node.id: node for node in self.nodes}
+        self.nodes: List[Node] = []
+        self.edges: List[Edge] = []
+        self.node_map: Dict[str, Node] = {}
+        # Built by _index() on first use, dropped by add_node/add_edge
+        self._adjacency: Optional[_Adjacency] = None
+        
+        for node in (nodes or []):
+            self.add_node(node)
+        for edge in (edges or []):
+            self.add_edge(edge)
     
     def add_node(self, node: Dict[str, Any]) -> Node:
         """Add a node to the graph."""
         node_obj = Node.from_dict(node)
         self.nodes.append(node_obj)
         self.node_map[node_obj.id] = node_obj
+        self._adjacency = None
         return node_obj
     
     def add_edge(self, edge: Dict[str, Any]) -> Edge:
         """Add an edge to the graph."""
         edge_obj = Edge.from_dict(edge)
+        # Share the nodes' ID strings rather than keeping a copy per edge
+        source, target = self.node_map.get(edge_obj.source), self.node_map.get(edge_obj.target)
+        if source is not None:
+            edge_obj.source = source.id
+        if target is not None:
+            edge_obj.target = target.id
         self.edges.append(edge_obj)
+        self._adjacency = None
         return edge_obj
     
+    def _index(self) -> _Adjacency:
+        adjacency = self._adjacency
+        if adjacency is None:
+            adjacency = self._adjacency = _Adjacency(self.nodes, self.edges)
+        return adjacency
+    
+    def edge_arrays(self) -> Tuple[Any, Any]:
+        """Get the source and target node index of every edge as NumPy arrays.
+        
+        Indices refer to self.nodes, with -1 for nodes not in the graph. The
+        arrays are read-only views of the graph's index, made without copying,
+        for vectorized analysis of large flows.
+        """
+        import numpy as np
+        
+        adjacency = self._index()
+        return (
+            np.frombuffer(adjacency.sources, dtype=np.intc),
+            np.frombuffer(adjacency.targets, dtype=np.intc),
+        )
+    
     def get_node(self, node_id: str) -> Optional[Node]:
         """Get a node by ID."""
         return self.node_map.get(node_id)
     
     def get_node_inputs(self, node_id: str) -> List[Edge]:
         """Get all edges that target the specified node."""
-        return [edge for edge in self.edges if edge.target == node_id]
+        adjacency = self._adjacency or self._index()
+        node = adjacency.index.get(node_id)
+        if node is None:
+            return [edge for edge in self.edges if edge.target == node_id]
+        offsets = adjacency.in_offsets
+        return adjacency.incoming[offsets[node]:offsets[node + 1]]
     
     def get_node_outputs(self, node_id: str) -> List[Edge]:
         """Get all edges that originate from the specified node."""
-        return [edge for edge in self.edges if edge.source == node_id]
+        adjacency = self._adjacency or self._index()
+        node = adjacency.index.get(node_id)
+        if node is None:
+            return [edge for edge in self.edges if edge.source == node_id]
+        offsets = adjacency.out_offsets
+        return adjacency.outgoing[offsets[node]:offsets[node + 1]]
+    
+    def topological_levels(self) -> List[List[Node]]:
+        """
+        Group nodes into dependency levels using Kahn's algorithm.
+        
+        Every node in a level depends only on nodes in earlier levels, so the
+        nodes of a single level can be executed independently of each other.
+        Edges that reference unknown nodes are ignored.
+        
+        Raises:
+            CycleError: If the graph contains a cycle.
+        """
+        adjacency = self._index()
+        offsets, out_targets = adjacency.out_offsets, adjacency.out_targets
+        in_degree = [0] * len(self.nodes)
+        for source, target in zip(adjacency.sources, adjacency.targets):
+            if source >= 0 and target >= 0:
+                in_degree[target] += 1
+        
+        levels = []
+        current = [i for i, degree in enumerate(in_degree) if degree == 0]
+        visited = 0
+        
+        while current:
+            levels.append([self.nodes[i] for i in current])
+            visited += len(current)
+            next_level = []
+            for node in current:
+                for target in out_targets[offsets[node]:offsets[node + 1]]:
+                    if target < 0:
+                        continue
+                    in_degree[target] -= 1
+                    if in_degree[target] == 0:
+                        next_level.append(target)
+            current = next_level
+        
+        if visited != len(self.nodes):
+            remaining = [i for i, degree in enumerate(in_degree) if degree > 0]
+            raise CycleError(self._find_cycle(remaining))
+        
+        return levels
     
     def topological_sort(self) -> List[Node]:
         """
         Sort nodes in topological order (nodes with no inputs first).
         This is useful for determining the execution order.
+        
+        Raises:
+            CycleError: If the graph contains a cycle.
         """
-        # Create a dictionary to track visited nodes
-        visited = {node.id: False for node in self.nodes}
-        temp_mark = {node.id: False for node in self.nodes}
-        order = []
-        
-        def visit(node_id):
-            if temp_mark[node_id]:
-                raise ValueError("Graph has a cycle, cannot determine execution order")
-            if not visited[node_id]:
-                temp_mark[node_id] = True
-                for edge in self.get_node_outputs(node_id):
-                    visit(edge.target)
-                temp_mark[node_id] = False
-                visited[node_id] = True
-                order.insert(0, self.get_node(node_id))
-        
-        # Visit all nodes
-        for node in self.nodes:
-            if not visited[node.id]:
-                visit(node.id)
-        
-        return order
+        return [node for level in self.topological_levels() for node in level]
+    
+    def _find_cycle(self, remaining: List[int]) -> List[str]:
+        """Find one cycle among the given node indices with an iterative DFS."""
+        adjacency = self._index()
+        offsets, out_targets = adjacency.out_offsets, adjacency.out_targets
+        candidates = set(remaining)
+        state = {}  # node index -> 1 while on the stack, 2 once finished
+        
+        for start in remaining:
+            if start in state:
+                continue
+            path = [start]
+            stack = [iter(out_targets[offsets[start]:offsets[start + 1]])]
+            state[start] = 1
+            while stack:
+                target = next(stack[-1], None)
+                if target is None:
+                    state[path.pop()] = 2
+                    stack.pop()
+                    continue
+                if target not in candidates:
+                    continue
+                if state.get(target) == 1:
+                    return [self.nodes[i].id for i in path[path.index(target):]] + [self.nodes[target].id]
+                if target not in state:
+                    state[target] = 1
+                    path.append(target)
+                    stack.append(iter(out_targets[offsets[target]:offsets[target + 1]]))
+        
+        # Unreachable when called with the leftovers of Kahn's algorithm
+        return [self.nodes[i].id for i in remaining]
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert graph to a dictionary."""
         return {
             "nodes": [node.to_dict() for node in self.nodes],
             "edges": [edge.to_dict() for edge in self.edges]
-        } 
\ No newline at end of file
+        }
\ No newline at end of file
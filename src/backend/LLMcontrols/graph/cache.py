@@ -0,0 +1,118 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+from collections import OrderedDict
+import threading
+
+
+class VersionedCache:
+    """Per-process LRU of values derived from flows, validated by flow version.
+    
+    Flow stores assign a new version on every save, so a cached value is
+    reused for as long as the stored version matches and rebuilt otherwise.
+    Checking the version is a single-column lookup, much cheaper than
+    decoding the flow again, and stays correct when the flow is saved by
+    another worker process.
+    """
+    
+    def __init__(self, max_flows: int = 256):
+        """Initialize the cache.
+        
+        Args:
+            max_flows: Maximum number of flows whose values are kept.
+        """
+        self.max_flows = max_flows
+        self._entries: "OrderedDict[str, Tuple[int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(
+        self,
+        flow_id: str,
+        version: int,
+        load: Callable[[], Optional[Tuple[int, Any]]]
+    ) -> Optional[Any]:
+        """Return the value for a flow at a version, loading it on a miss.
+        
+        Args:
+            flow_id: ID of the flow.
+            version: Current version of the flow in the store.
+            load: Called on a miss; returns the (version, value) it loaded,
+                or None if the flow no longer exists.
+        
+        Returns:
+            The value, or None if the flow no longer exists.
+        """
+        with self._lock:
+            entry = self._entries.get(flow_id)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(flow_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        
+        loaded = load()
+        if loaded is None:
+            self.discard(flow_id)
+            return None
+        
+        with self._lock:
+            # The loaded flow may be newer than the version asked for
+            self._entries[flow_id] = loaded
+            self._entries.move_to_end(flow_id)
+            while len(self._entries) > self.max_flows:
+                self._entries.popitem(last=False)
+        return loaded[1]
+    
+    def discard(self, flow_id: str) -> None:
+        with self._lock:
+            self._entries.pop(flow_id, None)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "flows": len(self._entries),
+                "max_flows": self.max_flows,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class ComponentCache:
+    """Per-process cache of the built components of recently run flows.
+    
+    Holds one dict of node ID -> component per flow, for a single flow
+    version; asking for a newer version starts an empty dict, so components
+    built from outdated node data are never reused.
+    """
+    
+    def __init__(self, max_flows: int = 256):
+        """Initialize the cache.
+        
+        Args:
+            max_flows: Maximum number of flows whose components are kept.
+        """
+        self.max_flows = max_flows
+        self._flows: "OrderedDict[str, Tuple[int, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def for_flow(self, flow_id: str, version: int) -> Dict[str, Any]:
+        """Get the components built for a flow version, to be filled in by an executor."""
+        with self._lock:
+            entry = self._flows.get(flow_id)
+            if entry is None or entry[0] != version:
+                entry = self._flows[flow_id] = (version, {})
+            self._flows.move_to_end(flow_id)
+            while len(self._flows) > self.max_flows:
+                self._flows.popitem(last=False)
+            return entry[1]
+    
+    def discard(self, flow_id: str) -> None:
+        with self._lock:
+            self._flows.pop(flow_id, None)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "flows": len(self._flows),
+                "components": sum(len(components) for _, components in self._flows.values()),
+            }
@@ -0,0 +1,139 @@
+from typing import Dict, List, Any, Optional
+import uuid
+
+from .base import Graph, CycleError
+
+# Operations that change the graph structure
+STRUCTURAL_OPERATIONS = {"add_node", "remove_node", "add_edge", "remove_edge"}
+
+
+def compute_execution_order(flow: Dict[str, Any]) -> Optional[List[str]]:
+    """Return the node IDs of a flow in execution order, or None if it has a cycle."""
+    try:
+        graph = Graph(nodes=flow.get("nodes"), edges=flow.get("edges"))
+        return [node.id for node in graph.topological_sort()]
+    except CycleError:
+        return None
+
+
+def apply_flow_operations(flow: Dict[str, Any], operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Apply a list of edit operations to a stored flow in place.
+    
+    Supported operations:
+        {"op": "add_node", "node": {...}}
+        {"op": "remove_node", "id": ...}       (also removes its edges)
+        {"op": "update_node", "id": ..., "data": {...}}   (merged into node data)
+        {"op": "move_node", "id": ..., "position": {...}}
+        {"op": "add_edge", "edge": {...}}
+        {"op": "remove_edge", "id": ...}
+    
+    The flow's cached "execution_order" is kept valid incrementally: node
+    removals and edge removals cannot break a topological order, new nodes
+    are appended, and a new edge only forces a re-sort when it points
+    backwards in the current order. Data and position edits never touch it.
+    Flows stored without an order are sorted once before the operations
+    are applied, so their new edges are checked for cycles too; only flows
+    that already had a cycle may still have one afterwards.
+    
+    Args:
+        flow: The stored flow dictionary, modified in place.
+        operations: The operations to apply, in order.
+    
+    Returns:
+        The modified flow.
+    
+    Raises:
+        ValueError: If an operation is malformed, references a missing node
+            or edge, or would introduce a cycle.
+    """
+    nodes = flow.setdefault("nodes", [])
+    edges = flow.setdefault("edges", [])
+    node_index = {node["id"]: i for i, node in enumerate(nodes)}
+    edge_ids = {edge["id"] for edge in edges}
+    structural = any(operation.get("op") in STRUCTURAL_OPERATIONS for operation in operations)
+    order = flow.get("execution_order")
+    computed = order is None
+    if computed:
+        order = compute_execution_order(flow)
+    # A flow stored with a cycle is re-sorted after structural edits, in case they removed it
+    cyclic = order is None
+    needs_resort = cyclic and structural
+    positions = {node_id: i for i, node_id in enumerate(order or [])}
+    next_position = len(positions)
+    
+    def require_node(node_id: Any) -> Dict[str, Any]:
+        if node_id not in node_index:
+            raise ValueError(f"Node {node_id} not found")
+        return nodes[node_index[node_id]]
+    
+    for operation in operations:
+        op = operation.get("op")
+        
+        if op == "move_node":
+            require_node(operation.get("id"))["position"] = operation.get("position") or {"x": 0, "y": 0}
+        
+        elif op == "update_node":
+            node = require_node(operation.get("id"))
+            node.setdefault("data", {}).update(operation.get("data") or {})
+        
+        elif op == "add_node":
+            node = dict(operation.get("node") or {})
+            node.setdefault("id", str(uuid.uuid4()))
+            node.setdefault("type", "")
+            node.setdefault("data", {})
+            node.setdefault("position", {"x": 0, "y": 0})
+            if node["id"] in node_index:
+                raise ValueError(f"Node {node['id']} already exists")
+            node_index[node["id"]] = len(nodes)
+            nodes.append(node)
+            # A node without edges can run anywhere; put it last
+            positions[node["id"]] = next_position
+            next_position += 1
+        
+        elif op == "remove_node":
+            node_id = operation.get("id")
+            require_node(node_id)
+            nodes.pop(node_index[node_id])
+            node_index = {node["id"]: i for i, node in enumerate(nodes)}
+            edges[:] = [edge for edge in edges if edge["source"] != node_id and edge["target"] != node_id]
+            edge_ids = {edge["id"] for edge in edges}
+            positions.pop(node_id, None)
+        
+        elif op == "add_edge":
+            edge = dict(operation.get("edge") or {})
+            edge.setdefault("id", str(uuid.uuid4()))
+            edge.setdefault("sourceHandle", None)
+            edge.setdefault("targetHandle", None)
+            require_node(edge.get("source"))
+            require_node(edge.get("target"))
+            if edge["id"] in edge_ids:
+                raise ValueError(f"Edge {edge['id']} already exists")
+            edge_ids.add(edge["id"])
+            edges.append(edge)
+            source_position = positions.get(edge["source"])
+            target_position = positions.get(edge["target"])
+            if source_position is None or target_position is None or source_position >= target_position:
+                needs_resort = True
+        
+        elif op == "remove_edge":
+            edge_id = operation.get("id")
+            if edge_id not in edge_ids:
+                raise ValueError(f"Edge {edge_id} not found")
+            edges[:] = [edge for edge in edges if edge["id"] != edge_id]
+            edge_ids.discard(edge_id)
+        
+        else:
+            raise ValueError(f"Unknown operation: {op}")
+    
+    if needs_resort:
+        graph = Graph(nodes=nodes, edges=edges)
+        try:
+            flow["execution_order"] = [node.id for node in graph.topological_sort()]
+        except CycleError as e:
+            if not cyclic:
+                raise ValueError(str(e))
+            flow["execution_order"] = None
+    elif structural or (computed and order is not None):
+        flow["execution_order"] = sorted(positions, key=positions.get)
+    
+    return flow
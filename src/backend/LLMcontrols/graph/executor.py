@@ -1,127 +1,365 @@
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional, Set, Union
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import inspect
 import logging
-from .base import Graph, Node, Edge
+from .base import Graph
+from .memo import ArtifactCache, MISSING
+from .plan import ExecutionPlan, PlanStep, compile_graph
+from ..components import registry as default_registry
+from ..components.builders import RunContext
+from ..components.registry import ComponentRegistry
+from ..llm.batch import LLMBatcher
+from ..metrics import NODE_LATENCY, FLOW_LATENCY, FLOW_ERRORS
+from ..storage.artifacts import RunArtifactStore
 
 logger = logging.getLogger(__name__)
 
 class FlowExecutor:
-    """Execute a flow graph by building and running LangChain components."""
+    """Execute a flow by building and running LangChain components.
     
-    def __init__(self, graph: Graph):
-        self.graph = graph
+    Flows are run from an ExecutionPlan, compiled from the flow when it is
+    saved; a Graph passed instead is compiled on the first run. Each node
+    type is handled by the NodeBuilder registered for it in the component
+    registry.
+    """
+    
+    def __init__(
+        self,
+        graph: Union[Graph, ExecutionPlan],
+        max_concurrency: Optional[int] = None,
+        flow_id: Optional[str] = None,
+        artifact_cache: Optional[ArtifactCache] = None,
+        artifact_store: Optional[RunArtifactStore] = None,
+        include_artifacts: bool = False,
+        registry: Optional[ComponentRegistry] = None,
+        components: Optional[Dict[str, Any]] = None,
+        on_token: Optional[Callable[[str, str], None]] = None,
+        llm_batcher: Optional[LLMBatcher] = None
+    ):
+        """Initialize the executor.
+        
+        Args:
+            graph: The compiled plan of the flow, or its graph.
+            max_concurrency: Default cap on nodes running at once in execute_async.
+                None means no limit.
+            flow_id: ID of the flow being executed, used to label metrics.
+            artifact_cache: Enables incremental execution. Nodes whose data
+                and upstream artifacts are unchanged since an earlier run
+                reuse their memoized artifact instead of being rebuilt.
+            artifact_store: Where each run's artifacts are kept, under its
+                run_id, for later retrieval.
+            include_artifacts: Inline every node artifact in results. By
+                default only output-node results are returned.
+            registry: Where node builders are looked up. Defaults to the
+                application's component registry.
+            components: Built components by node ID, filled in as nodes are
+                first built and reused by later runs. Pass the same dict
+                (see graph.ComponentCache) to executors of one flow version
+                to share them across requests.
+            on_token: Called with (node_id, text) as nodes that support it
+                (LLM nodes) stream their output.
+            llm_batcher: Shared by the executors of a batch run, so their LLM
+                nodes send batched calls.
+        """
+        self.graph = graph if isinstance(graph, Graph) else None
+        self.plan = graph if isinstance(graph, ExecutionPlan) else None
+        self.max_concurrency = max_concurrency
+        self.flow_id = flow_id or ""
+        self.artifact_cache = artifact_cache
+        self.artifact_store = artifact_store
+        self.include_artifacts = include_artifacts
+        self.registry = registry or default_registry
+        self.components = components if components is not None else {}
+        self.on_token = on_token
+        self.llm_batcher = llm_batcher
+        self.run_id: Optional[str] = None
         self.artifacts = {}  # Store the outputs of each node
+        self.fingerprints: Dict[str, str] = {}  # Node fingerprints of the current run
+        self.reused: Set[str] = set()  # Nodes served from the artifact cache in the current run
     
-    def _build_langchain_component(self, node: Node, inputs: Dict[str, Any]) -> Any:
+    def _plan(self) -> ExecutionPlan:
+        """The plan to run, compiling the graph on first use.
+        
+        Raises:
+            FlowCompileError: If the graph does not compile.
         """
-        Build a LangChain component from a node and its inputs.
-        This is a placeholder - in a real implementation, this would:
-        1. Determine the component type
-        2. Import the appropriate LangChain class
-        3. Initialize it with the node's data and inputs
+        if self.plan is None:
+            self.plan = compile_graph(self.graph, self.registry)
+        return self.plan
+    
+    def _build_langchain_component(self, step: PlanStep, inputs: Dict[str, Any], input_data: Dict[str, Any]) -> Any:
+        """Build a node's component, reusing an earlier build, and run it.
+        
+        The result may be an awaitable (e.g. an LLM call).
         """
-        node_type = node.type
-        node_data = node.data
-        
-        # Mock implementation - in a real app, this would use importlib to dynamically import
-        # and instantiate LangChain classes based on node type
-        logger.info(f"Building component of type {node_type} with data {node_data} and inputs {inputs}")
-        
-        if node_type == "chat_input":
-            # Just pass through the input
-            return inputs.get("input_text", "No input provided")
-        
-        elif node_type == "chat_output":
-            # Return the input as output
-            return inputs
-        
-        elif node_type == "llm":
-            # Mock LLM that just returns a fixed response
-            return {
-                "text": f"This is a response from the LLM with model {node_data.get('model_name', 'unknown')}",
-                "model": node_data.get("model_name", "unknown"),
-                "temperature": node_data.get("temperature", 0.7)
-            }
-        
-        elif node_type == "prompt":
-            # Simple template replacement
-            template = node_data.get("template", "")
-            variables = inputs or {}
-            result = template
-            for key, value in variables.items():
-                result = result.replace(f"{{{{{key}}}}}", str(value))
-            return result
-        
-        else:
-            logger.warning(f"Unknown node type: {node_type}")
-            return {"error": f"Unknown node type: {node_type}"}
-    
-    def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        builder = self.registry.get_builder(step.type)
+        if builder is None:
+            raise ValueError(f"Unknown node type: {step.type}")
+        
+        component = self.components.get(step.id, MISSING)
+        if component is MISSING:
+            logger.info(f"Building component of type {step.type} for node {step.id}")
+            component = self.components[step.id] = builder.build(step.data)
+        return builder.run(component, inputs, RunContext(input_data, step.id, self.on_token, self.llm_batcher))
+    
+    def _collect_node_inputs(self, plan: ExecutionPlan, step: PlanStep) -> Dict[str, Any]:
+        """Gather the inputs of a step from the artifacts of the steps bound to it."""
+        return {handle: self.artifacts[plan.steps[source].id] for handle, source in step.inputs}
+    
+    def _fingerprint(self, plan: ExecutionPlan, step: PlanStep, input_data: Dict[str, Any]) -> str:
+        """Hash a node's type, data and upstream fingerprints.
+        
+        Input nodes also hash the run's input data, which they emit.
         """
-        Execute the flow graph and return the results.
+        upstream = sorted(
+            [handle, self.fingerprints.get(plan.steps[source].id, "")] for handle, source in step.inputs
+        )
+        builder = self.registry.get_builder(step.type)
+        run_input = input_data if builder is not None and builder.is_input else None
+        payload = json.dumps([step.type, step.data, upstream, run_input], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _memoized(self, plan: ExecutionPlan, step: PlanStep, input_data: Dict[str, Any]) -> Any:
+        """Fingerprint a node and return its memoized artifact, or MISSING."""
+        if self.artifact_cache is None:
+            return MISSING
+        fingerprint = self.fingerprints[step.id] = self._fingerprint(plan, step, input_data)
+        artifact = self.artifact_cache.get(fingerprint)
+        if artifact is not MISSING:
+            self.reused.add(step.id)
+        return artifact
+    
+    def _memoize(self, step: PlanStep, artifact: Any) -> None:
+        if self.artifact_cache is not None:
+            self.artifact_cache.set(self.fingerprints[step.id], artifact)
+    
+    def _start_run(self, run_id: Optional[str] = None) -> None:
+        """Reset per-run state and assign the run ID, a new one if not given."""
+        self.run_id = run_id or str(uuid.uuid4())
+        self.artifacts = {}
+        self.fingerprints = {}
+        self.reused = set()
+    
+    def _finish_run(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Attach the run ID, and the artifacts if requested, to the result.
+        
+        The artifacts are stored by the caller, see execute and execute_async.
+        """
+        result["run_id"] = self.run_id
+        if self.include_artifacts:
+            result["artifacts"] = self.artifacts
+        return result
+    
+    def _result(self, plan: ExecutionPlan, execution_order: List[str]) -> Dict[str, Any]:
+        """Build the result of a successful run."""
+        result = {
+            "results": self._collect_output_results(plan),
+            "execution_order": execution_order
+        }
+        if self.artifact_cache is not None:
+            result["reused_nodes"] = [step.id for step in plan.steps if step.id in self.reused]
+        return self._finish_run(result)
+    
+    def _error(self, error: Exception) -> Dict[str, Any]:
+        """Build the result of a failed run."""
+        logger.exception(f"Error executing flow: {str(error)}")
+        FLOW_ERRORS.inc(flow_id=self.flow_id)
+        return self._finish_run({"error": str(error)})
+    
+    def _collect_output_results(self, plan: ExecutionPlan) -> Dict[str, Any]:
+        """Return the artifacts of all output nodes."""
+        output_results = {}
+        
+        for index in plan.outputs:
+            node_id = plan.steps[index].id
+            if node_id in self.artifacts:
+                output_results[node_id] = self.artifacts[node_id]
+        
+        return output_results
+    
+    def execute(self, input_data: Dict[str, Any], run_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Execute the flow and return the results.
         
         Args:
             input_data: Input data for the flow
-            
+            run_id: ID to store the run's artifacts under. Generated if omitted.
+        
         Returns:
-            Dict containing the results of the flow execution
+            Dict containing the output-node results of the flow execution and
+            the run_id under which all node artifacts were stored
         """
+        started = time.perf_counter()
+        # Clear artifacts from previous runs
+        self._start_run(run_id)
+        
         try:
-            # Get nodes in execution order
-            execution_order = self.graph.topological_sort()
-            
-            # Clear artifacts from previous runs
-            self.artifacts = {}
+            plan = self._plan()
             
             # Add input data to artifacts
             self.artifacts["input"] = input_data
             
-            # Execute each node in order
-            for node in execution_order:
-                logger.info(f"Executing node: {node.id} ({node.type})")
+            # Execute each step in order
+            for step in plan.steps:
+                # Reuse the memoized artifact if nothing upstream changed
+                result = self._memoized(plan, step, input_data)
+                if result is not MISSING:
+                    self.artifacts[step.id] = result
+                    continue
                 
-                # Get inputs from connected nodes
-                node_inputs = {}
-                input_edges = self.graph.get_node_inputs(node.id)
+                logger.info(f"Executing node: {step.id} ({step.type})")
                 
-                for edge in input_edges:
-                    source_node_id = edge.source
-                    source_handle = edge.sourceHandle
-                    target_handle = edge.targetHandle
-                    
-                    # Get the output from the source node
-                    if source_node_id in self.artifacts:
-                        source_output = self.artifacts[source_node_id]
-                        
-                        # If this is a chat input node, use the input data
-                        if self.graph.get_node(source_node_id).type == "chat_input":
-                            node_inputs["input_text"] = input_data.get("input", "")
-                        else:
-                            # Otherwise, use the output from the source node
-                            node_inputs[target_handle or "input"] = source_output
+                # Get inputs from connected nodes
+                node_inputs = self._collect_node_inputs(plan, step)
                 
                 # Build and execute the LangChain component
-                result = self._build_langchain_component(node, node_inputs)
+                node_started = time.perf_counter()
+                result = self._build_langchain_component(step, node_inputs, input_data)
+                if inspect.isawaitable(result):
+                    # Close the coroutine so it is not reported as never awaited
+                    getattr(result, "close", lambda: None)()
+                    raise TypeError(f"Node {step.id} ({step.type}) runs asynchronously; use execute_async")
+                NODE_LATENCY.observe(time.perf_counter() - node_started, node_type=step.type)
                 
                 # Store the result in artifacts
-                self.artifacts[node.id] = result
+                self.artifacts[step.id] = result
+                self._memoize(step, result)
             
-            # Find output nodes and return their results
-            output_nodes = [node for node in self.graph.nodes if node.type == "chat_output"]
-            output_results = {}
+            FLOW_LATENCY.observe(time.perf_counter() - started, flow_id=self.flow_id)
+            result = self._result(plan, plan.execution_order)
+        
+        except Exception as e:
+            result = self._error(e)
+        
+        if self.artifact_store is not None:
+            self.artifact_store.put(self.run_id, self.artifacts)
+        return result
+    
+    async def _run_node_async(
+        self,
+        step: PlanStep,
+        node_inputs: Dict[str, Any],
+        input_data: Dict[str, Any],
+        semaphore: Optional[asyncio.Semaphore]
+    ) -> Any:
+        """Build a single node, honouring the concurrency cap.
+        
+        Builders may return an awaitable (e.g. an LLM call), which is awaited
+        while the semaphore slot is held.
+        """
+        if semaphore is None:
+            return await self._build_timed(step, node_inputs, input_data)
+        
+        async with semaphore:
+            return await self._build_timed(step, node_inputs, input_data)
+    
+    async def _build_timed(self, step: PlanStep, node_inputs: Dict[str, Any], input_data: Dict[str, Any]) -> Any:
+        """Build a node, awaiting its result if needed, and record its latency."""
+        started = time.perf_counter()
+        result = self._build_langchain_component(step, node_inputs, input_data)
+        if inspect.isawaitable(result):
+            result = await result
+        NODE_LATENCY.observe(time.perf_counter() - started, node_type=step.type)
+        return result
+    
+    async def execute_async(
+        self,
+        input_data: Dict[str, Any],
+        max_concurrency: Optional[int] = None,
+        run_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Execute the flow concurrently and return the results.
+        
+        Each node is started as soon as all of its upstream nodes have
+        finished, so independent branches run in parallel. The first node
+        failure cancels every node still running and ends the run.
+        
+        Args:
+            input_data: Input data for the flow
+            max_concurrency: Cap on nodes running at once for this run.
+                Defaults to the executor's max_concurrency.
+            run_id: ID to store the run's artifacts under. Generated if omitted.
+        
+        Returns:
+            Dict containing the results of the flow execution, in the same
+            shape as execute(). execution_order lists nodes in completion order.
+        """
+        limit = max_concurrency if max_concurrency is not None else self.max_concurrency
+        semaphore = asyncio.Semaphore(limit) if limit else None
+        running: Dict[asyncio.Future, int] = {}
+        execution_order: List[str] = []
+        
+        started = time.perf_counter()
+        
+        # Clear artifacts from previous runs
+        self._start_run(run_id)
+        
+        try:
+            plan = self._plan()
             
-            for node in output_nodes:
-                if node.id in self.artifacts:
-                    output_results[node.id] = self.artifacts[node.id]
+            def start(index: int) -> None:
+                step = plan.steps[index]
+                memoized = self._memoized(plan, step, input_data)
+                if memoized is not MISSING:
+                    # Resolve immediately; the node is finished like any other below
+                    task = asyncio.get_running_loop().create_future()
+                    task.set_result(memoized)
+                    running[task] = index
+                    return
+                
+                logger.info(f"Executing node: {step.id} ({step.type})")
+                node_inputs = self._collect_node_inputs(plan, step)
+                task = asyncio.ensure_future(self._run_node_async(step, node_inputs, input_data, semaphore))
+                running[task] = index
             
-            return {
-                "results": output_results,
-                "artifacts": self.artifacts,
-                "execution_order": [node.id for node in execution_order]
-            }
+            self.artifacts["input"] = input_data
+            
+            # Number of unfinished upstream steps per step
+            waiting = [len(step.upstream) for step in plan.steps]
+            
+            for index in plan.roots:
+                start(index)
+            
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                # Retrieve every exception of the batch, not just the first one raised
+                errors = [error for error in (task.exception() for task in done) if error is not None]
+                if errors:
+                    # Cancels the rest below
+                    raise errors[0]
+                for task in done:
+                    index = running.pop(task)
+                    step = plan.steps[index]
+                    result = task.result()
+                    self.artifacts[step.id] = result
+                    if step.id not in self.reused:
+                        self._memoize(step, result)
+                    execution_order.append(step.id)
+                    
+                    for dependent in step.dependents:
+                        waiting[dependent] -= 1
+                        if waiting[dependent] == 0:
+                            start(dependent)
+            
+            FLOW_LATENCY.observe(time.perf_counter() - started, flow_id=self.flow_id)
+            result = self._result(plan, execution_order)
         
         except Exception as e:
-            logger.exception(f"Error executing flow: {str(e)}")
-            return {
-                "error": str(e),
-                "artifacts": self.artifacts
-            } 
\ No newline at end of file
+            result = self._error(e)
+        
+        finally:
+            # Cancel whatever is still in flight after a failure or cancellation
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+        
+        if self.artifact_store is not None:
+            # Encoding and spilling to disk happen off the event loop
+            await self.artifact_store.put_async(self.run_id, self.artifacts)
+        return result
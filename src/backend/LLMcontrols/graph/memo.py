@@ -0,0 +1,88 @@
+from typing import Any
+from collections import OrderedDict
+import threading
+
+# Marker distinguishing a cached None artifact from a cache miss
+MISSING = object()
+
+
+class ArtifactCache:
+    """Bounded LRU of node artifacts keyed by node fingerprint.
+    
+    A fingerprint covers a node's type, data and the fingerprints of its
+    upstream nodes, so a cached artifact stays valid for as long as nothing
+    upstream of the node changes.
+    """
+    
+    def __init__(self, max_entries: int = 1024):
+        """Initialize the cache.
+        
+        Args:
+            max_entries: Maximum number of artifacts kept.
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, fingerprint: str) -> Any:
+        """Return the artifact for a fingerprint, or MISSING."""
+        with self._lock:
+            if fingerprint in self._entries:
+                self._entries.move_to_end(fingerprint)
+                self.hits += 1
+                return self._entries[fingerprint]
+            self.misses += 1
+            return MISSING
+    
+    def set(self, fingerprint: str, artifact: Any) -> None:
+        """Store the artifact produced for a fingerprint."""
+        with self._lock:
+            self._entries[fingerprint] = artifact
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class FlowArtifactCaches:
+    """One ArtifactCache per flow, keeping the most recently used flows."""
+    
+    def __init__(self, max_flows: int = 128, max_entries_per_flow: int = 1024):
+        """Initialize the collection.
+        
+        Args:
+            max_flows: Maximum number of flows with a cache.
+            max_entries_per_flow: Size of each flow's ArtifactCache.
+        """
+        self.max_flows = max_flows
+        self.max_entries_per_flow = max_entries_per_flow
+        self._caches: "OrderedDict[str, ArtifactCache]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def for_flow(self, flow_id: str) -> ArtifactCache:
+        """Return the cache of a flow, creating it if needed.
+        
+        The cache outlives flow versions: fingerprints cover node data, so
+        after an edit the unchanged nodes still find their artifacts.
+        """
+        with self._lock:
+            cache = self._caches.get(flow_id)
+            if cache is None:
+                cache = self._caches[flow_id] = ArtifactCache(self.max_entries_per_flow)
+            self._caches.move_to_end(flow_id)
+            while len(self._caches) > self.max_flows:
+                self._caches.popitem(last=False)
+            return cache
+    
+    def discard(self, flow_id: str) -> None:
+        """Drop the cache of a flow, e.g. when the flow is deleted."""
+        with self._lock:
+            self._caches.pop(flow_id, None)
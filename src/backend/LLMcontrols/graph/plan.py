@@ -0,0 +1,310 @@
+from typing import Dict, List, Any, Iterator, Optional, Sequence, Tuple
+from array import array
+
+from .base import Graph, CycleError, _intern
+
+# Bumped when the stored plan layout changes; older plans are recompiled
+PLAN_FORMAT = 2
+
+
+class FlowCompileError(ValueError):
+    """Raised when a flow cannot be compiled into an execution plan."""
+    
+    def __init__(self, errors: List[str]):
+        """Initialize the error.
+        
+        Args:
+            errors: Every problem found in the flow.
+        """
+        self.errors = errors
+        super().__init__("; ".join(errors))
+
+
+def _csr(rows: Sequence[Sequence[Any]], typecode: Optional[str] = "i") -> Tuple[array, Any]:
+    """Flatten per-step lists into (offsets, values); row i is values[offsets[i]:offsets[i + 1]]."""
+    offsets = array("i", [0])
+    values: Any = array(typecode) if typecode else []
+    for row in rows:
+        values.extend(row)
+        offsets.append(len(values))
+    return offsets, values
+
+
+class PlanStep:
+    """One node of an execution plan, with its wiring resolved to step indices.
+    
+    A view into the plan's columns, created on access; steps hold no data
+    of their own.
+    """
+    
+    __slots__ = ("plan", "index")
+    
+    def __init__(self, plan: "ExecutionPlan", index: int):
+        self.plan = plan
+        self.index = index
+    
+    @property
+    def id(self) -> str:
+        return self.plan.ids[self.index]
+    
+    @property
+    def type(self) -> str:
+        return self.plan.types[self.index]
+    
+    @property
+    def data(self) -> Dict[str, Any]:
+        return self.plan.data[self.index]
+    
+    @property
+    def inputs(self) -> Tuple[Tuple[str, int], ...]:
+        """(input handle, index of the step feeding it); the last edge into a handle wins."""
+        plan, index = self.plan, self.index
+        start, end = plan.input_offsets[index], plan.input_offsets[index + 1]
+        return tuple(zip(plan.input_handles[start:end], plan.input_sources[start:end]))
+    
+    @property
+    def upstream(self) -> Sequence[int]:
+        """Indices of the distinct steps this one waits for."""
+        offsets = self.plan.upstream_offsets
+        return self.plan.upstream[offsets[self.index]:offsets[self.index + 1]]
+    
+    @property
+    def dependents(self) -> Sequence[int]:
+        """Indices of the distinct steps waiting for this one."""
+        offsets = self.plan.dependent_offsets
+        return self.plan.dependents[offsets[self.index]:offsets[self.index + 1]]
+    
+    def __repr__(self) -> str:
+        return f"PlanStep(id={self.id!r}, type={self.type!r})"
+
+
+class _Steps(Sequence[PlanStep]):
+    """The steps of a plan, as views created on access."""
+    
+    __slots__ = ("_plan",)
+    
+    def __init__(self, plan: "ExecutionPlan"):
+        self._plan = plan
+    
+    def __len__(self) -> int:
+        return len(self._plan.ids)
+    
+    def __getitem__(self, index: int) -> PlanStep:
+        if index < 0:
+            index += len(self._plan.ids)
+        if not 0 <= index < len(self._plan.ids):
+            raise IndexError("plan step index out of range")
+        return PlanStep(self._plan, index)
+    
+    def __iter__(self) -> Iterator[PlanStep]:
+        return (PlanStep(self._plan, index) for index in range(len(self._plan.ids)))
+
+
+class ExecutionPlan:
+    """Immutable, pre-validated form of a flow that executors run directly.
+    
+    Steps are in topological order, and every input binding and dependency
+    is already resolved, so running a plan needs no graph parsing, sorting
+    or edge lookups. Plans are what workers keep cached, so they are stored
+    by column: node types and handles are interned, wiring lives in integer
+    arrays in CSR form, and node data is shared with the flow the plan was
+    built from rather than copied. Step data must not be modified.
+    """
+    
+    __slots__ = (
+        "ids", "types", "data", "order",
+        "input_offsets", "input_handles", "input_sources",
+        "upstream_offsets", "upstream", "dependent_offsets", "dependents",
+        "roots", "outputs", "steps", "_index",
+    )
+    
+    def __init__(
+        self,
+        ids: List[str],
+        types: List[str],
+        data: List[Dict[str, Any]],
+        order: array,
+        inputs: Tuple[array, List[str], array],
+        upstream: Tuple[array, array],
+        dependents: Tuple[array, array],
+        outputs: Sequence[int]
+    ):
+        """Initialize the plan from its columns, one entry per step in topological order.
+        
+        Args:
+            ids: Node ID of each step.
+            types: Node type of each step.
+            data: Node data of each step.
+            order: Position of each step's node in the flow's node list.
+            inputs: (offsets, handles, source step indices) of the input bindings.
+            upstream: (offsets, step indices) of the steps each step waits for.
+            dependents: (offsets, step indices) of the steps waiting for each step.
+            outputs: Indices of the steps whose artifacts are the results of a run.
+        """
+        columns = {
+            "ids": ids,
+            "types": [_intern(node_type) for node_type in types],
+            "data": data,
+            "order": order,
+            "input_offsets": inputs[0],
+            "input_handles": [_intern(handle) for handle in inputs[1]],
+            "input_sources": inputs[2],
+            "upstream_offsets": upstream[0],
+            "upstream": upstream[1],
+            "dependent_offsets": dependents[0],
+            "dependents": dependents[1],
+            "outputs": tuple(outputs),
+            "steps": _Steps(self),
+            "_index": None,
+        }
+        for name, value in columns.items():
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, "roots", tuple(
+            i for i in range(len(ids)) if self.upstream_offsets[i] == self.upstream_offsets[i + 1]
+        ))
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("ExecutionPlan is immutable")
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    @property
+    def index(self) -> Dict[str, int]:
+        """Step index by node ID, built on first use."""
+        if self._index is None:
+            object.__setattr__(self, "_index", {node_id: i for i, node_id in enumerate(self.ids)})
+        return self._index
+    
+    @property
+    def execution_order(self) -> List[str]:
+        return list(self.ids)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the plan to a JSON-serializable dictionary.
+        
+        Node IDs, types and data are not included; they are read back from
+        the flow's nodes, see from_dict.
+        """
+        return {
+            "format": PLAN_FORMAT,
+            "order": self.order.tolist(),
+            "input_offsets": self.input_offsets.tolist(),
+            "input_handles": self.input_handles,
+            "input_sources": self.input_sources.tolist(),
+            "upstream_offsets": self.upstream_offsets.tolist(),
+            "upstream": self.upstream.tolist(),
+            "dependent_offsets": self.dependent_offsets.tolist(),
+            "dependents": self.dependents.tolist(),
+            "outputs": list(self.outputs),
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], nodes: List[Dict[str, Any]]) -> "ExecutionPlan":
+        """Create a plan from to_dict() output and the nodes of the flow it was compiled from.
+        
+        Raises:
+            ValueError: If the plan was stored in another format or does not
+                match the nodes.
+        """
+        if data.get("format") != PLAN_FORMAT:
+            raise ValueError(f"Unsupported plan format: {data.get('format')}")
+        order = array("i", data["order"])
+        if len(order) != len(nodes) or sorted(order) != list(range(len(nodes))):
+            raise ValueError("Plan does not match the flow's nodes")
+        steps = [nodes[position] for position in order]
+        return cls(
+            ids=[node["id"] for node in steps],
+            types=[node["type"] for node in steps],
+            data=[node.get("data", {}) for node in steps],
+            order=order,
+            inputs=(array("i", data["input_offsets"]), data["input_handles"], array("i", data["input_sources"])),
+            upstream=(array("i", data["upstream_offsets"]), array("i", data["upstream"])),
+            dependents=(array("i", data["dependent_offsets"]), array("i", data["dependents"])),
+            outputs=data["outputs"],
+        )
+
+
+def compile_graph(graph: Graph, registry: Any) -> ExecutionPlan:
+    """Validate a graph and compile it into an execution plan.
+    
+    The plan shares the data dicts of the graph's nodes.
+    
+    Args:
+        graph: The graph to compile.
+        registry: Component registry providing a NodeBuilder per node type.
+    
+    Raises:
+        FlowCompileError: Listing every problem found: duplicate node IDs,
+            node types without a builder, edges to missing nodes, cycles and
+            node data rejected by its builder.
+    """
+    errors = []
+    if len(graph.node_map) != len(graph.nodes):
+        seen = set()
+        for node in graph.nodes:
+            if node.id in seen:
+                errors.append(f"Duplicate node ID: {node.id}")
+            seen.add(node.id)
+    
+    builders = {}
+    for node in graph.nodes:
+        builder = registry.get_builder(node.type)
+        if builder is None:
+            errors.append(f"Node {node.id}: unknown node type {node.type!r}")
+        else:
+            builders[node.id] = builder
+    
+    for edge in graph.edges:
+        for end in (edge.source, edge.target):
+            if end not in graph.node_map:
+                errors.append(f"Edge {edge.id}: node {end} does not exist")
+    
+    try:
+        ordered = graph.topological_sort()
+    except CycleError as e:
+        errors.append(str(e))
+        ordered = []
+    
+    index = {node.id: i for i, node in enumerate(ordered)}
+    bindings: List[Dict[str, int]] = [{} for _ in ordered]
+    upstream: List[List[int]] = [[] for _ in ordered]
+    dependents: List[List[int]] = [[] for _ in ordered]
+    for edge in graph.edges:
+        if edge.source not in index or edge.target not in index:
+            continue
+        source, target = index[edge.source], index[edge.target]
+        bindings[target][edge.targetHandle or "input"] = source
+        if source not in upstream[target]:
+            upstream[target].append(source)
+            dependents[source].append(target)
+    
+    for i, node in enumerate(ordered):
+        builder = builders.get(node.id)
+        if builder is not None:
+            errors.extend(f"Node {node.id}: {error}" for error in builder.validate(node.data, list(bindings[i])))
+    
+    if errors:
+        raise FlowCompileError(errors)
+    
+    positions = {id(node): position for position, node in enumerate(graph.nodes)}
+    input_offsets, input_handles = _csr([list(binding) for binding in bindings], typecode=None)
+    return ExecutionPlan(
+        ids=[node.id for node in ordered],
+        types=[node.type for node in ordered],
+        data=[node.data for node in ordered],
+        order=array("i", [positions[id(node)] for node in ordered]),
+        inputs=(input_offsets, input_handles, _csr([list(binding.values()) for binding in bindings])[1]),
+        upstream=_csr(upstream),
+        dependents=_csr(dependents),
+        outputs=[i for i, node in enumerate(ordered) if builders[node.id].is_output],
+    )
+
+
+def compile_flow(flow: Dict[str, Any], registry: Any) -> ExecutionPlan:
+    """Compile a stored flow dictionary into an execution plan.
+    
+    Raises:
+        FlowCompileError: If the flow is invalid, see compile_graph.
+    """
+    return compile_graph(Graph(nodes=flow.get("nodes"), edges=flow.get("edges")), registry)
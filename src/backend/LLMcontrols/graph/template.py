@@ -0,0 +1,71 @@
+from typing import Dict, List, Any, Tuple
+from functools import lru_cache
+import re
+
+# A placeholder is a Python identifier in single braces, e.g. {input}
+PLACEHOLDER_PATTERN = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+
+class CompiledTemplate:
+    """A prompt template parsed once into literal segments and placeholders.
+    
+    Anything that is not a {name} placeholder is kept verbatim, so rendering
+    gives the same text as replacing each placeholder with str.replace.
+    """
+    
+    __slots__ = ("template", "variables", "_parts", "_slots")
+    
+    def __init__(self, template: str):
+        """Parse a template.
+        
+        Args:
+            template: The template text.
+        """
+        self.template = template
+        parts: List[str] = []
+        slots: List[Tuple[int, str]] = []
+        position = 0
+        
+        for match in PLACEHOLDER_PATTERN.finditer(template):
+            parts.append(template[position:match.start()])
+            slots.append((len(parts), match.group(1)))
+            parts.append(match.group(0))
+            position = match.end()
+        parts.append(template[position:])
+        
+        self._parts = parts
+        self._slots = slots
+        # Unique variable names in order of first appearance
+        self.variables: Tuple[str, ...] = tuple(dict.fromkeys(name for _, name in slots))
+    
+    def missing(self, values: Dict[str, Any]) -> List[str]:
+        """Return the template variables that have no value."""
+        return [name for name in self.variables if name not in values]
+    
+    def render(self, values: Dict[str, Any], strict: bool = True) -> str:
+        """Render the template with the given values.
+        
+        Args:
+            values: Values for the template variables.
+            strict: Raise if any variable is missing. When False, placeholders
+                without a value are left in the output unchanged.
+            
+        Raises:
+            ValueError: If strict and any variable has no value.
+        """
+        if strict:
+            missing = self.missing(values)
+            if missing:
+                raise ValueError(f"Missing values for prompt variables: {', '.join(missing)}")
+        
+        parts = self._parts.copy()
+        for index, name in self._slots:
+            if name in values:
+                parts[index] = str(values[name])
+        return "".join(parts)
+
+
+@lru_cache(maxsize=1024)
+def compile_template(template: str) -> CompiledTemplate:
+    """Compile a template, reusing the cached result for identical text."""
+    return CompiledTemplate(template)
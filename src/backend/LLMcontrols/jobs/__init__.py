@@ -0,0 +1,5 @@
+"""Background execution of queued flow runs."""
+
+from .queue import JobQueue
+
+__all__ = ["JobQueue"]
\ No newline at end of file
@@ -0,0 +1,145 @@
+import uuid
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..storage.jobs import JobStore, FINISHED_STATES, QUEUED, RUNNING
+
+logger = logging.getLogger(__name__)
+
+JobRunner = Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class JobQueue:
+    """A bounded pool of workers executing jobs persisted in a JobStore.
+    
+    Workers claim queued jobs from the store, so jobs enqueued before a
+    restart (or by another process sharing the database) are picked up too.
+    While a job runs its worker keeps renewing the job's lease; jobs of a
+    stopped or crashed process are claimed again once their lease expires.
+    """
+    
+    def __init__(
+        self,
+        store: JobStore,
+        runner: JobRunner,
+        workers: int = 4,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 60.0
+    ):
+        """Initialize the queue.
+        
+        Args:
+            store: Persistent job state.
+            runner: Coroutine function called with (job_id, request) that
+                returns the job result. Exceptions, and results with an
+                "error" key, mark the job as failed.
+            workers: Number of jobs executed at once.
+            poll_interval: Seconds between checks of the store for jobs
+                enqueued elsewhere.
+            lease_seconds: How long a running job stays claimed without
+                being renewed; it is renewed every third of this.
+        """
+        self.store = store
+        self.runner = runner
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._finished: Dict[str, asyncio.Event] = {}
+    
+    def start(self) -> None:
+        """Start the workers."""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+    
+    async def stop(self) -> None:
+        """Stop the workers. Jobs they were running are claimed again when their lease expires."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+    
+    def enqueue(self, flow_id: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Persist a new job and wake a worker. Returns the queued job."""
+        job = self.store.create(str(uuid.uuid4()), flow_id, request)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+    
+    async def _work(self) -> None:
+        while True:
+            job = self.store.claim_next(self.lease_seconds)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            heartbeat = asyncio.ensure_future(self._renew(job["id"], job["attempts"]))
+            try:
+                result = await self.runner(job["id"], job["request"])
+                error = result.get("error") if isinstance(result, dict) else None
+                recorded = self.store.finish(job["id"], job["attempts"], result=result, error=error)
+            except asyncio.CancelledError:
+                # Left as running; claimed again once its lease expires
+                raise
+            except Exception as e:
+                logger.exception(f"Job {job['id']} failed: {str(e)}")
+                recorded = self.store.finish(job["id"], job["attempts"], error=str(e))
+            finally:
+                heartbeat.cancel()
+            if not recorded:
+                # The lease expired meanwhile; the job's new claim decides its outcome
+                logger.warning(f"Dropped the outcome of job {job['id']}: its lease expired before it finished")
+            
+            event = self._finished.pop(job["id"], None)
+            if event is not None:
+                event.set()
+    
+    async def _renew(self, job_id: str, attempt: int) -> None:
+        """Keep renewing the lease of a claimed job while the claim holds."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not self.store.renew_lease(job_id, attempt, self.lease_seconds):
+                return
+    
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Wait until a job finishes or the timeout passes, and return its state.
+        
+        Jobs run by this process wake the waiter immediately; others are
+        noticed by polling the store.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        
+        while True:
+            job = self.store.get(job_id)
+            if job is None or job["status"] in FINISHED_STATES:
+                self._finished.pop(job_id, None)
+                return job
+            
+            remaining = self.poll_interval
+            if deadline is not None:
+                remaining = min(remaining, deadline - loop.time())
+                if remaining <= 0:
+                    return job
+            
+            event = self._finished.setdefault(job_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": len(self._tasks) > 0,
+            "queued": self.store.count(QUEUED),
+            "in_progress": self.store.count(RUNNING),
+        }
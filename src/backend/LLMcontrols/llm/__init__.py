@@ -1,5 +1,50 @@
 """LLM integration for the LLMcontrols application."""
 
+import os
+
+from .cache import ResponseCache
+from .coalesce import RequestCoalescer
+from .batch import LLMBatcher
 from .openai import OpenAILLM
+from .pool import LLMClientPool
+from .semantic import SemanticCache, HashingEmbedder
+from .resilience import LLMResilience, CallPolicy, CircuitBreaker, CircuitOpenError, LLMTimeoutError
+from .fake import FakeChatModel
+from .scheduler import LLMScheduler, PRIORITY_INTERACTIVE, PRIORITY_BATCH
+
+# Set LLM_CACHE_DB to a file path to persist cached responses across restarts
+response_cache = ResponseCache(db_path=os.getenv("LLM_CACHE_DB"))
+request_coalescer = RequestCoalescer()
+# Used by LLM nodes and chat requests that opt in; NumPy is only loaded on first use
+semantic_cache = SemanticCache(
+    threshold=float(os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", "0.95")),
+    max_entries=int(os.getenv("LLM_SEMANTIC_CACHE_SIZE", "4096"))
+)
+# Per API key and model; set LLM_REQUESTS_PER_MINUTE / LLM_TOKENS_PER_MINUTE to your quota.
+# The quota is split evenly between server worker processes (LLMCONTROLS_WORKERS).
+_workers = max(1, int(os.getenv("LLMCONTROLS_WORKERS", "1")))
+llm_scheduler = LLMScheduler(
+    requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", "3500")) / _workers,
+    tokens_per_minute=float(os.getenv("LLM_TOKENS_PER_MINUTE", "200000")) / _workers
+)
+# Defaults for every LLM call; LLM nodes and chat requests can override timeout and hedging
+llm_resilience = LLMResilience(
+    timeout=float(os.getenv("LLM_TIMEOUT", "60")),
+    hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "0")),
+    error_rate=float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5")),
+    cooldown=float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+)
+client_pool = LLMClientPool(
+    response_cache=response_cache,
+    coalescer=request_coalescer,
+    scheduler=llm_scheduler,
+    semantic_cache=semantic_cache,
+    resilience=llm_resilience
+)
 
-__all__ = ["OpenAILLM"] 
\ No newline at end of file
+__all__ = [
+    "OpenAILLM", "LLMClientPool", "ResponseCache", "RequestCoalescer", "LLMBatcher", "LLMScheduler",
+    "SemanticCache", "HashingEmbedder", "PRIORITY_INTERACTIVE", "PRIORITY_BATCH",
+    "LLMResilience", "CallPolicy", "CircuitBreaker", "CircuitOpenError", "LLMTimeoutError", "FakeChatModel",
+    "client_pool", "response_cache", "request_coalescer", "llm_scheduler", "semantic_cache", "llm_resilience",
+]
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""Micro-batching of LLM calls made by concurrent runs of a flow."""
+
+import asyncio
+from typing import Any, Dict, Hashable, List, Optional
+
+from .openai import OpenAILLM
+
+
+class _Batch:
+    """Calls waiting to be sent together in one generate_batch."""
+    
+    __slots__ = ("client", "options", "prompts", "futures", "timer")
+    
+    def __init__(self, client: OpenAILLM, options: Dict[str, Any]):
+        self.client = client
+        self.options = options
+        self.prompts: List[str] = []
+        self.futures: List[asyncio.Future] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class LLMBatcher:
+    """Send concurrent generate() calls with the same key as generate_batch calls.
+    
+    Callers with equal keys must use the same client and options, e.g. runs
+    of one LLM step of a flow. A batch is sent once max_batch_size calls are
+    waiting, or max_wait seconds after its first call, whichever comes
+    first; runs of a batch that reach the step at about the same time thus
+    share one request.
+    """
+    
+    def __init__(self, max_batch_size: int = 8, max_wait: float = 0.01):
+        """Initialize the batcher.
+        
+        Args:
+            max_batch_size: Most prompts sent in one batched call.
+            max_wait: Seconds the first call of a batch waits for others.
+        """
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self._pending: Dict[Hashable, _Batch] = {}
+        self._sending: List[asyncio.Task] = []
+        self.calls = 0
+        self.batches = 0
+    
+    async def generate(
+        self,
+        key: Hashable,
+        client: OpenAILLM,
+        prompt: str,
+        options: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Generate a response to a prompt as part of the next batch for its key.
+        
+        Args:
+            key: Identity of the client and options; see the class docstring.
+            client: Client sending the batch.
+            prompt: The prompt.
+            options: Keyword arguments of generate_batch.
+        
+        Returns:
+            The response dictionary generate_batch returned for the prompt.
+        """
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _Batch(client, options)
+            batch.timer = asyncio.get_running_loop().call_later(self.max_wait, self._send, key, batch)
+        
+        future = asyncio.get_running_loop().create_future()
+        batch.prompts.append(prompt)
+        batch.futures.append(future)
+        self.calls += 1
+        if len(batch.prompts) >= self.max_batch_size:
+            self._send(key, batch)
+        return await future
+    
+    def _send(self, key: Hashable, batch: _Batch) -> None:
+        """Start the batched call of a batch that is full or done waiting."""
+        if self._pending.get(key) is not batch:
+            return
+        del self._pending[key]
+        batch.timer.cancel()
+        self.batches += 1
+        task = asyncio.ensure_future(self._run(batch))
+        self._sending.append(task)
+        task.add_done_callback(self._sending.remove)
+    
+    @staticmethod
+    async def _run(batch: _Batch) -> None:
+        try:
+            responses = await batch.client.generate_batch(batch.prompts, **batch.options)
+        except Exception as e:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, response in zip(batch.futures, responses):
+            # Callers that were cancelled no longer wait for their response
+            if not future.done():
+                future.set_result(response)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "batches": self.batches,
+            "average_batch_size": self.calls / self.batches if self.batches else 0.0,
+        }
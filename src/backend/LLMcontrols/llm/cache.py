@@ -0,0 +1,194 @@
+"""Response cache for deterministic LLM calls."""
+
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(text: Optional[str]) -> str:
+    """Normalize prompt text so trivially different copies share a cache entry.
+    
+    Line endings are unified and trailing whitespace is removed from each line
+    and from both ends of the text; everything else is kept verbatim.
+    """
+    if not text:
+        return ""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+class ResponseCache:
+    """Two-tier LLM response cache.
+    
+    The first tier is an in-memory LRU. The optional second tier is a SQLite
+    database that survives restarts. Both tiers expire entries after a TTL;
+    the SQLite tier additionally evicts least recently used rows once it
+    holds more than max_disk_entries.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: Optional[float] = 24 * 3600,
+        db_path: Optional[str] = None,
+        max_disk_entries: int = 100_000,
+        clock: Callable[[], float] = time.time
+    ):
+        """Initialize the cache.
+        
+        Args:
+            max_entries: Maximum number of entries kept in memory.
+            ttl: Seconds an entry stays valid. None disables expiry.
+            db_path: Path of the SQLite database. None disables the disk tier.
+            max_disk_entries: Maximum number of rows kept in the SQLite tier.
+            clock: Wall-clock time source, injectable for tests.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+        self._clock = clock
+        self._memory: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        
+        if db_path:
+            # Other worker processes may hold the write lock briefly; wait for it
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+            if db_path != ":memory:":
+                self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at)"
+            )
+            self._db.commit()
+    
+    @staticmethod
+    def make_key(
+        model: str,
+        temperature: float,
+        prompt: str,
+        system_message: Optional[str] = None
+    ) -> str:
+        """Build the cache key for a call."""
+        payload = json.dumps(
+            [model, float(temperature), normalize_prompt(prompt), normalize_prompt(system_message)],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at >= self.ttl
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for a key, or None on a miss."""
+        now = self._clock()
+        
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+            
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if not self._expired(row[1], now):
+                        self._db.execute(
+                            "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+                        )
+                        self._db.commit()
+                        value = json.loads(row[0])
+                        self._store_memory(key, value, row[1])
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return value
+                    self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._db.commit()
+            
+            self.misses += 1
+            return None
+    
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a response under a key in every enabled tier."""
+        now = self._clock()
+        
+        with self._lock:
+            self._store_memory(key, value, now)
+            
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at)"
+                        " VALUES (?, ?, ?, ?)",
+                        (key, json.dumps(value), now, now)
+                    )
+                    self._evict_disk(now)
+                    self._db.commit()
+                except (TypeError, ValueError) as e:
+                    logger.warning(f"Could not persist LLM response to cache: {str(e)}")
+    
+    def _store_memory(self, key: str, value: Dict[str, Any], created_at: float) -> None:
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+    
+    def _evict_disk(self, now: float) -> None:
+        """Remove expired rows, then the least recently used rows over the size cap."""
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM llm_cache WHERE created_at <= ?", (now - self.ttl,))
+        
+        count = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if count > self.max_disk_entries:
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_disk_entries,)
+            )
+    
+    def clear(self) -> None:
+        """Remove every entry from all tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and tier sizes."""
+        with self._lock:
+            disk_entries = None
+            if self._db is not None:
+                disk_entries = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
@@ -0,0 +1,80 @@
+"""Single-flight coalescing of identical in-flight LLM requests."""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """An upstream call shared by every caller with the same key."""
+    
+    __slots__ = ("task", "waiters")
+    
+    def __init__(self, task: "asyncio.Future"):
+        self.task = task
+        self.waiters = 0
+
+
+class RequestCoalescer:
+    """Share one upstream call between concurrent callers with the same key.
+    
+    The first caller for a key starts the call; callers arriving while it is
+    in flight await the same result. A caller that is cancelled (e.g. its
+    client disconnected) stops waiting without affecting the others, and the
+    upstream call is only cancelled once every caller has gone.
+    """
+    
+    def __init__(self):
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.abandoned = 0
+    
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Run factory() for a key, or join the call already in flight.
+        
+        Args:
+            key: Identity of the call; equal keys share one upstream call.
+            factory: Creates the upstream call. Only invoked by the first caller.
+            
+        Returns:
+            A (result, shared) tuple, where shared is True when this caller
+            joined a call started by someone else.
+        """
+        flight = self._inflight.get(key)
+        shared = flight is not None
+        
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        
+        flight.waiters += 1
+        try:
+            # Shield so one caller's cancellation does not cancel the shared call
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every caller has gone; nobody needs the result any more
+                self.abandoned += 1
+                self._forget(key, flight)
+                flight.task.cancel()
+    
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return counters for upstream calls, coalesced callers and abandoned calls."""
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+            "in_flight": len(self._inflight),
+        }
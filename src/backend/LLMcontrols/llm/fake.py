@@ -0,0 +1,85 @@
+"""Local stand-in for a LangChain chat model, for tests and benchmarks."""
+
+import random
+import asyncio
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Union
+
+
+class FakeProviderError(RuntimeError):
+    """Injected upstream failure of a FakeChatModel, with an HTTP status like the OpenAI client's errors."""
+    
+    def __init__(self, status_code: int = 500):
+        self.status_code = status_code
+        super().__init__(f"Injected provider failure (HTTP {status_code})")
+
+
+class FakeChatModel:
+    """Answers every prompt with an echo after an injected latency.
+    
+    Implements the agenerate and astream methods OpenAILLM uses, so an
+    OpenAILLM can run against it without network access. Latency and
+    failures are drawn per request, which makes timeouts, hedging and
+    circuit breaking reproducible with a seed.
+    """
+    
+    def __init__(
+        self,
+        latency: Union[float, Callable[[random.Random], float]] = 0.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+        error_status: int = 500,
+        chunk_latency: float = 0.0
+    ):
+        """Initialize the fake model.
+        
+        Args:
+            latency: Seconds per request, or a function drawing them from a
+                random generator (e.g. lambda rng: rng.lognormvariate(-3, 1)).
+            error_rate: Fraction of requests that fail with FakeProviderError.
+            seed: Seed of the random generator, for reproducible runs.
+            sleep: Async sleep function used to wait out the latency.
+            error_status: HTTP status of the injected failures, e.g. 401 to
+                simulate a bad API key rather than a provider outage.
+            chunk_latency: Seconds between streamed chunks after the first.
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self._sleep = sleep
+        self.error_status = error_status
+        self.chunk_latency = chunk_latency
+        self.calls = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+    
+    async def _respond(self) -> None:
+        """Wait out one request's latency and raise its injected failure, if any."""
+        self.calls += 1
+        delay = self.latency(self.rng) if callable(self.latency) else self.latency
+        fails = self.rng.random() < self.error_rate
+        try:
+            await self._sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if fails:
+            self.failed += 1
+            raise FakeProviderError(self.error_status)
+        self.completed += 1
+    
+    async def agenerate(self, messages: List[List[Any]]) -> Any:
+        await self._respond()
+        return SimpleNamespace(
+            generations=[[SimpleNamespace(text=f"echo: {batch[-1].content}")] for batch in messages],
+            llm_output={"token_usage": {}}
+        )
+    
+    async def astream(self, messages: List[Any]) -> AsyncIterator[Any]:
+        await self._respond()
+        for index, word in enumerate(f"echo: {messages[-1].content}".split(" ")):
+            if index and self.chunk_latency:
+                await self._sleep(self.chunk_latency)
+            yield SimpleNamespace(content=word + " ")
@@ -1,9 +1,32 @@
 """OpenAI LLM integration."""
 
 import os
-from typing import Dict, Any, Optional
-from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage
+import time
+import asyncio
+import hashlib
+import functools
+from typing import Dict, Any, AsyncIterator, Awaitable, List, Optional
+
+from .cache import ResponseCache
+from .semantic import SemanticCache
+from .resilience import CallGuard, CallPolicy, CircuitOpenError, LLMResilience, LLMTimeoutError
+from .coalesce import RequestCoalescer
+from .scheduler import LLMScheduler, PRIORITY_INTERACTIVE, PRIORITY_BATCH, is_request_error
+from ..metrics import LLM_LATENCY, LLM_TOKENS, LLM_ERRORS
+
+@functools.lru_cache(maxsize=None)
+def _langchain():
+    """Import the LangChain classes on first use.
+    
+    Importing LangChain takes seconds, so it is deferred until an LLM is
+    actually called rather than paid at server startup.
+    """
+    from langchain_openai import ChatOpenAI
+    from langchain.schema import HumanMessage
+    return ChatOpenAI, HumanMessage
+
+def _human_message(content: str):
+    return _langchain()[1](content=content)
 
 class OpenAILLM:
     """OpenAI LLM integration for LLMcontrols."""
@@ -13,7 +36,13 @@ class OpenAILLM:
         model_name: str = "gpt-3.5-turbo",
         temperature: float = 0.7,
         api_key: Optional[str] = None,
-        streaming: bool = False
+        streaming: bool = False,
+        cache: Optional[ResponseCache] = None,
+        coalescer: Optional[RequestCoalescer] = None,
+        scheduler: Optional[LLMScheduler] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        resilience: Optional[LLMResilience] = None,
+        chat_model: Any = None
     ):
         """Initialize the OpenAI LLM.
         
@@ -22,41 +51,252 @@ class OpenAILLM:
             temperature: The temperature to use for sampling.
             api_key: The OpenAI API key. If not provided, it will be read from the environment.
             streaming: Whether to stream the response.
+            cache: Optional response cache consulted by generate().
+            coalescer: Optional coalescer that merges identical concurrent
+                generate() calls into one upstream request.
+            scheduler: Optional scheduler every upstream call waits on to
+                stay within rate limits.
+            semantic_cache: Optional cache of responses to similar prompts,
+                consulted by calls that opt in with use_semantic_cache.
+            resilience: Optional deadlines, hedging and circuit breaking
+                applied to every upstream call.
+            chat_model: LangChain-compatible chat model to call instead of
+                creating a ChatOpenAI, e.g. a FakeChatModel in tests.
         """
         self.model_name = model_name
         self.temperature = temperature
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         self.streaming = streaming
+        self.cache = cache
+        self.coalescer = coalescer
+        self.scheduler = scheduler
+        self.semantic_cache = semantic_cache
+        self.resilience = resilience
         
         if not self.api_key:
             raise ValueError(
                 "OpenAI API key not provided. Please provide it as an argument or set the OPENAI_API_KEY environment variable."
             )
         
-        # Initialize the LLM
-        self.llm = ChatOpenAI(
-            model_name=model_name,
-            temperature=temperature,
-            openai_api_key=self.api_key,
-            streaming=streaming
+        # Identifies this configuration without keeping the raw key in coalescing keys
+        self._api_key_hash = hashlib.sha256(self.api_key.encode("utf-8")).hexdigest()
+        
+        # The LangChain client is created on first use, see the llm property
+        self._llm = chat_model
+    
+    @property
+    def llm(self):
+        """The underlying LangChain chat model, created on first access."""
+        if self._llm is None:
+            ChatOpenAI = _langchain()[0]
+            llm_kwargs = {}
+            if self.scheduler is not None:
+                # The scheduler retries rate-limited and transient failures itself,
+                # honouring Retry-After and without holding a rate-limit slot meanwhile
+                llm_kwargs["max_retries"] = 0
+            self._llm = ChatOpenAI(
+                model_name=self.model_name,
+                temperature=self.temperature,
+                openai_api_key=self.api_key,
+                streaming=self.streaming,
+                **llm_kwargs
+            )
+        return self._llm
+    
+    def should_cache(self, use_cache: Optional[bool] = None) -> bool:
+        """Whether a call may be served from and stored in the response cache.
+        
+        Caching is on when explicitly requested, and otherwise only for
+        deterministic (temperature 0) calls.
+        """
+        if self.cache is None:
+            return False
+        if use_cache is not None:
+            return use_cache
+        return float(self.temperature) == 0.0
+    
+    def _semantic_scope(self, use_semantic_cache: bool, system_message: Optional[str] = None):
+        """The semantic cache scope of a call, or None if the call does not use it."""
+        if not use_semantic_cache or self.semantic_cache is None:
+            return None
+        return SemanticCache.make_scope(self.model_name, self.temperature, system_message, self._api_key_hash)
+    
+    @staticmethod
+    def _semantic_hit(cached: Dict[str, Any], similarity: float, prompt: str) -> Dict[str, Any]:
+        """A response served from the semantic cache for another, similar prompt."""
+        return {
+            **cached,
+            "prompt": prompt,
+            "metadata": {
+                **(cached.get("metadata") or {}),
+                "cached": True,
+                "semantic": True,
+                "similarity": similarity,
+                "matched_prompt": cached.get("prompt"),
+            }
+        }
+    
+    @staticmethod
+    def estimate_tokens(*prompts: str) -> int:
+        """Rough token estimate (about four characters per token) for rate limiting."""
+        return sum(len(prompt) // 4 + 1 for prompt in prompts)
+    
+    async def _scheduled(self, call, tokens: int, priority: int) -> Any:
+        """Run an upstream call through the scheduler, if there is one."""
+        if self.scheduler is None:
+            return await call()
+        return await self.scheduler.submit(
+            (self._api_key_hash, self.model_name),
+            call,
+            tokens=tokens,
+            priority=priority,
+            tokens_used=lambda response: (
+                (getattr(response, "llm_output", None) or {}).get("token_usage", {}).get("total_tokens")
+            )
         )
     
-    async def generate(self, prompt: str) -> Dict[str, Any]:
+    async def _upstream(
+        self,
+        call,
+        tokens: int,
+        priority: int,
+        policy: Optional[CallPolicy] = None,
+        track_latency: bool = True
+    ) -> Any:
+        """Run an upstream call through the scheduler and the resilience layer, if any."""
+        if self.resilience is None:
+            return await self._scheduled(call, tokens, priority)
+        
+        def attempt(guard: CallGuard) -> Awaitable[Any]:
+            async def send() -> Any:
+                # Time queued before this point doesn't count against the provider
+                guard.mark_sent()
+                return await call()
+            return self._scheduled(send, tokens, priority)
+        
+        return await self.resilience.call(self.model_name, attempt, policy, track_latency=track_latency)
+    
+    def _error(self, error: Exception, prompt: str) -> Dict[str, Any]:
+        """Build the response of a failed call."""
+        # Rejected calls never reached the provider
+        if not isinstance(error, CircuitOpenError):
+            LLM_ERRORS.inc(model=self.model_name)
+        return {
+            "error": str(error),
+            "model": self.model_name,
+            "prompt": prompt
+        }
+    
+    async def generate(
+        self,
+        prompt: str,
+        system_message: Optional[str] = None,
+        use_cache: Optional[bool] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        use_semantic_cache: bool = False,
+        semantic_threshold: Optional[float] = None,
+        policy: Optional[CallPolicy] = None
+    ) -> Dict[str, Any]:
         """Generate a response from the LLM.
         
         Args:
             prompt: The prompt to send to the LLM.
-            
+            system_message: Optional system message prepended to the prompt.
+            use_cache: Force the response cache on or off. By default it is
+                only used when the temperature is 0.
+            priority: Scheduling priority of the call; lower is served first.
+            use_semantic_cache: Answer from the semantic cache when a similar
+                prompt was seen before, and store the response there.
+            semantic_threshold: Minimum similarity of a semantic cache hit;
+                defaults to the cache's threshold.
+            policy: Deadline, hedging and circuit breaker settings of the
+                call; defaults to those of the resilience layer.
+        
         Returns:
             A dictionary containing the generated text and metadata.
         """
+        cache_key = None
+        if self.should_cache(use_cache):
+            cache_key = ResponseCache.make_key(
+                self.model_name, self.temperature, prompt, system_message
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                response = dict(cached)
+                response["metadata"] = {**(cached.get("metadata") or {}), "cached": True}
+                return response
+        
+        semantic_scope = self._semantic_scope(use_semantic_cache, system_message)
+        semantic_prompt = prompt
+        if semantic_scope is not None:
+            hit = self.semantic_cache.get(semantic_scope, prompt, semantic_threshold)
+            if hit is not None:
+                full_prompt = f"{system_message}\n\n{prompt}" if system_message else prompt
+                return self._semantic_hit(*hit, full_prompt)
+        
+        if system_message:
+            prompt = f"{system_message}\n\n{prompt}"
+        
+        if self.coalescer is not None:
+            coalesce_key = (self.model_name, float(self.temperature), self._api_key_hash, prompt)
+            response, shared = await self.coalescer.run(
+                coalesce_key, lambda: self._generate(prompt, priority, policy)
+            )
+            if shared:
+                # Give each caller its own copy of the shared response
+                response = {**response, "metadata": {**(response.get("metadata") or {}), "coalesced": True}}
+                return response
+        else:
+            response = await self._generate(prompt, priority, policy)
+        
+        if cache_key is not None and "error" not in response:
+            self.cache.set(cache_key, response)
+        if semantic_scope is not None and "error" not in response:
+            self.semantic_cache.set(semantic_scope, semantic_prompt, response)
+        
+        return response
+    
+    def _estimated_usage(self, prompt: str, completion: str) -> Dict[str, Any]:
+        """Token usage of a call estimated from its text, for responses without provider usage."""
+        prompt_tokens = self.estimate_tokens(prompt)
+        completion_tokens = self.estimate_tokens(completion) if completion else 0
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "estimated": True,
+        }
+    
+    def _record_usage(self, token_usage: Dict[str, Any]) -> None:
+        """Add provider-reported token counts to the token metrics."""
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if token_usage.get(kind):
+                LLM_TOKENS.inc(token_usage[kind], model=self.model_name, kind=kind)
+    
+    async def _generate(
+        self,
+        prompt: str,
+        priority: int = PRIORITY_INTERACTIVE,
+        policy: Optional[CallPolicy] = None
+    ) -> Dict[str, Any]:
+        """Send a prompt to the model without consulting the cache."""
+        started = time.perf_counter()
         try:
             # Create a human message from the prompt
-            message = HumanMessage(content=prompt)
+            message = _human_message(prompt)
             
             # Generate a response
-            response = await self.llm.agenerate([[message]])
+            response = await self._upstream(
+                lambda: self.llm.agenerate([[message]]),
+                self.estimate_tokens(prompt),
+                priority,
+                policy
+            )
             generated_text = response.generations[0][0].text
+            token_usage = (getattr(response, "llm_output", None) or {}).get("token_usage", {})
+            
+            LLM_LATENCY.observe(time.perf_counter() - started, model=self.model_name)
+            self._record_usage(token_usage)
             
             return {
                 "text": generated_text,
@@ -64,12 +304,247 @@ class OpenAILLM:
                 "prompt": prompt,
                 "metadata": {
                     "temperature": self.temperature,
-                    "tokens_used": getattr(response, "llm_output", {}).get("token_usage", {})
+                    "tokens_used": token_usage
                 }
             }
         except Exception as e:
-            return {
-                "error": str(e),
-                "model": self.model_name,
-                "prompt": prompt
-            } 
\ No newline at end of file
+            return self._error(e, prompt)
+    
+    async def generate_batch(
+        self,
+        prompts: List[str],
+        use_cache: Optional[bool] = None,
+        use_semantic_cache: bool = False,
+        semantic_threshold: Optional[float] = None,
+        policy: Optional[CallPolicy] = None
+    ) -> List[Dict[str, Any]]:
+        """Generate responses for several prompts with a single batched call.
+        
+        Cached prompts are answered without a request, and with
+        use_semantic_cache so are prompts similar to cached ones, looked up
+        together; the rest are sent together through agenerate. If the
+        provider rejects the batched call as invalid, the prompts are retried
+        one by one so only the offending ones fail; any other failure (rate
+        limits, upstream errors, timeouts) is returned for every prompt,
+        since separate calls would only multiply it.
+        
+        Args:
+            prompts: The prompts to send to the LLM.
+            use_cache: Force the response cache on or off, as in generate().
+            use_semantic_cache: Use the semantic cache, as in generate().
+            semantic_threshold: Minimum similarity of a semantic cache hit.
+            policy: Deadline and circuit breaker settings, as in generate().
+                The batched call is never hedged.
+        
+        Returns:
+            One response dictionary per prompt, in the same order.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(prompts)
+        cache_keys: List[Optional[str]] = [None] * len(prompts)
+        
+        if self.should_cache(use_cache):
+            for index, prompt in enumerate(prompts):
+                cache_keys[index] = ResponseCache.make_key(self.model_name, self.temperature, prompt)
+                cached = self.cache.get(cache_keys[index])
+                if cached is not None:
+                    results[index] = {
+                        **cached,
+                        "metadata": {**(cached.get("metadata") or {}), "cached": True}
+                    }
+        
+        semantic_scope = self._semantic_scope(use_semantic_cache)
+        if semantic_scope is not None:
+            pending = [index for index, result in enumerate(results) if result is None]
+            hits = self.semantic_cache.get_many(
+                semantic_scope, [prompts[index] for index in pending], semantic_threshold
+            )
+            for index, hit in zip(pending, hits):
+                if hit is not None:
+                    results[index] = self._semantic_hit(*hit, prompts[index])
+        
+        pending = [index for index, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+        
+        started = time.perf_counter()
+        try:
+            response = await self._upstream(
+                lambda: self.llm.agenerate(
+                    [[_human_message(prompts[index])] for index in pending]
+                ),
+                self.estimate_tokens(*(prompts[index] for index in pending)),
+                PRIORITY_BATCH,
+                CallPolicy(
+                    timeout=policy.timeout if policy else None,
+                    hedge_percentile=0,
+                    circuit_breaker=policy.circuit_breaker if policy else None
+                ),
+                track_latency=False
+            )
+            token_usage = (getattr(response, "llm_output", None) or {}).get("token_usage", {})
+            LLM_LATENCY.observe(time.perf_counter() - started, model=self.model_name)
+            self._record_usage(token_usage)
+            for position, index in enumerate(pending):
+                results[index] = {
+                    "text": response.generations[position][0].text,
+                    "model": self.model_name,
+                    "prompt": prompts[index],
+                    "metadata": {
+                        "temperature": self.temperature,
+                        "tokens_used": {},
+                        "batch_tokens_used": token_usage,
+                        "batch_size": len(pending)
+                    }
+                }
+        except Exception as e:
+            if isinstance(e, (CircuitOpenError, LLMTimeoutError)) or not is_request_error(e):
+                # Retrying prompt by prompt would only fail or time out again
+                for index in pending:
+                    results[index] = self._error(e, prompts[index])
+                return results
+            # Fall back to individual calls so one bad prompt doesn't fail the batch
+            fallback = await asyncio.gather(
+                *(self._generate(prompts[index], PRIORITY_BATCH, policy) for index in pending)
+            )
+            for index, result in zip(pending, fallback):
+                results[index] = result
+        
+        for index in pending:
+            if "error" in results[index]:
+                continue
+            if cache_keys[index] is not None:
+                self.cache.set(cache_keys[index], results[index])
+            if semantic_scope is not None:
+                self.semantic_cache.set(semantic_scope, prompts[index], results[index])
+        
+        return results
+    
+    async def stream(
+        self,
+        prompt: str,
+        system_message: Optional[str] = None,
+        use_cache: Optional[bool] = None,
+        use_semantic_cache: bool = False,
+        semantic_threshold: Optional[float] = None,
+        policy: Optional[CallPolicy] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a response from the LLM as it is generated.
+        
+        Args:
+            prompt: The prompt to send to the LLM.
+            system_message: Optional system message prepended to the prompt.
+            use_cache: Force the response cache on or off, as in generate().
+            use_semantic_cache: Use the semantic cache, as in generate().
+            semantic_threshold: Minimum similarity of a semantic cache hit.
+            policy: Deadline and circuit breaker settings, as in generate().
+                Streams are not hedged, and the deadline applies to the
+                wait for each chunk, so a stalled stream ends with an error
+                however long it has been running.
+        
+        Yields:
+            {"type": "token", "text": ...} events for each chunk, followed by a
+            single {"type": "end", ...} event carrying the full response and
+            its metadata, or an {"type": "error", ...} event on failure.
+            The metadata's tokens_used is the provider's usage when the
+            stream reports it, and otherwise an estimate marked
+            "estimated": True.
+        """
+        cache_key = None
+        if self.should_cache(use_cache):
+            cache_key = ResponseCache.make_key(
+                self.model_name, self.temperature, prompt, system_message
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield {"type": "token", "text": cached.get("text", "")}
+                yield {
+                    "type": "end",
+                    **cached,
+                    "metadata": {**(cached.get("metadata") or {}), "cached": True}
+                }
+                return
+        
+        semantic_scope = self._semantic_scope(use_semantic_cache, system_message)
+        semantic_prompt = prompt
+        if semantic_scope is not None:
+            hit = self.semantic_cache.get(semantic_scope, prompt, semantic_threshold)
+            if hit is not None:
+                full_prompt = f"{system_message}\n\n{prompt}" if system_message else prompt
+                response = self._semantic_hit(*hit, full_prompt)
+                yield {"type": "token", "text": response.get("text", "")}
+                yield {"type": "end", **response}
+                return
+        
+        if system_message:
+            prompt = f"{system_message}\n\n{prompt}"
+        
+        parts = []
+        token_usage = {}
+        started = time.perf_counter()
+        guard = None
+        try:
+            if self.resilience is not None:
+                guard = self.resilience.admit(self.model_name, policy)
+            chunks = self.llm.astream([_human_message(prompt)]).__aiter__()
+            
+            async def next_chunk():
+                try:
+                    return await chunks.__anext__()
+                except StopAsyncIteration:
+                    return None
+            
+            async def first_chunk():
+                if self.scheduler is not None:
+                    # Streams cannot be retried midway; only wait for admission
+                    await self.scheduler.acquire(
+                        (self._api_key_hash, self.model_name), self.estimate_tokens(prompt)
+                    )
+                if guard is not None:
+                    guard.mark_sent()
+                return await next_chunk()
+            
+            chunk = await (guard.within_deadline(first_chunk()) if guard is not None else first_chunk())
+            while chunk is not None:
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield {"type": "token", "text": chunk.content}
+                # Newer providers attach usage to the final chunk
+                chunk_usage = (getattr(chunk, "response_metadata", None) or {}).get("token_usage")
+                if chunk_usage:
+                    token_usage = chunk_usage
+                chunk = await (guard.within_deadline(next_chunk()) if guard is not None else next_chunk())
+            if guard is not None:
+                guard.finish(True)
+        except Exception as e:
+            if guard is not None:
+                guard.fail(e)
+            yield {"type": "error", **self._error(e, prompt)}
+            return
+        finally:
+            # Only still open if the consumer stopped reading mid-stream
+            if guard is not None:
+                guard.finish(None)
+        
+        LLM_LATENCY.observe(time.perf_counter() - started, model=self.model_name)
+        text = "".join(parts)
+        if token_usage:
+            self._record_usage(token_usage)
+        else:
+            # The pinned langchain-openai never streams usage; estimate it rather than report nothing
+            token_usage = self._estimated_usage(prompt, text)
+        
+        response = {
+            "text": text,
+            "model": self.model_name,
+            "prompt": prompt,
+            "metadata": {
+                "temperature": self.temperature,
+                "tokens_used": token_usage
+            }
+        }
+        if cache_key is not None:
+            self.cache.set(cache_key, response)
+        if semantic_scope is not None:
+            self.semantic_cache.set(semantic_scope, semantic_prompt, response)
+        
+        yield {"type": "end", **response}
\ No newline at end of file
@@ -0,0 +1,158 @@
+"""Pool of reusable LLM clients."""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from .cache import ResponseCache
+from .coalesce import RequestCoalescer
+from .scheduler import LLMScheduler
+from .semantic import SemanticCache
+from .resilience import LLMResilience
+from .openai import OpenAILLM
+
+logger = logging.getLogger(__name__)
+
+PoolKey = Tuple[str, float, str, bool]
+
+
+class LLMClientPool:
+    """Bounded LRU pool of OpenAILLM clients keyed by their configuration.
+    
+    Reusing a client keeps its underlying HTTP connections (keep-alive, TLS
+    sessions) alive across requests instead of setting them up every time.
+    """
+    
+    def __init__(
+        self,
+        max_size: int = 32,
+        idle_timeout: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+        response_cache: Optional[ResponseCache] = None,
+        coalescer: Optional[RequestCoalescer] = None,
+        scheduler: Optional[LLMScheduler] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        resilience: Optional[LLMResilience] = None
+    ):
+        """Initialize the pool.
+        
+        Args:
+            max_size: Maximum number of clients kept in the pool.
+            idle_timeout: Seconds after which an unused client is dropped.
+            clock: Monotonic time source, injectable for tests.
+            response_cache: Response cache handed to every client the pool creates.
+            coalescer: Request coalescer handed to every client the pool creates.
+            scheduler: Rate-limit scheduler handed to every client the pool creates.
+            semantic_cache: Semantic response cache handed to every client the pool creates.
+            resilience: Deadlines, hedging and circuit breakers shared by every client the pool creates.
+        """
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._clock = clock
+        self.response_cache = response_cache
+        self.coalescer = coalescer
+        self.scheduler = scheduler
+        self.semantic_cache = semantic_cache
+        self.resilience = resilience
+        self._clients: "OrderedDict[PoolKey, Tuple[OpenAILLM, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(
+        model_name: str,
+        temperature: float,
+        api_key: Optional[str],
+        streaming: bool
+    ) -> PoolKey:
+        """Build the pool key for a client configuration.
+        
+        The API key is hashed so raw secrets are never kept as dict keys.
+        """
+        api_key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()
+        return (model_name, float(temperature), api_key_hash, bool(streaming))
+    
+    def get(
+        self,
+        model_name: str = "gpt-3.5-turbo",
+        temperature: float = 0.7,
+        api_key: Optional[str] = None,
+        streaming: bool = False
+    ) -> OpenAILLM:
+        """Get a pooled client for the given configuration, creating it if needed.
+        
+        Raises:
+            ValueError: If no API key is given or set in the environment.
+        """
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        key = self.make_key(model_name, temperature, api_key, streaming)
+        now = self._clock()
+        
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._clients.get(key)
+            if entry is not None:
+                self._clients[key] = (entry[0], now)
+                self._clients.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        
+        # Construct outside the lock; a concurrent miss may build a duplicate,
+        # in which case the first one stored wins.
+        client = OpenAILLM(
+            model_name=model_name,
+            temperature=temperature,
+            api_key=api_key,
+            streaming=streaming,
+            cache=self.response_cache,
+            coalescer=self.coalescer,
+            scheduler=self.scheduler,
+            semantic_cache=self.semantic_cache,
+            resilience=self.resilience
+        )
+        
+        with self._lock:
+            self.misses += 1
+            entry = self._clients.get(key)
+            if entry is not None:
+                client = entry[0]
+            self._clients[key] = (client, now)
+            self._clients.move_to_end(key)
+            while len(self._clients) > self.max_size:
+                evicted_key, _ = self._clients.popitem(last=False)
+                logger.info(f"Evicted LLM client for model {evicted_key[0]} from pool")
+        
+        return client
+    
+    def _evict_idle(self, now: float) -> None:
+        """Drop clients that have not been used within the idle timeout."""
+        # Entries are in LRU order, so stop at the first one still fresh
+        while self._clients:
+            key, (_, last_used) = next(iter(self._clients.items()))
+            if now - last_used < self.idle_timeout:
+                break
+            del self._clients[key]
+            logger.info(f"Dropped idle LLM client for model {key[0]} from pool")
+    
+    def clear(self) -> None:
+        """Remove all clients from the pool."""
+        with self._lock:
+            self._clients.clear()
+    
+    def stats(self) -> dict:
+        """Return pool size and hit/miss counters."""
+        with self._lock:
+            return {
+                "size": len(self._clients),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+    
+    def __len__(self) -> int:
+        return len(self._clients)
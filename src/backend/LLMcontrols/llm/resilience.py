@@ -0,0 +1,461 @@
+"""Deadlines, hedged requests and circuit breaking for upstream LLM calls."""
+
+import math
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from .scheduler import is_transient_error
+from ..metrics import LLM_HEDGES, LLM_TIMEOUTS, LLM_CIRCUIT_STATE, LLM_CIRCUIT_REJECTED
+
+logger = logging.getLogger(__name__)
+
+
+class LLMTimeoutError(TimeoutError):
+    """Raised when an LLM call does not finish within its deadline."""
+    
+    def __init__(self, model: str, timeout: float):
+        self.model = model
+        self.timeout = timeout
+        super().__init__(f"LLM call to {model} timed out after {timeout:g}s")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the provider while a model's circuit breaker is open."""
+    
+    def __init__(self, model: str, retry_in: float):
+        self.model = model
+        self.retry_in = retry_in
+        super().__init__(f"Circuit breaker open for {model}; retry in {retry_in:.0f}s")
+
+
+class CallPolicy:
+    """How a single LLM call is guarded.
+    
+    Fields left as None fall back to the defaults of the LLMResilience
+    running the call.
+    """
+    
+    __slots__ = ("timeout", "hedge_percentile", "circuit_breaker")
+    
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        hedge_percentile: Optional[float] = None,
+        circuit_breaker: Optional[bool] = None
+    ):
+        """Initialize the policy.
+        
+        Args:
+            timeout: Deadline of the call in seconds, including time spent
+                waiting for the rate limiter; for a stream, the deadline of
+                the first chunk and then of each following one. 0 disables
+                the deadline.
+            hedge_percentile: Send a duplicate request once the call has taken
+                longer than this percentile (e.g. 95) of the model's recent
+                latencies; the first response wins. 0 disables hedging.
+            circuit_breaker: Whether the call is subject to the model's circuit breaker.
+        """
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        self.circuit_breaker = circuit_breaker
+
+
+class LatencyTracker:
+    """Latencies of the most recent successful calls, for percentile estimates."""
+    
+    def __init__(self, window: int = 256, min_samples: int = 20):
+        """Initialize the tracker.
+        
+        Args:
+            window: Number of recent latencies kept.
+            min_samples: Samples needed before percentiles are reported.
+        """
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+    
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+    
+    def percentile(self, percentile: float) -> Optional[float]:
+        """The given percentile (0-100) of the recent latencies, or None with too few samples."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        # Nearest-rank percentile
+        rank = math.ceil(percentile / 100 * len(ordered)) - 1
+        return ordered[min(len(ordered) - 1, max(0, rank))]
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "samples": len(self._samples),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class CircuitBreaker:
+    """Fail fast while a model's recent error rate is too high.
+    
+    The breaker opens once at least min_calls of the last window calls
+    were recorded and error_rate of them failed. While open, calls are
+    rejected without reaching the provider. After cooldown seconds one
+    probe call is let through (half-open): if it succeeds the breaker
+    closes with a clean window, otherwise it opens again.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(
+        self,
+        error_rate: float = 0.5,
+        window: int = 20,
+        min_calls: int = 10,
+        cooldown: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """Initialize a closed breaker.
+        
+        Args:
+            error_rate: Fraction of failed calls in the window that opens the breaker.
+            window: Number of recent call outcomes considered.
+            min_calls: Outcomes needed in the window before the breaker can open.
+            cooldown: Seconds the breaker stays open before a probe call.
+            clock: Monotonic time source, injectable for tests.
+        """
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._clock = clock
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+        self.rejected = 0
+    
+    def allow(self) -> bool:
+        """Whether a call may go ahead now; it must then report back via record() or release()."""
+        if self.state == self.OPEN:
+            if self._clock() - self.opened_at < self.cooldown:
+                self.rejected += 1
+                return False
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                self.rejected += 1
+                return False
+            self._probing = True
+        return True
+    
+    def record(self, success: bool) -> None:
+        """Record the outcome of an allowed call."""
+        if self.state == self.OPEN:
+            # A call that started before the breaker opened
+            return
+        if self.state == self.HALF_OPEN:
+            self._probing = False
+            if success:
+                self.state = self.CLOSED
+                self._outcomes.clear()
+            else:
+                self._open()
+            return
+        
+        self._outcomes.append(success)
+        if len(self._outcomes) >= self.min_calls:
+            failures = self._outcomes.count(False)
+            if failures / len(self._outcomes) >= self.error_rate:
+                self._open()
+    
+    def release(self) -> None:
+        """Report an allowed call that ended without an outcome (e.g. it was cancelled)."""
+        if self.state == self.HALF_OPEN:
+            self._probing = False
+    
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self.opened_at = self._clock()
+        self.opened += 1
+        self._outcomes.clear()
+    
+    def retry_in(self) -> float:
+        """Seconds until an open breaker lets a probe call through."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.cooldown - (self._clock() - self.opened_at))
+    
+    def stats(self) -> Dict[str, Any]:
+        calls = len(self._outcomes)
+        return {
+            "state": self.state,
+            "window_calls": calls,
+            "window_error_rate": self._outcomes.count(False) / calls if calls else 0.0,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "retry_in": self.retry_in(),
+        }
+
+
+class _ModelState:
+    """Breaker, latencies and hedging counters of one model."""
+    
+    def __init__(self, breaker: CircuitBreaker, latency: LatencyTracker):
+        self.breaker = breaker
+        self.latency = latency
+        self.calls = 0
+        self.timeouts = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+
+class CallGuard:
+    """An admitted call, which reports its outcome to the model's breaker once."""
+    
+    def __init__(
+        self,
+        model: str,
+        state: _ModelState,
+        breaker: Optional[CircuitBreaker],
+        timeout: Optional[float],
+        hedge_after: Optional[float],
+        counts_timeouts: bool = True
+    ):
+        self.model = model
+        self.state = state
+        self.breaker = breaker
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.counts_timeouts = counts_timeouts
+        # Set once the request has left the rate limiter's queue
+        self.sent = False
+        self._finished = False
+    
+    def mark_sent(self) -> None:
+        """Note that the request was sent to the provider."""
+        self.sent = True
+    
+    async def within_deadline(self, awaitable: Awaitable[Any]) -> Any:
+        """Await within the call's deadline, cancelling the awaitable when it passes.
+        
+        Raises:
+            LLMTimeoutError: If the deadline passes first.
+        """
+        if not self.timeout:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, self.timeout)
+        except asyncio.TimeoutError:
+            self.state.timeouts += 1
+            LLM_TIMEOUTS.inc(model=self.model)
+            raise LLMTimeoutError(self.model, self.timeout)
+    
+    def is_provider_failure(self, error: Exception) -> bool:
+        """Whether an error says the provider is unhealthy, rather than the caller at fault.
+        
+        Only server and connection errors and provider timeouts count.
+        Client errors (e.g. a bad API key) and rate limits are specific to
+        the caller. A missed deadline counts only if the request was sent
+        and its deadline was no tighter than the default: time spent queued
+        for the rate limiter, or a deadline a caller shortened, says nothing
+        about the provider.
+        """
+        if isinstance(error, LLMTimeoutError):
+            return self.sent and self.counts_timeouts
+        return is_transient_error(error)
+    
+    def fail(self, error: Exception) -> None:
+        """Report a failed call; failures that are not the provider's leave no outcome."""
+        self.finish(False if self.is_provider_failure(error) else None)
+    
+    def finish(self, success: Optional[bool]) -> None:
+        """Report whether the call succeeded; None if it ended without an outcome."""
+        if self._finished:
+            return
+        self._finished = True
+        if self.breaker is None:
+            return
+        if success is None:
+            self.breaker.release()
+        else:
+            self.breaker.record(success)
+        LLM_CIRCUIT_STATE.set(LLMResilience.STATE_VALUES[self.breaker.state], model=self.model)
+
+
+class LLMResilience:
+    """Guard upstream LLM calls with deadlines, hedging and per-model circuit breakers.
+    
+    A call runs under its deadline; when it expires the call is cancelled,
+    including a hedge in flight. With hedging, a duplicate request is sent
+    once the call has been pending longer than a percentile of the model's
+    recent latencies, and whichever finishes first successfully is used
+    while the other is cancelled. Calls that fail because of the provider
+    (see CallGuard.is_provider_failure) count against the model's circuit
+    breaker. The clock is injectable so tests can
+    drive a fake provider with injected latency.
+    """
+    
+    # Numeric breaker states for the LLM_CIRCUIT_STATE gauge
+    STATE_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+    
+    def __init__(
+        self,
+        timeout: Optional[float] = 60.0,
+        hedge_percentile: Optional[float] = None,
+        error_rate: float = 0.5,
+        window: int = 20,
+        min_calls: int = 10,
+        cooldown: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """Initialize the resilience layer.
+        
+        Args:
+            timeout: Default deadline of a call in seconds. None or 0 disables it.
+            hedge_percentile: Default hedging percentile. None or 0 disables hedging.
+            error_rate: Error rate that opens a model's breaker, see CircuitBreaker.
+            window: Outcomes per model considered by its breaker.
+            min_calls: Outcomes needed before a breaker can open.
+            cooldown: Seconds a breaker stays open before a probe call.
+            clock: Monotonic time source.
+        """
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        self.error_rate = error_rate
+        self.window = window
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._clock = clock
+        self._models: Dict[str, _ModelState] = {}
+    
+    def _model(self, model: str) -> _ModelState:
+        state = self._models.get(model)
+        if state is None:
+            breaker = CircuitBreaker(
+                error_rate=self.error_rate,
+                window=self.window,
+                min_calls=self.min_calls,
+                cooldown=self.cooldown,
+                clock=self._clock
+            )
+            state = self._models[model] = _ModelState(breaker, LatencyTracker())
+        return state
+    
+    def breaker(self, model: str) -> CircuitBreaker:
+        return self._model(model).breaker
+    
+    def admit(self, model: str, policy: Optional[CallPolicy] = None) -> CallGuard:
+        """Admit a call for a model under a policy; the caller must finish() the guard.
+        
+        Raises:
+            CircuitOpenError: If the model's breaker is open.
+        """
+        policy = policy or CallPolicy()
+        timeout = self.timeout if policy.timeout is None else policy.timeout
+        percentile = self.hedge_percentile if policy.hedge_percentile is None else policy.hedge_percentile
+        state = self._model(model)
+        breaker = state.breaker if policy.circuit_breaker is not False else None
+        
+        if breaker is not None and not breaker.allow():
+            LLM_CIRCUIT_REJECTED.inc(model=model)
+            raise CircuitOpenError(model, breaker.retry_in())
+        
+        state.calls += 1
+        hedge_after = state.latency.percentile(percentile) if percentile else None
+        counts_timeouts = bool(self.timeout) and bool(timeout) and timeout >= self.timeout
+        return CallGuard(model, state, breaker, timeout, hedge_after, counts_timeouts)
+    
+    async def call(
+        self,
+        model: str,
+        factory: Callable[[CallGuard], Awaitable[Any]],
+        policy: Optional[CallPolicy] = None,
+        track_latency: bool = True
+    ) -> Any:
+        """Run an upstream call for a model under a policy.
+        
+        Args:
+            model: Model name; breakers and latencies are kept per model.
+            factory: Starts the upstream call; called again for a hedge. It
+                gets the call's guard and calls mark_sent() on it when the
+                request leaves the rate limiter's queue.
+            policy: Per-call overrides of the defaults.
+            track_latency: Record the call's latency for hedging percentiles.
+                Off for calls that are not comparable, such as batches.
+        
+        Raises:
+            CircuitOpenError: If the model's breaker is open.
+            LLMTimeoutError: If the call misses its deadline.
+        """
+        guard = self.admit(model, policy)
+        started = self._clock()
+        try:
+            result = await guard.within_deadline(self._hedged(guard, factory))
+            guard.finish(True)
+        except Exception as e:
+            guard.fail(e)
+            raise
+        finally:
+            # Only still unfinished when the caller is cancelled
+            guard.finish(None)
+        
+        if track_latency:
+            guard.state.latency.record(self._clock() - started)
+        return result
+    
+    async def _hedged(self, guard: CallGuard, factory: Callable[[CallGuard], Awaitable[Any]]) -> Any:
+        """Run the call, sending a duplicate once it is slower than usual; the first success wins."""
+        if guard.hedge_after is None:
+            return await factory(guard)
+        
+        state = guard.state
+        primary = asyncio.ensure_future(factory(guard))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=guard.hedge_after)
+            if done:
+                return primary.result()
+            
+            state.hedged += 1
+            hedge = asyncio.ensure_future(factory(guard))
+            tasks.append(hedge)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            state.hedge_wins += 1
+                        LLM_HEDGES.inc(model=guard.model, winner="hedge" if task is hedge else "primary")
+                        return task.result()
+            # Both failed; report the original request's error
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return breaker state, latency percentiles and hedge win rates per model."""
+        return {
+            "timeout": self.timeout,
+            "hedge_percentile": self.hedge_percentile,
+            "models": {
+                model: {
+                    "calls": state.calls,
+                    "timeouts": state.timeouts,
+                    "breaker": state.breaker.stats(),
+                    "latency": state.latency.stats(),
+                    "hedged": state.hedged,
+                    "hedge_wins": state.hedge_wins,
+                    "hedge_win_rate": state.hedge_wins / state.hedged if state.hedged else 0.0,
+                }
+                for model, state in self._models.items()
+            },
+        }
@@ -0,0 +1,279 @@
+"""Rate-limit-aware scheduling of LLM calls."""
+
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+LimiterKey = Tuple[str, str]  # (api key hash, model name)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Return how long to back off after a rate-limit error.
+    
+    Returns None if the error is not a rate-limit error, and 0.0 if it is
+    one but the provider did not say how long to wait.
+    """
+    status = getattr(error, "status_code", None) or getattr(error, "http_status", None)
+    if status != 429 and type(error).__name__ != "RateLimitError":
+        return None
+    
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value is not None:
+            try:
+                return max(0.0, float(value) * scale)
+            except (TypeError, ValueError):
+                continue
+    return 0.0
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Whether a failed call is worth retrying as is.
+    
+    Covers the errors the OpenAI client retries itself: connection errors,
+    timeouts, 408, 409 and 5xx responses. Rate-limit errors are handled
+    separately, see retry_after_seconds.
+    """
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "http_status", None)
+    if isinstance(status, int):
+        return status in (408, 409) or status >= 500
+    # openai raises APITimeoutError (a subclass of APIConnectionError) without a status
+    names = {cls.__name__ for cls in type(error).__mro__}
+    return bool(names & {"APIConnectionError", "APITimeoutError", "InternalServerError", "ServiceUnavailableError"})
+
+
+def is_request_error(error: Exception) -> bool:
+    """Whether a call failed because of what was sent, e.g. a 400 for an invalid prompt.
+    
+    Sending the same request again fails the same way, but in a batch only
+    the offending prompts may be to blame.
+    """
+    status = getattr(error, "status_code", None) or getattr(error, "http_status", None)
+    if isinstance(status, int):
+        return status in (400, 413, 422)
+    names = {cls.__name__ for cls in type(error).__mro__}
+    return bool(names & {"BadRequestError", "InvalidRequestError", "UnprocessableEntityError"})
+
+
+class TokenBucket:
+    """A token bucket refilled continuously at a per-minute rate."""
+    
+    def __init__(self, per_minute: float, now: float):
+        """Initialize a full bucket.
+        
+        Args:
+            per_minute: Refill rate, which is also the bucket capacity.
+            now: Current time in seconds.
+        """
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = now
+    
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+    
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount tokens are available."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+    
+    def consume(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+    
+    def adjust(self, amount: float) -> None:
+        """Give back (positive) or charge (negative) tokens after the fact."""
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class _Lane:
+    """Rate limits and the priority queue of callers for one key and model."""
+    
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, now: float):
+        self.requests = TokenBucket(requests_per_minute, now)
+        self.tokens = TokenBucket(tokens_per_minute, now)
+        self.blocked_until = 0.0
+        self.queue: List[Tuple[int, int, float, asyncio.Future]] = []
+        self.dispatcher: Optional[asyncio.Task] = None
+
+
+class LLMScheduler:
+    """Admit LLM calls under per-key, per-model request and token limits.
+    
+    Callers wait in a priority queue (interactive before batch) and are
+    released when both the requests-per-minute and tokens-per-minute buckets
+    allow it. Rate-limit errors pause the whole lane for the provider's
+    Retry-After before the call is retried; transient errors (connection
+    errors, timeouts, 5xx) are retried after an exponential backoff of the
+    failed call alone. The clock and sleep functions
+    are injectable so the scheduler can run against a simulated clock.
+    """
+    
+    def __init__(
+        self,
+        requests_per_minute: float = 3500,
+        tokens_per_minute: float = 200_000,
+        model_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep
+    ):
+        """Initialize the scheduler.
+        
+        Args:
+            requests_per_minute: Default request limit per key and model.
+            tokens_per_minute: Default token limit per key and model.
+            model_limits: Per-model (requests_per_minute, tokens_per_minute) overrides.
+            max_retries: Retries of a call after rate-limit or transient errors.
+            backoff: Base delay in seconds before retrying a transient error,
+                or a rate-limit error without Retry-After; doubled on each retry.
+            clock: Monotonic time source.
+            sleep: Async sleep function matching the clock.
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.model_limits = model_limits or {}
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._clock = clock
+        self._sleep = sleep
+        self._lanes: Dict[LimiterKey, _Lane] = {}
+        self._sequence = itertools.count()
+        self.admitted = 0
+        self.throttled = 0
+        self.retried = 0
+    
+    def _lane(self, key: LimiterKey) -> _Lane:
+        lane = self._lanes.get(key)
+        if lane is None:
+            rpm, tpm = self.model_limits.get(key[1], (self.requests_per_minute, self.tokens_per_minute))
+            lane = self._lanes[key] = _Lane(rpm, tpm, self._clock())
+        return lane
+    
+    async def acquire(self, key: LimiterKey, tokens: float = 0, priority: int = PRIORITY_INTERACTIVE) -> None:
+        """Wait until a call with the given token estimate may be sent."""
+        lane = self._lane(key)
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(lane.queue, (priority, next(self._sequence), tokens, future))
+        if lane.dispatcher is None or lane.dispatcher.done():
+            lane.dispatcher = asyncio.ensure_future(self._dispatch(lane))
+        await future
+    
+    async def _dispatch(self, lane: _Lane) -> None:
+        """Release queued callers of a lane in priority order as limits allow."""
+        while lane.queue:
+            now = self._clock()
+            if now < lane.blocked_until:
+                await self._sleep(lane.blocked_until - now)
+                continue
+            
+            _, _, tokens, future = lane.queue[0]
+            if future.done():
+                # The caller was cancelled while queued
+                heapq.heappop(lane.queue)
+                continue
+            
+            wait = max(lane.requests.wait_time(1, now), lane.tokens.wait_time(tokens, now))
+            if wait > 0:
+                # Re-check afterwards; a higher-priority caller may have arrived
+                await self._sleep(wait)
+                continue
+            
+            lane.requests.consume(1, now)
+            lane.tokens.consume(tokens, now)
+            heapq.heappop(lane.queue)
+            self.admitted += 1
+            future.set_result(None)
+    
+    def pause(self, key: LimiterKey, seconds: float) -> None:
+        """Hold back every call of a lane for the given number of seconds."""
+        lane = self._lane(key)
+        lane.blocked_until = max(lane.blocked_until, self._clock() + seconds)
+    
+    async def submit(
+        self,
+        key: LimiterKey,
+        call: Callable[[], Awaitable[Any]],
+        tokens: float = 0,
+        priority: int = PRIORITY_INTERACTIVE,
+        tokens_used: Optional[Callable[[Any], Optional[float]]] = None
+    ) -> Any:
+        """Run a call once the limits allow, retrying after rate-limit and transient errors.
+        
+        Args:
+            key: (api key hash, model name) whose limits apply.
+            call: Creates the upstream request; called once per attempt.
+            tokens: Estimated tokens the call will use.
+            priority: Queue priority; lower is served first.
+            tokens_used: Extracts the actual token count from the result so
+                the token bucket can be corrected for the estimate.
+        """
+        attempt = 0
+        while True:
+            await self.acquire(key, tokens, priority)
+            try:
+                result = await call()
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = retry_after_seconds(e)
+                if delay is not None:
+                    delay = delay or self.backoff * (2 ** attempt)
+                    logger.warning(f"Rate limited on model {key[1]}, retrying in {delay:.2f}s")
+                    self.throttled += 1
+                    self.pause(key, delay)
+                elif is_transient_error(e):
+                    # Only this call backs off; the lane's other callers go ahead
+                    delay = self.backoff * (2 ** attempt)
+                    logger.warning(f"Call to model {key[1]} failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                    self.retried += 1
+                    await self._sleep(delay)
+                else:
+                    raise
+                attempt += 1
+                continue
+            
+            if tokens_used is not None:
+                actual = tokens_used(result)
+                if actual is not None:
+                    self._lane(key).tokens.adjust(tokens - actual)
+            return result
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return admission counters and the state of each lane."""
+        now = self._clock()
+        return {
+            "admitted": self.admitted,
+            "throttled": self.throttled,
+            "retried": self.retried,
+            "lanes": [
+                {
+                    "model": model,
+                    "queued": len(lane.queue),
+                    "requests_available": round(lane.requests.tokens, 2),
+                    "tokens_available": round(lane.tokens.tokens, 2),
+                    "blocked_for": max(0.0, lane.blocked_until - now),
+                }
+                for (_, model), lane in self._lanes.items()
+            ],
+        }
@@ -0,0 +1,358 @@
+"""Semantic response cache for LLM calls with similar prompts."""
+
+import re
+import json
+import time
+import zlib
+import logging
+import functools
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from .cache import normalize_prompt
+
+logger = logging.getLogger(__name__)
+
+# Maps a list of texts to an (n, dim) array with one embedding per text
+Embedder = Callable[[Sequence[str]], Any]
+
+_WORD = re.compile(r"\w+")
+# Words and numbers that change the meaning of a prompt without changing much of its wording
+_KEY_TOKEN = re.compile(r"\d+(?:[.,]\d+)*|\w+n't|\b(?:not|no|never|none|nor|neither|nothing|nobody|nowhere|cannot|without)\b")
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy():
+    """Import NumPy on first use, so servers that never use the cache don't pay for it at startup."""
+    import numpy
+    return numpy
+
+
+class HashingEmbedder:
+    """Deterministic offline embedder based on feature hashing.
+    
+    The words and character trigrams of the lowercased prompt are hashed
+    into a fixed number of dimensions with a hash-derived sign. Prompts that
+    share most of their words and spellings get a high cosine similarity.
+    No model or network is needed and every process computes the same
+    vectors, but only wording is compared, not meaning. It is meant for
+    tests and local development; use a real embedding model in production,
+    also to match paraphrases.
+    """
+    
+    def __init__(self, dim: int = 512):
+        """Initialize the embedder.
+        
+        Args:
+            dim: Number of dimensions of the embeddings.
+        """
+        self.dim = dim
+    
+    @staticmethod
+    def features(text: str) -> List[str]:
+        """The words of a text and the trigrams of each space-padded word."""
+        words = _WORD.findall(normalize_prompt(text).lower())
+        features = [f"w:{word}" for word in words]
+        for word in words:
+            padded = f" {word} "
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+    
+    def __call__(self, texts: Sequence[str]) -> Any:
+        np = _numpy()
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(texts):
+            for feature in self.features(text):
+                digest = zlib.crc32(feature.encode("utf-8"))
+                rows.append(row)
+                columns.append(digest % self.dim)
+                signs.append(1.0 if digest & 0x80000000 else -1.0)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(vectors, (rows, columns), signs)
+        return vectors
+
+
+class SemanticCache:
+    """In-memory LLM response cache that also answers similar prompts.
+    
+    Prompt embeddings are the rows of one contiguous float32 matrix, so a
+    lookup is a single product of the normalized query with every stored
+    prompt, and a batch of lookups a single matrix product. The most similar
+    prompt stored for the same model, temperature, system message and API
+    key is a hit when its cosine similarity reaches the threshold and both
+    prompts have the same negations and numbers (see key_tokens): "Is the
+    patient allergic to penicillin?" and "Is the patient not allergic to
+    penicillin?" are similar but must not share an answer. Entries expire
+    after a TTL, and the least recently used ones are evicted once there
+    are more than max_entries or they take more than max_bytes.
+    """
+    
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        threshold: float = 0.95,
+        max_entries: int = 4096,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: Optional[float] = 24 * 3600,
+        clock: Callable[[], float] = time.time
+    ):
+        """Initialize the cache.
+        
+        Args:
+            embedder: Embeds prompts; defaults to a HashingEmbedder, which
+                is only suitable for tests. Its vectors are normalized by
+                the cache.
+            threshold: Minimum cosine similarity of a hit, unless a lookup
+                passes its own.
+            max_entries: Maximum number of cached responses.
+            max_bytes: Approximate memory budget of responses and embeddings.
+            ttl: Seconds an entry stays valid. None disables expiry.
+            clock: Wall-clock time source, injectable for tests.
+        """
+        self.embedder = embedder or HashingEmbedder()
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        
+        # Row i of every array and list describes entry i; rows [0, len(_values)) are in use
+        self._vectors = None
+        self._scopes = None
+        self._created = None
+        self._used = None
+        self._keys: List[Tuple[int, str]] = []
+        self._values: List[Dict[str, Any]] = []
+        self._key_tokens: List[frozenset] = []
+        self._sizes: List[int] = []
+        self._rows: Dict[Tuple[int, str], int] = {}
+        self._scope_ids: Dict[Hashable, int] = {}
+        self._tick = 0
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def make_scope(
+        model: str,
+        temperature: float,
+        system_message: Optional[str] = None,
+        api_key_hash: str = ""
+    ) -> Hashable:
+        """Build the scope of a call; only prompts within the same scope are compared.
+        
+        The API key is part of the scope so tenants never see each other's
+        responses; pass a hash of it, not the key.
+        """
+        return (model, float(temperature), normalize_prompt(system_message), api_key_hash)
+    
+    @staticmethod
+    def key_tokens(prompt: str) -> frozenset:
+        """The negations and numbers of a prompt, which a hit's prompt must share."""
+        return frozenset(
+            "not" if token.endswith("n't") else token
+            for token in _KEY_TOKEN.findall(normalize_prompt(prompt).lower())
+        )
+    
+    def _embed(self, prompts: Sequence[str]) -> Any:
+        """Embed prompts as unit-length float32 rows."""
+        np = _numpy()
+        vectors = np.asarray(self.embedder([normalize_prompt(prompt) for prompt in prompts]), dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(prompts):
+            raise ValueError(f"Embedder returned shape {vectors.shape} for {len(prompts)} prompts")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+    
+    def get(
+        self,
+        scope: Hashable,
+        prompt: str,
+        threshold: Optional[float] = None
+    ) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Return the cached response for the most similar prompt, or None on a miss.
+        
+        Returns:
+            The response and the similarity of its prompt to this one.
+        """
+        return self.get_many(scope, [prompt], threshold)[0]
+    
+    def get_many(
+        self,
+        scope: Hashable,
+        prompts: Sequence[str],
+        threshold: Optional[float] = None
+    ) -> List[Optional[Tuple[Dict[str, Any], float]]]:
+        """Look up several prompts of one scope with a single matrix product.
+        
+        Returns:
+            One (response, similarity) or None per prompt, in order.
+        """
+        if not prompts:
+            return []
+        threshold = self.threshold if threshold is None else threshold
+        
+        with self._lock:
+            scope_id = self._scope_ids.get(scope)
+            size = len(self._values)
+            if scope_id is None or not size:
+                self.misses += len(prompts)
+                return [None] * len(prompts)
+        
+        # Embedding is the expensive part and does not need the lock
+        queries = self._embed(prompts)
+        tokens = [self.key_tokens(prompt) for prompt in prompts]
+        np = _numpy()
+        now = self._clock()
+        
+        with self._lock:
+            size = len(self._values)
+            if not size:
+                self.misses += len(prompts)
+                return [None] * len(prompts)
+            live = self._scopes[:size] == scope_id
+            if self.ttl is not None:
+                live &= self._created[:size] > now - self.ttl
+            similarities = queries @ self._vectors[:size].T
+            similarities[:, ~live] = -np.inf
+            best = similarities.argmax(axis=1)
+            
+            results: List[Optional[Tuple[Dict[str, Any], float]]] = []
+            for query, row in enumerate(best.tolist()):
+                if similarities[query, row] >= threshold and self._key_tokens[row] != tokens[query]:
+                    # The most similar prompt says something else; take the most similar one that doesn't
+                    candidates = [
+                        candidate for candidate in np.flatnonzero(similarities[query] >= threshold).tolist()
+                        if self._key_tokens[candidate] == tokens[query]
+                    ]
+                    row = max(candidates, key=lambda candidate: similarities[query, candidate], default=row)
+                    if not candidates:
+                        similarities[query, row] = -np.inf
+                similarity = min(float(similarities[query, row]), 1.0)
+                if similarity >= threshold:
+                    self._tick += 1
+                    self._used[row] = self._tick
+                    self.hits += 1
+                    results.append((self._values[row], similarity))
+                else:
+                    self.misses += 1
+                    results.append(None)
+            return results
+    
+    def set(self, scope: Hashable, prompt: str, value: Dict[str, Any]) -> None:
+        """Store a response for a prompt, replacing an entry for the same prompt."""
+        vector = self._embed([prompt])[0]
+        try:
+            size = len(json.dumps(value, default=str)) + vector.nbytes
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Could not store LLM response in the semantic cache: {str(e)}")
+            return
+        now = self._clock()
+        
+        with self._lock:
+            scope_id = self._scope_ids.setdefault(scope, len(self._scope_ids))
+            key = (scope_id, normalize_prompt(prompt))
+            row = self._rows.get(key)
+            if row is None:
+                row = len(self._values)
+                self._reserve(row + 1, vector.shape[0])
+                self._keys.append(key)
+                self._values.append(value)
+                self._key_tokens.append(self.key_tokens(prompt))
+                self._sizes.append(size)
+                self._rows[key] = row
+            else:
+                self.bytes -= self._sizes[row]
+                self._values[row] = value
+                self._sizes[row] = size
+            
+            self._tick += 1
+            self._vectors[row] = vector
+            self._scopes[row] = scope_id
+            self._created[row] = now
+            self._used[row] = self._tick
+            self.bytes += size
+            self._evict(now)
+    
+    def _reserve(self, rows: int, dim: int) -> None:
+        """Make room for a number of rows, doubling the arrays when they are full."""
+        np = _numpy()
+        if self._vectors is not None and self._vectors.shape[1] != dim:
+            raise ValueError(f"Embedding size changed from {self._vectors.shape[1]} to {dim}")
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        if rows <= capacity:
+            return
+        
+        capacity = max(rows, capacity * 2, 64)
+        used = len(self._values)
+        arrays = (
+            ("_vectors", (capacity, dim), np.float32),
+            ("_scopes", capacity, np.int32),
+            ("_created", capacity, np.float64),
+            ("_used", capacity, np.int64),
+        )
+        for name, shape, dtype in arrays:
+            grown = np.empty(shape, dtype=dtype)
+            old = getattr(self, name)
+            if old is not None:
+                grown[:used] = old[:used]
+            setattr(self, name, grown)
+    
+    def _remove(self, row: int) -> None:
+        """Remove a row, moving the last row into its place to keep the matrix contiguous."""
+        last = len(self._values) - 1
+        del self._rows[self._keys[row]]
+        self.bytes -= self._sizes[row]
+        if row != last:
+            for array in (self._vectors, self._scopes, self._created, self._used):
+                array[row] = array[last]
+            self._keys[row] = self._keys[last]
+            self._values[row] = self._values[last]
+            self._key_tokens[row] = self._key_tokens[last]
+            self._sizes[row] = self._sizes[last]
+            self._rows[self._keys[row]] = row
+        self._keys.pop()
+        self._values.pop()
+        self._key_tokens.pop()
+        self._sizes.pop()
+    
+    def _evict(self, now: float) -> None:
+        """Remove expired entries, then the least recently used ones over the limits."""
+        np = _numpy()
+        if self.ttl is not None and self._values:
+            expired = np.flatnonzero(self._created[:len(self._values)] <= now - self.ttl)
+            # Highest first, so the rows moved into freed slots are never expired ones
+            for row in reversed(expired.tolist()):
+                self._remove(row)
+        
+        while self._values and (len(self._values) > self.max_entries or self.bytes > self.max_bytes):
+            self._remove(int(self._used[:len(self._values)].argmin()))
+            self.evictions += 1
+    
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._vectors = self._scopes = self._created = self._used = None
+            self._keys.clear()
+            self._values.clear()
+            self._key_tokens.clear()
+            self._sizes.clear()
+            self._rows.clear()
+            self.bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._values),
+                "max_entries": self.max_entries,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "threshold": self.threshold,
+            }
@@ -3,18 +3,21 @@
 import os
 import logging
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 
 # Import routers - use absolute imports instead of relative
 try:
     from src.backend.LLMcontrols.api.router import router as api_router
+    from src.backend.LLMcontrols.metrics import metrics, HTTP_IN_FLIGHT, HTTP_REQUESTS, HTTP_ERRORS
 except ImportError:
     # Alternative import path if the above fails
     import sys
     sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
     from backend.LLMcontrols.api.router import router as api_router
+    from backend.LLMcontrols.metrics import metrics, HTTP_IN_FLIGHT, HTTP_REQUESTS, HTTP_ERRORS
 
 # Load environment variables
 load_dotenv()
@@ -49,9 +52,35 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Track in-flight requests and errors per route
+    @app.middleware("http")
+    async def record_metrics(request: Request, call_next):
+        if not metrics.enabled:
+            return await call_next(request)
+        
+        HTTP_IN_FLIGHT.inc()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # Label by route template, not raw path, to keep cardinality bounded
+            route = request.scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            HTTP_REQUESTS.inc(method=request.method, path=path, status=str(status))
+            if status >= 500:
+                HTTP_ERRORS.inc(method=request.method, path=path)
+
     # Include routers
     app.include_router(api_router, prefix="/api")
 
+    @app.get("/metrics", include_in_schema=False)
+    async def get_metrics():
+        """Metrics in the Prometheus text exposition format."""
+        return PlainTextResponse(metrics.expose(), media_type="text/plain; version=0.0.4")
+
     @app.get("/")
     async def root():
         """Root endpoint."""
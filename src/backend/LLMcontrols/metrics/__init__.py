@@ -0,0 +1,66 @@
+"""Prometheus-style metrics for LLMcontrols."""
+
+import os
+
+from .base import Counter, Gauge, Histogram, MetricsRegistry, OTHER_LABEL
+
+# Set METRICS_ENABLED=false to turn every metric update into a no-op
+metrics = MetricsRegistry(enabled=os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false", "no"))
+
+# Flows with their own flow_id series; runs of further flows are counted under "__other__"
+_MAX_FLOW_SERIES = int(os.getenv("METRICS_MAX_FLOWS", "100"))
+
+# Flow execution
+NODE_LATENCY = metrics.histogram(
+    "llmcontrols_node_duration_seconds", "Time spent executing a flow node", ["node_type"]
+)
+FLOW_LATENCY = metrics.histogram(
+    "llmcontrols_flow_duration_seconds", "Time spent running a flow", ["flow_id"],
+    max_series=_MAX_FLOW_SERIES
+)
+FLOW_ERRORS = metrics.counter(
+    "llmcontrols_flow_errors_total", "Flow runs that ended in an error", ["flow_id"],
+    max_series=_MAX_FLOW_SERIES
+)
+
+# Upstream LLM calls
+LLM_LATENCY = metrics.histogram(
+    "llmcontrols_llm_request_duration_seconds", "Latency of upstream LLM requests", ["model"]
+)
+LLM_TOKENS = metrics.counter(
+    "llmcontrols_llm_tokens_total", "Tokens reported by the LLM provider", ["model", "kind"]
+)
+LLM_ERRORS = metrics.counter(
+    "llmcontrols_llm_errors_total", "Upstream LLM requests that failed", ["model"]
+)
+LLM_TIMEOUTS = metrics.counter(
+    "llmcontrols_llm_timeouts_total", "LLM calls cancelled at their deadline", ["model"]
+)
+LLM_HEDGES = metrics.counter(
+    "llmcontrols_llm_hedge_races_total", "Hedged LLM calls by which request answered first", ["model", "winner"]
+)
+LLM_CIRCUIT_STATE = metrics.gauge(
+    "llmcontrols_llm_circuit_state", "Circuit breaker state per model (0 closed, 1 half-open, 2 open)", ["model"]
+)
+LLM_CIRCUIT_REJECTED = metrics.counter(
+    "llmcontrols_llm_circuit_rejected_total", "LLM calls rejected by an open circuit breaker", ["model"]
+)
+
+# HTTP
+HTTP_IN_FLIGHT = metrics.gauge(
+    "llmcontrols_http_requests_in_flight", "HTTP requests currently being served"
+)
+HTTP_REQUESTS = metrics.counter(
+    "llmcontrols_http_requests_total", "HTTP requests served", ["method", "path", "status"]
+)
+HTTP_ERRORS = metrics.counter(
+    "llmcontrols_http_errors_total", "HTTP requests that failed with a server error", ["method", "path"]
+)
+
+__all__ = [
+    "Counter", "Gauge", "Histogram", "MetricsRegistry", "OTHER_LABEL", "metrics",
+    "NODE_LATENCY", "FLOW_LATENCY", "FLOW_ERRORS",
+    "LLM_LATENCY", "LLM_TOKENS", "LLM_ERRORS",
+    "LLM_TIMEOUTS", "LLM_HEDGES", "LLM_CIRCUIT_STATE", "LLM_CIRCUIT_REJECTED",
+    "HTTP_IN_FLIGHT", "HTTP_REQUESTS", "HTTP_ERRORS",
+]
\ No newline at end of file
@@ -0,0 +1,234 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+import math
+import threading
+
+# Default latency buckets in seconds, from 5ms to 60s
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Label value of the series that collects label sets beyond a metric's max_series
+OTHER_LABEL = "__other__"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    """Base class for metrics with an optional fixed set of label names.
+    
+    Labels with unbounded values (such as flow IDs) would add a series per
+    value for the life of the process; with max_series, label sets beyond
+    the first max_series are counted together under OTHER_LABEL.
+    """
+    
+    type_name = "untyped"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: "MetricsRegistry" = None,
+        max_series: Optional[int] = None
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series
+        self._registry = registry
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+    
+    @property
+    def enabled(self) -> bool:
+        return self._registry is None or self._registry.enabled
+    
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """The series of a label set, folded into the overflow series once max_series are in use."""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        if self.max_series is not None and key not in self._values and len(self._values) >= self.max_series:
+            return (OTHER_LABEL,) * len(self.labelnames)
+        return key
+    
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Return the exposition lines for this metric's samples."""
+    
+    def expose(self) -> str:
+        """Render the metric in the Prometheus text format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """A monotonically increasing value."""
+    
+    type_name = "counter"
+    
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            key = self._key(labels)
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+    
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(Metric):
+    """A value that can go up and down."""
+    
+    type_name = "gauge"
+    
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            key = self._key(labels)
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+    
+    def set(self, value: float, **labels: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+    
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+    
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, plus their sum and count."""
+    
+    type_name = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: "MetricsRegistry" = None,
+        max_series: Optional[int] = None,
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames, registry, max_series)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value: float, **labels: str) -> None:
+        if not self.enabled:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            key = self._key(labels)
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+    
+    def get_count(self, **labels: str) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+    
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """A collection of metrics exposed together."""
+    
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, Metric] = {}
+    
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        max_series: Optional[int] = None
+    ) -> Counter:
+        return self._register(Counter(name, documentation, labelnames, self, max_series))
+    
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        max_series: Optional[int] = None
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, self, max_series))
+    
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None,
+        max_series: Optional[int] = None
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, self, max_series, buckets or DEFAULT_BUCKETS))
+    
+    def expose(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        return "\n".join(metric.expose() for metric in self._metrics.values()) + "\n"
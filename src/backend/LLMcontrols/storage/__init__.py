@@ -0,0 +1,49 @@
+"""Storage backends for saved flows, run artifacts and queued jobs."""
+
+import os
+from typing import Optional
+
+from .artifacts import RunArtifactStore
+from .base import FlowStore
+from .jobs import JobStore
+from .memory import InMemoryFlowStore
+from .sqlite import SQLiteFlowStore
+
+
+def create_flow_store(path: Optional[str] = None) -> FlowStore:
+    """Create the flow store configured for this process.
+    
+    Args:
+        path: SQLite database path. Defaults to the FLOW_DB_PATH environment
+            variable, then to flows.db in the working directory. Use ":memory:"
+            to keep flows in process memory only.
+    
+    Tombstones of deleted flows are kept for FLOW_TOMBSTONE_DAYS days
+    (default 30) so clients syncing by version learn about deletions.
+    """
+    path = path or os.getenv("FLOW_DB_PATH", "flows.db")
+    tombstone_ttl = float(os.getenv("FLOW_TOMBSTONE_DAYS", "30")) * 24 * 3600
+    if path == ":memory:":
+        return InMemoryFlowStore(tombstone_ttl=tombstone_ttl)
+    return SQLiteFlowStore(path, tombstone_ttl=tombstone_ttl)
+
+
+def create_job_store(path: Optional[str] = None) -> JobStore:
+    """Create the job store configured for this process.
+    
+    Args:
+        path: SQLite database path. Defaults to the JOB_DB_PATH environment
+            variable, then to the flow database.
+    
+    JOB_MAX_ATTEMPTS sets how many times an interrupted job is run before
+    it is failed.
+    """
+    path = path or os.getenv("JOB_DB_PATH") or os.getenv("FLOW_DB_PATH", "flows.db")
+    return JobStore(path, max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")))
+
+
+__all__ = [
+    "FlowStore", "InMemoryFlowStore", "SQLiteFlowStore",
+    "RunArtifactStore", "JobStore",
+    "create_flow_store", "create_job_store",
+]
\ No newline at end of file
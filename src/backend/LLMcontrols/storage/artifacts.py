@@ -0,0 +1,240 @@
+import os
+import re
+import json
+import shutil
+import asyncio
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Run IDs double as spill file names
+_RUN_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class RunArtifactStore:
+    """Bounded store for the node artifacts of flow runs.
+    
+    Artifacts are serialized to JSON once when a run is stored. Recent runs
+    are kept in memory; when their total size exceeds the memory cap, the
+    oldest runs are spilled to files on disk. Beyond max_runs, the oldest
+    runs are dropped entirely.
+    
+    With write_through, every run is also written to disk when stored, and
+    runs missing from memory are looked up on disk, so worker processes
+    sharing a spill_dir can serve each other's artifacts.
+    
+    Files are written outside the lock; use put_async from the event loop
+    to keep encoding and writing off it too. A temporary spill directory
+    created by the store is removed by close().
+    """
+    
+    def __init__(
+        self,
+        max_memory_bytes: int = 64 * 1024 * 1024,
+        max_runs: int = 1000,
+        spill_dir: Optional[str] = None,
+        write_through: bool = False
+    ):
+        """Initialize the store.
+        
+        Args:
+            max_memory_bytes: Serialized size of artifacts kept in memory.
+            max_runs: Maximum number of runs kept in memory and on disk.
+            spill_dir: Directory for spilled runs. Defaults to a temporary
+                directory, removed by close().
+            write_through: Write every run to spill_dir as it is stored.
+        """
+        self.max_memory_bytes = max_memory_bytes
+        self.max_runs = max_runs
+        self.write_through = write_through
+        self._owns_spill_dir = spill_dir is None
+        self.spill_dir = spill_dir or tempfile.mkdtemp(prefix="llmcontrols-artifacts-")
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self._memory: "OrderedDict[str, Tuple[Dict[str, str], int]]" = OrderedDict()
+        self._spilled: "OrderedDict[str, str]" = OrderedDict()
+        # Runs moved out of memory whose spill file is being written
+        self._writing: Dict[str, Dict[str, str]] = {}
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+    
+    def put(self, run_id: str, artifacts: Dict[str, Any]) -> None:
+        """Store the artifacts of a run, keyed by node ID."""
+        encoded = {key: json.dumps(value, default=str) for key, value in artifacts.items()}
+        size = sum(len(key) + len(value) for key, value in encoded.items())
+        path = self._write(run_id, encoded) if self.write_through else None
+        
+        with self._lock:
+            self._remove(run_id, unlink=path is None)
+            if path is not None:
+                self._spilled[run_id] = path
+            self._memory[run_id] = (encoded, size)
+            self._memory_bytes += size
+            spilled = self._spill()
+            self._trim()
+        
+        for spilled_id, spilled_encoded in spilled:
+            spilled_path = self._write(spilled_id, spilled_encoded)
+            with self._lock:
+                if self._writing.get(spilled_id) is not spilled_encoded:
+                    # Deleted or stored again while being written
+                    if spilled_path is not None and spilled_id not in self._spilled:
+                        self._unlink(spilled_path)
+                    continue
+                del self._writing[spilled_id]
+                if spilled_path is not None:
+                    self._spilled[spilled_id] = spilled_path
+                    self._trim()
+    
+    async def put_async(self, run_id: str, artifacts: Dict[str, Any]) -> None:
+        """Store the artifacts of a run from a worker thread, see put."""
+        await asyncio.to_thread(self.put, run_id, artifacts)
+    
+    def _spill(self) -> List[Tuple[str, Dict[str, str]]]:
+        """Move the oldest in-memory runs out until under the memory cap.
+        
+        Returns:
+            The (run ID, encoded artifacts) to write to disk; until then
+            they are served from _writing.
+        """
+        spilled = []
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            run_id, (encoded, size) = self._memory.popitem(last=False)
+            self._memory_bytes -= size
+            if run_id in self._spilled:
+                # Already on disk (write-through)
+                continue
+            self._writing[run_id] = encoded
+            spilled.append((run_id, encoded))
+        return spilled
+    
+    def _write(self, run_id: str, encoded: Dict[str, str]) -> Optional[str]:
+        path = os.path.join(self.spill_dir, f"{run_id}.json")
+        try:
+            # Write then rename, so readers in other processes never see a partial file
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(encoded, f)
+            os.replace(temp_path, path)
+            return path
+        except OSError as e:
+            logger.warning(f"Could not write artifacts of run {run_id}: {str(e)}")
+            return None
+    
+    def _run_count(self) -> int:
+        if self.write_through:
+            # Runs in memory are on disk as well
+            return len(self._spilled)
+        return len(self._memory) + len(self._spilled)
+    
+    def _trim(self) -> None:
+        """Drop the oldest runs, spilled ones first, beyond max_runs."""
+        while self._run_count() > self.max_runs:
+            if self._spilled:
+                run_id, path = self._spilled.popitem(last=False)
+                self._unlink(path)
+                entry = self._memory.pop(run_id, None)
+                if entry is not None:
+                    self._memory_bytes -= entry[1]
+            else:
+                _, (_, size) = self._memory.popitem(last=False)
+                self._memory_bytes -= size
+    
+    def _remove(self, run_id: str, unlink: bool = True) -> bool:
+        removed = self._writing.pop(run_id, None) is not None
+        entry = self._memory.pop(run_id, None)
+        if entry is not None:
+            self._memory_bytes -= entry[1]
+            removed = True
+        path = self._spilled.pop(run_id, None)
+        if path is not None:
+            if unlink:
+                self._unlink(path)
+            removed = True
+        return removed
+    
+    @staticmethod
+    def _unlink(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    
+    def _load(self, run_id: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            entry = self._memory.get(run_id)
+            if entry is not None:
+                return entry[0]
+            if run_id in self._writing:
+                return self._writing[run_id]
+            path = self._spilled.get(run_id)
+        if path is None:
+            # Possibly stored by another process sharing the spill directory
+            if not self.write_through or not _RUN_ID.match(run_id):
+                return None
+            path = os.path.join(self.spill_dir, f"{run_id}.json")
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def list(self, run_id: str) -> Optional[List[str]]:
+        """Return the node IDs with artifacts for a run, or None if the run is unknown."""
+        encoded = self._load(run_id)
+        return list(encoded) if encoded is not None else None
+    
+    def get(self, run_id: str, node_id: str) -> Any:
+        """Return one artifact of a run.
+        
+        Raises:
+            KeyError: If the run or the node artifact is not stored.
+        """
+        encoded = self._load(run_id)
+        if encoded is None or node_id not in encoded:
+            raise KeyError(node_id)
+        return json.loads(encoded[node_id])
+    
+    def delete(self, run_id: str) -> bool:
+        """Delete the artifacts of a run. Returns False if it was unknown."""
+        with self._lock:
+            if self._remove(run_id):
+                return True
+        if self.write_through and _RUN_ID.match(run_id):
+            try:
+                os.remove(os.path.join(self.spill_dir, f"{run_id}.json"))
+                return True
+            except OSError:
+                pass
+        return False
+    
+    def clear(self) -> None:
+        """Delete all stored runs, including spilled files."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            for path in self._spilled.values():
+                self._unlink(path)
+            self._spilled.clear()
+            self._writing.clear()
+    
+    def close(self) -> None:
+        """Delete the spill directory with its runs if the store created it.
+        
+        A spill_dir passed in may be shared with other processes and is left as is.
+        """
+        if self._owns_spill_dir:
+            self.clear()
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "runs_in_memory": len(self._memory),
+                "runs_on_disk": len(self._spilled),
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+            }
@@ -0,0 +1,109 @@
+from typing import Dict, List, Any, Optional, Tuple
+from abc import ABC, abstractmethod
+
+# Fields returned by the summary projection of a flow listing
+SUMMARY_FIELDS = ("id", "name", "description", "created_at", "updated_at", "version")
+
+
+def summarize_flow(flow: Dict[str, Any]) -> Dict[str, Any]:
+    """Project a flow down to its metadata, replacing nodes and edges by counts."""
+    summary = {field: flow.get(field) for field in SUMMARY_FIELDS}
+    summary["node_count"] = len(flow.get("nodes") or [])
+    summary["edge_count"] = len(flow.get("edges") or [])
+    return summary
+
+
+class FlowStore(ABC):
+    """Interface for flow storage backends.
+    
+    Flows are plain dictionaries in the shape of the API's Flow model, with
+    created_at and updated_at as datetimes. Every save and delete takes the
+    next value of a store-wide, increasing version counter; a saved flow
+    keeps it as its "version", so clients can sync by version.
+    
+    A flow also has a graph version: the version of its last save that
+    changed more than node positions. The stored plan, and what workers
+    derive from it, are validated against the graph version, so moving
+    nodes around in an editor (save_layout) invalidates none of them.
+    """
+    
+    @abstractmethod
+    def get(self, flow_id: str) -> Optional[Dict[str, Any]]:
+        """Get a flow by ID, or None if it does not exist."""
+    
+    @abstractmethod
+    def save(self, flow: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert or replace a flow, set its new version and updated_at, and return it."""
+    
+    @abstractmethod
+    def save_layout(self, flow: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Save a flow whose nodes were only moved, keeping its graph version and stored plan.
+        
+        Returns the flow with its new version and updated_at, or None if
+        it no longer exists.
+        """
+    
+    @abstractmethod
+    def get_version(self, flow_id: str) -> Optional[int]:
+        """Get the current version of a flow, or None if it does not exist."""
+    
+    @abstractmethod
+    def get_graph_version(self, flow_id: str) -> Optional[int]:
+        """Get the graph version of a flow, or None if it does not exist."""
+    
+    @abstractmethod
+    def get_plan(self, flow_id: str) -> Optional[Tuple[int, Optional[Dict[str, Any]], List[Dict[str, Any]]]]:
+        """Get the graph version of a flow, its stored execution plan and its nodes.
+        
+        The plan is saved from the flow's "plan" key and is not returned by
+        get or list; it refers to the nodes for their IDs, types and data.
+        Returns None if the flow does not exist, and a None plan (with no
+        nodes) for flows saved without one.
+        """
+    
+    @abstractmethod
+    def delete(self, flow_id: str) -> bool:
+        """Delete a flow. Returns False if it did not exist."""
+    
+    @abstractmethod
+    def list(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        summary: bool = False
+    ) -> List[Dict[str, Any]]:
+        """List flows, most recently updated first.
+        
+        Args:
+            offset: Number of flows to skip.
+            limit: Maximum number of flows to return. None returns all.
+            summary: Return only metadata and node/edge counts instead of
+                full flows.
+        """
+    
+    @abstractmethod
+    def changes_since(self, since: int, summary: bool = False) -> Dict[str, Any]:
+        """List what changed after a version of the store.
+        
+        Deleted flows leave a tombstone, removed again if the flow is saved,
+        so clients can drop flows deleted since their last sync. Tombstones
+        are pruned after a while; a client whose cursor is older than the
+        pruned ones gets every flow back, flagged "reset".
+        
+        Args:
+            since: Cursor returned by the previous call, or 0 for everything.
+            summary: Return changed flows as summaries.
+        
+        Returns:
+            "flows": flows saved after since, oldest change first.
+            "deleted": {"id", "deleted_at", "version"} for flows deleted after since.
+            "cursor": the store version covered, to pass as since next time.
+            "reset": True if the client must replace all its flows with "flows".
+        """
+    
+    @abstractmethod
+    def count(self) -> int:
+        """Return the number of stored flows."""
+    
+    def __contains__(self, flow_id: str) -> bool:
+        return self.get(flow_id) is not None
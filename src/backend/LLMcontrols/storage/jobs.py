@@ -0,0 +1,203 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+from datetime import datetime
+
+# Job lifecycle states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+
+class JobStore:
+    """SQLite-backed state of queued flow runs.
+    
+    Keeping jobs in the local database lets queued and interrupted runs
+    survive a restart of the process executing them. Running jobs hold a
+    lease that their worker renews; a job whose lease expires is claimed
+    again, so several processes can share the table without re-running each
+    other's live jobs. A job whose lease expired max_attempts times, e.g.
+    because running it kills its worker, is failed instead.
+    
+    A claim is identified by the job's attempts count when it was claimed.
+    Renewing the lease and finishing the job only succeed for the latest
+    claim, so a worker whose lease expired cannot overwrite the outcome of
+    the worker that claimed the job after it.
+    """
+    
+    def __init__(self, path: str, max_attempts: int = 3):
+        """Open (and create if needed) the job table.
+        
+        Args:
+            path: Path of the SQLite database file, or ":memory:".
+            max_attempts: How many times a job is claimed before an expired
+                lease fails it instead of making it available again.
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                flow_id TEXT NOT NULL,
+                request TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT,
+                lease_until REAL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status_created_at ON jobs (status, created_at);
+            """
+        )
+        self._ensure_column("lease_until", "REAL")
+    
+    def _ensure_column(self, name: str, declaration: str) -> None:
+        """Add a column to databases created before it existed."""
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if name not in columns:
+            self._db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {declaration}")
+    
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "flow_id": row["flow_id"],
+            "request": json.loads(row["request"]),
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+    
+    def create(self, job_id: str, flow_id: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Add a queued job."""
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, flow_id, request, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, flow_id, json.dumps(request, default=str), QUEUED, datetime.now().isoformat())
+            )
+        return self.get(job_id)
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row is not None else None
+    
+    def claim_next(self, lease_seconds: float = 60.0) -> Optional[Dict[str, Any]]:
+        """Atomically claim the oldest available job and return it.
+        
+        Queued jobs are available, and so are running jobs whose lease has
+        expired because the worker running them stopped, unless they already
+        had max_attempts attempts; those are marked as failed.
+        
+        Args:
+            lease_seconds: How long the claim holds unless renewed.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_until = NULL"
+                    " WHERE status = ? AND (lease_until IS NULL OR lease_until < ?) AND attempts >= ?",
+                    (
+                        FAILED,
+                        f"Job abandoned after {self.max_attempts} attempts",
+                        datetime.now().isoformat(),
+                        RUNNING,
+                        now,
+                        self.max_attempts,
+                    )
+                )
+                row = self._db.execute(
+                    "SELECT id FROM jobs"
+                    " WHERE status = ? OR (status = ? AND (lease_until IS NULL OR lease_until < ?))"
+                    " ORDER BY created_at LIMIT 1",
+                    (QUEUED, RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    self._db.execute("COMMIT")
+                    return None
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, started_at = ?, lease_until = ?, attempts = attempts + 1"
+                    " WHERE id = ?",
+                    (RUNNING, datetime.now().isoformat(), now + lease_seconds, row["id"])
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return self.get(row["id"])
+    
+    def renew_lease(self, job_id: str, attempt: int, lease_seconds: float = 60.0) -> bool:
+        """Extend the lease of a claim.
+        
+        Args:
+            job_id: ID of the job.
+            attempt: The job's attempts count returned by claim_next.
+            lease_seconds: How long the claim holds from now.
+        
+        Returns:
+            False if the job is no longer running under this claim.
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = ? AND attempts = ?",
+                (time.time() + lease_seconds, job_id, RUNNING, attempt)
+            )
+        return cursor.rowcount > 0
+    
+    def finish(
+        self,
+        job_id: str,
+        attempt: int,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> bool:
+        """Record the outcome of a claimed job.
+        
+        Args:
+            job_id: ID of the job.
+            attempt: The job's attempts count returned by claim_next.
+            result: The result of the run.
+            error: Why the run failed; the job is marked as failed if set.
+        
+        Returns:
+            False, recording nothing, if the job is no longer running under
+            this claim (its lease expired and it was claimed again or failed).
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL"
+                " WHERE id = ? AND status = ? AND attempts = ?",
+                (
+                    FAILED if error else SUCCEEDED,
+                    json.dumps(result, default=str) if result is not None else None,
+                    error,
+                    datetime.now().isoformat(),
+                    job_id,
+                    RUNNING,
+                    attempt,
+                )
+            )
+        return cursor.rowcount > 0
+    
+    def count(self, status: str) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
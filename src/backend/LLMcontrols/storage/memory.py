@@ -0,0 +1,130 @@
+from typing import Dict, List, Any, Optional, Tuple
+from datetime import datetime, timedelta
+
+from .base import FlowStore, summarize_flow
+
+
+class InMemoryFlowStore(FlowStore):
+    """Flow store backed by a process-local dictionary."""
+    
+    def __init__(self, tombstone_ttl: Optional[float] = 30 * 24 * 3600):
+        """Initialize an empty store.
+        
+        Args:
+            tombstone_ttl: Seconds tombstones of deleted flows are kept. None keeps them forever.
+        """
+        self.flows: Dict[str, Dict[str, Any]] = {}
+        self.version = 0
+        self.tombstone_ttl = tombstone_ttl
+        # Flow ID -> (deleted_at, version)
+        self.tombstones: Dict[str, Tuple[datetime, int]] = {}
+        # Highest version of a pruned tombstone; older cursors must resync
+        self.pruned_version = 0
+        self.plans: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.graph_versions: Dict[str, int] = {}
+    
+    def get(self, flow_id: str) -> Optional[Dict[str, Any]]:
+        return self.flows.get(flow_id)
+    
+    def save(self, flow: Dict[str, Any]) -> Dict[str, Any]:
+        self.version += 1
+        flow["version"] = self.version
+        flow["updated_at"] = datetime.now()
+        self.plans[flow["id"]] = flow.pop("plan", None)
+        self.graph_versions[flow["id"]] = self.version
+        self.flows[flow["id"]] = flow
+        self.tombstones.pop(flow["id"], None)
+        return flow
+    
+    def save_layout(self, flow: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if flow["id"] not in self.flows:
+            return None
+        self.version += 1
+        flow["version"] = self.version
+        flow["updated_at"] = datetime.now()
+        flow.pop("plan", None)
+        self.flows[flow["id"]] = flow
+        return flow
+    
+    def get_version(self, flow_id: str) -> Optional[int]:
+        flow = self.flows.get(flow_id)
+        return flow.get("version") if flow is not None else None
+    
+    def get_graph_version(self, flow_id: str) -> Optional[int]:
+        if flow_id not in self.flows:
+            return None
+        return self.graph_versions.get(flow_id, self.flows[flow_id].get("version"))
+    
+    def get_plan(self, flow_id: str) -> Optional[Tuple[int, Optional[Dict[str, Any]], List[Dict[str, Any]]]]:
+        flow = self.flows.get(flow_id)
+        if flow is None:
+            return None
+        plan = self.plans.get(flow_id)
+        return self.get_graph_version(flow_id), plan, (flow.get("nodes") or []) if plan is not None else []
+    
+    def delete(self, flow_id: str) -> bool:
+        if self.flows.pop(flow_id, None) is None:
+            return False
+        self.plans.pop(flow_id, None)
+        self.graph_versions.pop(flow_id, None)
+        self.version += 1
+        now = datetime.now()
+        self.tombstones[flow_id] = (now, self.version)
+        self._prune_tombstones(now)
+        return True
+    
+    def _prune_tombstones(self, now: datetime) -> None:
+        if self.tombstone_ttl is None:
+            return
+        cutoff = now - timedelta(seconds=self.tombstone_ttl)
+        for flow_id, (deleted_at, version) in list(self.tombstones.items()):
+            if deleted_at <= cutoff:
+                del self.tombstones[flow_id]
+                self.pruned_version = max(self.pruned_version, version)
+    
+    def list(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        summary: bool = False
+    ) -> List[Dict[str, Any]]:
+        ordered = sorted(
+            self.flows.values(),
+            key=lambda flow: flow.get("updated_at") or datetime.min,
+            reverse=True
+        )
+        end = None if limit is None else offset + limit
+        page = ordered[offset:end]
+        return [summarize_flow(flow) for flow in page] if summary else page
+    
+    def changes_since(self, since: int, summary: bool = False) -> Dict[str, Any]:
+        reset = 0 < since < self.pruned_version
+        full = reset or since <= 0
+        if full:
+            # Flows saved before versions existed have version 0
+            since = -1
+        changed = sorted(
+            (flow for flow in self.flows.values() if flow.get("version", 0) > since),
+            key=lambda flow: flow.get("version", 0)
+        )
+        deleted = [] if full else sorted(
+            (
+                {"id": flow_id, "deleted_at": deleted_at, "version": version}
+                for flow_id, (deleted_at, version) in self.tombstones.items() if version > since
+            ),
+            key=lambda tombstone: tombstone["version"]
+        )
+        changes = {
+            "flows": [summarize_flow(flow) for flow in changed] if summary else changed,
+            "deleted": deleted,
+            "cursor": self.version,
+        }
+        if reset:
+            changes["reset"] = True
+        return changes
+    
+    def count(self) -> int:
+        return len(self.flows)
+    
+    def __contains__(self, flow_id: str) -> bool:
+        return flow_id in self.flows
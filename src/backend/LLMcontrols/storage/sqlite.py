@@ -0,0 +1,314 @@
+import json
+import sqlite3
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+from datetime import datetime, timedelta
+
+from .base import FlowStore
+
+
+def _to_text(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def _from_text(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+# Columns read back into flows; the stored plan is only read by get_plan
+_FLOW_COLUMNS = "id, name, description, nodes, edges, created_at, updated_at, execution_order, version"
+
+
+class SQLiteFlowStore(FlowStore):
+    """Flow store persisted in a SQLite database.
+    
+    Flow metadata lives in indexed columns so listings and summary
+    projections never have to decode the node and edge JSON.
+    """
+    
+    def __init__(self, path: str, tombstone_ttl: Optional[float] = 30 * 24 * 3600):
+        """Open (and create if needed) the flow database.
+        
+        Args:
+            path: Path of the SQLite database file.
+            tombstone_ttl: Seconds tombstones of deleted flows are kept. None keeps them forever.
+        """
+        self.path = path
+        self.tombstone_ttl = tombstone_ttl
+        self._lock = threading.Lock()
+        # Other worker processes may hold the write lock briefly; wait for it
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS flows (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                description TEXT,
+                nodes TEXT NOT NULL,
+                edges TEXT NOT NULL,
+                node_count INTEGER NOT NULL,
+                edge_count INTEGER NOT NULL,
+                created_at TEXT,
+                updated_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS flows_name ON flows (name);
+            CREATE INDEX IF NOT EXISTS flows_updated_at ON flows (updated_at);
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO counters (name, value) VALUES ('flow_version', 0);
+            INSERT OR IGNORE INTO counters (name, value) VALUES ('tombstones_pruned', 0);
+            CREATE TABLE IF NOT EXISTS flow_tombstones (
+                id TEXT PRIMARY KEY,
+                deleted_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS flow_tombstones_deleted_at ON flow_tombstones (deleted_at);
+            """
+        )
+        self._ensure_column("execution_order", "TEXT")
+        self._ensure_column("version", "INTEGER NOT NULL DEFAULT 0")
+        self._ensure_column("plan", "TEXT")
+        if self._ensure_column("graph_version", "INTEGER NOT NULL DEFAULT 0"):
+            self._db.execute("UPDATE flows SET graph_version = version")
+        self._ensure_column("version", "INTEGER NOT NULL DEFAULT 0", table="flow_tombstones")
+        self._db.execute("CREATE INDEX IF NOT EXISTS flows_version ON flows (version)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS flow_tombstones_version ON flow_tombstones (version)")
+        self._db.commit()
+    
+    def _ensure_column(self, name: str, declaration: str, table: str = "flows") -> bool:
+        """Add a column to databases created before it existed. Returns True if it was added."""
+        columns = {row["name"] for row in self._db.execute(f"PRAGMA table_info({table})")}
+        if name in columns:
+            return False
+        self._db.execute(f"ALTER TABLE {table} ADD COLUMN {name} {declaration}")
+        return True
+    
+    def _next_version(self) -> int:
+        """Take the next store version; call within a write transaction.
+        
+        Versions come from one global counter, so they are never reused even
+        when a flow is deleted and re-created. Writers hold the database's
+        write lock from taking a version until they commit, so versions
+        become visible in order and a sync cursor never skips one.
+        """
+        self._db.execute("UPDATE counters SET value = value + 1 WHERE name = 'flow_version'")
+        return self._db.execute("SELECT value FROM counters WHERE name = 'flow_version'").fetchone()[0]
+    
+    def _counter(self, name: str) -> int:
+        return self._db.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()[0]
+    
+    @staticmethod
+    def _row_to_flow(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "name": row["name"],
+            "description": row["description"],
+            "nodes": json.loads(row["nodes"]),
+            "edges": json.loads(row["edges"]),
+            "created_at": _from_text(row["created_at"]),
+            "updated_at": _from_text(row["updated_at"]),
+            "execution_order": json.loads(row["execution_order"]) if row["execution_order"] else None,
+            "version": row["version"],
+        }
+    
+    @staticmethod
+    def _row_to_summary(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "name": row["name"],
+            "description": row["description"],
+            "created_at": _from_text(row["created_at"]),
+            "updated_at": _from_text(row["updated_at"]),
+            "node_count": row["node_count"],
+            "edge_count": row["edge_count"],
+            "version": row["version"],
+        }
+    
+    def get(self, flow_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(f"SELECT {_FLOW_COLUMNS} FROM flows WHERE id = ?", (flow_id,)).fetchone()
+        return self._row_to_flow(row) if row is not None else None
+    
+    def save(self, flow: Dict[str, Any]) -> Dict[str, Any]:
+        nodes = flow.get("nodes") or []
+        edges = flow.get("edges") or []
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                version = self._next_version()
+                # Stamped under the write lock, so updated_at follows commit order
+                updated_at = datetime.now()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO flows"
+                    " (id, name, description, nodes, edges, node_count, edge_count, created_at, updated_at,"
+                    " execution_order, version, graph_version, plan)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        flow["id"],
+                        flow.get("name", ""),
+                        flow.get("description"),
+                        json.dumps(nodes, default=str),
+                        json.dumps(edges, default=str),
+                        len(nodes),
+                        len(edges),
+                        _to_text(flow.get("created_at")),
+                        _to_text(updated_at),
+                        json.dumps(flow["execution_order"]) if flow.get("execution_order") is not None else None,
+                        version,
+                        version,
+                        json.dumps(flow["plan"], default=str) if flow.get("plan") is not None else None,
+                    )
+                )
+                self._db.execute("DELETE FROM flow_tombstones WHERE id = ?", (flow["id"],))
+            except Exception:
+                self._db.rollback()
+                raise
+            self._db.commit()
+        flow["version"] = version
+        flow["updated_at"] = updated_at
+        return flow
+    
+    def save_layout(self, flow: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                version = self._next_version()
+                updated_at = datetime.now()
+                # Only the nodes' positions changed; plan and graph_version stay valid
+                updated = self._db.execute(
+                    "UPDATE flows SET nodes = ?, updated_at = ?, version = ? WHERE id = ?",
+                    (json.dumps(flow.get("nodes") or [], default=str), _to_text(updated_at), version, flow["id"])
+                ).rowcount > 0
+            except Exception:
+                self._db.rollback()
+                raise
+            if updated:
+                self._db.commit()
+            else:
+                # Deleted meanwhile; don't use up a version
+                self._db.rollback()
+                return None
+        flow["version"] = version
+        flow["updated_at"] = updated_at
+        return flow
+    
+    def get_version(self, flow_id: str) -> Optional[int]:
+        with self._lock:
+            row = self._db.execute("SELECT version FROM flows WHERE id = ?", (flow_id,)).fetchone()
+        return row["version"] if row is not None else None
+    
+    def get_graph_version(self, flow_id: str) -> Optional[int]:
+        with self._lock:
+            row = self._db.execute("SELECT graph_version FROM flows WHERE id = ?", (flow_id,)).fetchone()
+        return row["graph_version"] if row is not None else None
+    
+    def get_plan(self, flow_id: str) -> Optional[Tuple[int, Optional[Dict[str, Any]], List[Dict[str, Any]]]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT graph_version, plan, nodes FROM flows WHERE id = ?", (flow_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        if not row["plan"]:
+            return row["graph_version"], None, []
+        return row["graph_version"], json.loads(row["plan"]), json.loads(row["nodes"])
+    
+    def delete(self, flow_id: str) -> bool:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                deleted = self._db.execute("DELETE FROM flows WHERE id = ?", (flow_id,)).rowcount > 0
+                if deleted:
+                    now = datetime.now()
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO flow_tombstones (id, deleted_at, version) VALUES (?, ?, ?)",
+                        (flow_id, _to_text(now), self._next_version())
+                    )
+                    self._prune_tombstones(now)
+            except Exception:
+                self._db.rollback()
+                raise
+            self._db.commit()
+        return deleted
+    
+    def _prune_tombstones(self, now: datetime) -> None:
+        """Drop expired tombstones, remembering the newest version dropped."""
+        if self.tombstone_ttl is None:
+            return
+        cutoff = _to_text(now - timedelta(seconds=self.tombstone_ttl))
+        pruned = self._db.execute(
+            "SELECT MAX(version) FROM flow_tombstones WHERE deleted_at <= ?", (cutoff,)
+        ).fetchone()[0]
+        if pruned is not None:
+            self._db.execute(
+                "UPDATE counters SET value = MAX(value, ?) WHERE name = 'tombstones_pruned'", (pruned,)
+            )
+            self._db.execute("DELETE FROM flow_tombstones WHERE deleted_at <= ?", (cutoff,))
+    
+    def list(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        summary: bool = False
+    ) -> List[Dict[str, Any]]:
+        columns = (
+            "id, name, description, node_count, edge_count, created_at, updated_at, version"
+            if summary else _FLOW_COLUMNS
+        )
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {columns} FROM flows ORDER BY updated_at DESC LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset)
+            ).fetchall()
+        convert = self._row_to_summary if summary else self._row_to_flow
+        return [convert(row) for row in rows]
+    
+    def changes_since(self, since: int, summary: bool = False) -> Dict[str, Any]:
+        columns = (
+            "id, name, description, node_count, edge_count, created_at, updated_at, version"
+            if summary else _FLOW_COLUMNS
+        )
+        with self._lock:
+            # One read transaction, so the cursor matches exactly the rows read
+            self._db.execute("BEGIN")
+            try:
+                cursor = self._counter("flow_version")
+                reset = 0 < since < self._counter("tombstones_pruned")
+                full = reset or since <= 0
+                # Flows saved before versions existed have version 0
+                after = -1 if full else since
+                rows = self._db.execute(
+                    f"SELECT {columns} FROM flows WHERE version > ? ORDER BY version", (after,)
+                ).fetchall()
+                tombstones = [] if full else self._db.execute(
+                    "SELECT id, deleted_at, version FROM flow_tombstones WHERE version > ? ORDER BY version",
+                    (after,)
+                ).fetchall()
+            finally:
+                self._db.commit()
+        convert = self._row_to_summary if summary else self._row_to_flow
+        changes = {
+            "flows": [convert(row) for row in rows],
+            "deleted": [
+                {"id": row["id"], "deleted_at": _from_text(row["deleted_at"]), "version": row["version"]}
+                for row in tombstones
+            ],
+            "cursor": cursor,
+        }
+        if reset:
+            changes["reset"] = True
+        return changes
+    
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM flows").fetchone()[0]
+    
+    def __contains__(self, flow_id: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM flows WHERE id = ?", (flow_id,)).fetchone()
+        return row is not None
@@ -0,0 +1,274 @@
+"""Micro-benchmarks for the graph engine on synthetic flows.
+
+Usage:
+    python src/backend/benchmarks/graph_benchmark.py
+    python src/backend/benchmarks/graph_benchmark.py --sizes 10,1000,100000 --shapes chain,random
+    python src/backend/benchmarks/graph_benchmark.py --save-baseline baseline.json
+    python src/backend/benchmarks/graph_benchmark.py --compare baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import tracemalloc
+from typing import Callable, Dict, List, Any, Tuple
+
+# Add the project root to the Python path (same layout as run_server.py)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, "..", ".."))
+sys.path.insert(0, project_root)
+
+from backend.LLMcontrols.components import ComponentRegistry, NodeBuilder, RunContext
+from backend.LLMcontrols.graph import Graph, ExecutionPlan, compile_flow
+from backend.LLMcontrols.graph.executor import FlowExecutor
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+EdgeList = List[Tuple[int, int]]
+
+
+class MockLLMBuilder(NodeBuilder):
+    """Answers instantly, so runs measure the engine rather than an LLM."""
+    
+    def run(self, component: Any, inputs: Dict[str, Any], context: RunContext) -> Any:
+        return {
+            "text": f"This is a response from the LLM with model {component.get('model_name', 'unknown')}",
+            "model": component.get("model_name", "unknown"),
+            "temperature": component.get("temperature", 0.7)
+        }
+
+
+def make_registry() -> ComponentRegistry:
+    """The default components, with LLM nodes answered by MockLLMBuilder."""
+    registry = ComponentRegistry()
+    registry.load_default_components()
+    registry.register_builder("llm", MockLLMBuilder())
+    return registry
+
+
+REGISTRY = make_registry()
+
+
+def chain_edges(size: int, rng: random.Random) -> EdgeList:
+    """A single path 0 -> 1 -> ... -> size-1."""
+    return [(i, i + 1) for i in range(size - 1)]
+
+
+def fanout_edges(size: int, rng: random.Random) -> EdgeList:
+    """One root feeding size-2 parallel nodes that all join into one sink."""
+    sink = size - 1
+    return [(0, i) for i in range(1, sink)] + [(i, sink) for i in range(1, sink)]
+
+
+def diamond_edges(size: int, rng: random.Random) -> EdgeList:
+    """A chain of diamonds: each step splits in two and joins again."""
+    edges = []
+    top = 0
+    while top + 3 < size:
+        left, right, bottom = top + 1, top + 2, top + 3
+        edges += [(top, left), (top, right), (left, bottom), (right, bottom)]
+        top = bottom
+    edges += [(i, i + 1) for i in range(top, size - 1)]
+    return edges
+
+
+def random_edges(size: int, rng: random.Random, average_degree: float = 2.0) -> EdgeList:
+    """A random DAG: each node links to a few earlier nodes."""
+    edges = []
+    for target in range(1, size):
+        window = max(1, min(target, 50))
+        for _ in range(max(1, int(rng.expovariate(1 / average_degree)))):
+            edges.append((target - rng.randint(1, window), target))
+    return sorted(set(edges))
+
+
+SHAPES: Dict[str, Callable[[int, random.Random], EdgeList]] = {
+    "chain": chain_edges,
+    "fanout": fanout_edges,
+    "diamond": diamond_edges,
+    "random": random_edges,
+}
+
+
+def make_flow(shape: str, size: int, seed: int = 0) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Build node and edge dicts for a synthetic flow.
+    
+    Node 0 is a chatInput, sinks are chatOutput, direct children of the
+    input are llm nodes and the remaining nodes alternate prompt/llm.
+    """
+    size = max(size, 3)
+    rng = random.Random(seed)
+    edges = SHAPES[shape](size, rng)
+    
+    parents: Dict[int, List[int]] = {i: [] for i in range(size)}
+    children: Dict[int, List[int]] = {i: [] for i in range(size)}
+    for source, target in edges:
+        parents[target].append(source)
+        children[source].append(target)
+    # Every node must be reachable from the input
+    for i in range(1, size):
+        if not parents[i]:
+            edges.append((0, i))
+            parents[i].append(0)
+            children[0].append(i)
+    
+    nodes = []
+    for i in range(size):
+        if i == 0:
+            node_type, data = "chatInput", {}
+        elif not children[i]:
+            node_type, data = "chatOutput", {}
+        elif 0 in parents[i] or i % 2:
+            node_type, data = "llm", {"model_name": "mock", "temperature": 0}
+        else:
+            node_type, data = "prompt", {"template": "Context: {input}"}
+        nodes.append({"id": f"n{i}", "type": node_type, "data": data, "position": {"x": i, "y": 0}})
+    
+    edge_dicts = [
+        {"id": f"e{k}", "source": f"n{s}", "target": f"n{t}", "sourceHandle": None, "targetHandle": None}
+        for k, (s, t) in enumerate(edges)
+    ]
+    return nodes, edge_dicts
+
+
+def best_of(repeat: int, func: Callable[[], Any]) -> float:
+    """Return the fastest of several timed runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run_case(shape: str, size: int, repeat: int) -> Dict[str, float]:
+    """Benchmark one synthetic flow and return its measurements."""
+    nodes, edges = make_flow(shape, size)
+    node_count, edge_count = len(nodes), len(edges)
+    
+    construct = best_of(repeat, lambda: Graph(nodes=nodes, edges=edges))
+    graph = Graph(nodes=nodes, edges=edges)
+    topo = best_of(repeat, graph.topological_sort)
+    node_ids = [node["id"] for node in nodes]
+    inputs = best_of(repeat, lambda: [graph.get_node_inputs(node_id) for node_id in node_ids])
+    execute = best_of(repeat, lambda: FlowExecutor(graph, registry=REGISTRY).execute({"input": "benchmark"}))
+    
+    result = FlowExecutor(graph, registry=REGISTRY).execute({"input": "benchmark"})
+    if "error" in result:
+        raise RuntimeError(f"{shape}/{size} failed to execute: {result['error']}")
+    
+    # Peak memory of building and executing the graph, measured separately
+    tracemalloc.start()
+    FlowExecutor(Graph(nodes=nodes, edges=edges), registry=REGISTRY).execute({"input": "benchmark"})
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    # Memory kept by the execution plan a worker caches, loaded like a stored flow's plan
+    payload = json.dumps({"nodes": nodes, "plan": compile_flow({"nodes": nodes, "edges": edges}, REGISTRY).to_dict()})
+    tracemalloc.start()
+    flow = json.loads(payload)
+    kept = ExecutionPlan.from_dict(flow["plan"], flow["nodes"])
+    del flow
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    
+    return {
+        "nodes": node_count,
+        "edges": edge_count,
+        "construct_s": construct,
+        "topological_sort_s": topo,
+        "get_node_inputs_us": inputs / node_count * 1e6,
+        "execute_s": execute,
+        "execute_nodes_per_s": node_count / execute if execute else 0.0,
+        "peak_memory_mb": peak / (1024 * 1024),
+        "graph_memory_mb": retained / (1024 * 1024),
+    }
+
+
+# Metrics compared against the baseline; lower is better for all of them
+COMPARED = ("construct_s", "topological_sort_s", "get_node_inputs_us", "execute_s", "peak_memory_mb",
+            "graph_memory_mb")
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """Print a comparison table and return the regressions beyond threshold."""
+    regressions = []
+    print(f"\n{'case':<16}{'metric':<22}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for case, metrics in results.items():
+        if case not in baseline:
+            continue
+        for metric in COMPARED:
+            old, new = baseline[case].get(metric), metrics.get(metric)
+            if not old or new is None:
+                continue
+            ratio = new / old
+            flag = " !" if ratio > threshold else ""
+            print(f"{case:<16}{metric:<22}{old:>12.6g}{new:>12.6g}{ratio:>7.2f}x{flag}")
+            if ratio > threshold:
+                regressions.append(f"{case} {metric}: {ratio:.2f}x slower than baseline")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the LLMcontrols graph engine.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated node counts (default: %(default)s)")
+    parser.add_argument("--shapes", default=",".join(SHAPES),
+                        help="Comma-separated flow shapes (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per measurement; the best is kept")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--save-baseline", help="Write results as a baseline JSON file")
+    parser.add_argument("--compare", help="Compare results with a baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="Ratio over baseline reported as a regression (default: %(default)s)")
+    args = parser.parse_args()
+    
+    # The executor logs every node at INFO level, which would dominate the timings
+    logging.disable(logging.CRITICAL)
+    
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    shapes = [shape for shape in args.shapes.split(",") if shape]
+    results: Dict[str, Dict[str, float]] = {}
+    
+    print(f"{'case':<16}{'nodes':>8}{'edges':>8}{'build ms':>10}{'topo ms':>10}"
+          f"{'inputs us':>11}{'exec ms':>10}{'nodes/s':>11}{'peak MB':>9}{'graph MB':>10}")
+    for shape in shapes:
+        for size in sizes:
+            case = f"{shape}/{size}"
+            r = results[case] = run_case(shape, size, args.repeat)
+            print(f"{case:<16}{r['nodes']:>8}{r['edges']:>8}{r['construct_s'] * 1e3:>10.2f}"
+                  f"{r['topological_sort_s'] * 1e3:>10.2f}{r['get_node_inputs_us']:>11.3f}"
+                  f"{r['execute_s'] * 1e3:>10.2f}{r['execute_nodes_per_s']:>11.0f}{r['peak_memory_mb']:>9.2f}"
+                  f"{r['graph_memory_mb']:>10.2f}")
+    
+    document = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(document, f, indent=2)
+            print(f"\nWrote results to {path}")
+    
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
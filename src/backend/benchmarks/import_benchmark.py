@@ -0,0 +1,126 @@
+"""Startup-time benchmark: import cost of the backend modules.
+
+Each module is imported in a fresh interpreter with -X importtime, so the
+numbers are cold-start costs including everything the module pulls in.
+
+Usage:
+    python src/backend/benchmarks/import_benchmark.py
+    python src/backend/benchmarks/import_benchmark.py --modules backend.LLMcontrols.llm --top 15
+    python src/backend/benchmarks/import_benchmark.py --output imports.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import platform
+import subprocess
+from typing import Dict, List, Any, Optional
+
+# Project root (same layout as run_server.py), put on the path of each measured interpreter
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, "..", ".."))
+
+DEFAULT_MODULES = [
+    "backend.LLMcontrols.metrics",
+    "backend.LLMcontrols.graph",
+    "backend.LLMcontrols.storage",
+    "backend.LLMcontrols.jobs",
+    "backend.LLMcontrols.components",
+    "backend.LLMcontrols.llm",
+    "backend.LLMcontrols.api.router",
+    "backend.LLMcontrols.main",
+]
+
+
+def measure(module: str) -> Dict[str, Any]:
+    """Import a module in a fresh interpreter and parse its -X importtime report.
+    
+    Returns:
+        The module's cumulative import time, and the cumulative time of every
+        module it imported (keyed by module name), in microseconds.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [project_root, os.getenv("PYTHONPATH")])))
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env
+    )
+    
+    imported: Dict[str, int] = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            imported[name.strip()] = int(cumulative)
+        except ValueError:
+            # The header line
+            continue
+    
+    result = {"module": module, "cumulative_us": imported.get(module), "imported": imported}
+    if process.returncode != 0:
+        result["error"] = process.stderr.strip().splitlines()[-1]
+    return result
+
+
+def heaviest(imported: Dict[str, int], top: int) -> List[Dict[str, Any]]:
+    """The top-level packages with the highest cumulative import time."""
+    packages = {name: us for name, us in imported.items() if "." not in name}
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"package": name, "cumulative_us": us} for name, us in ranked]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure the import cost of the LLMcontrols backend.")
+    parser.add_argument("--modules", default=",".join(DEFAULT_MODULES),
+                        help="Comma-separated modules to import (default: the backend packages)")
+    parser.add_argument("--repeat", type=int, default=3, help="Imports per module; the fastest is kept")
+    parser.add_argument("--top", type=int, default=10,
+                        help="Heaviest top-level packages to list for the last module (default: %(default)s)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+    
+    modules = [module for module in args.modules.split(",") if module]
+    results: Dict[str, Dict[str, Any]] = {}
+    
+    print(f"{'module':<40}{'import ms':>12}")
+    for module in modules:
+        best: Optional[Dict[str, Any]] = None
+        for _ in range(max(1, args.repeat)):
+            run = measure(module)
+            if best is None or (run["cumulative_us"] or 0) < (best["cumulative_us"] or 0):
+                best = run
+        results[module] = best
+        if "error" in best:
+            print(f"{module:<40}{'failed':>12}  {best['error']}")
+        else:
+            print(f"{module:<40}{best['cumulative_us'] / 1e3:>12.1f}")
+    
+    last = results[modules[-1]] if modules else None
+    if last is not None and args.top > 0:
+        print(f"\nHeaviest packages imported by {last['module']}:")
+        for entry in heaviest(last["imported"], args.top):
+            print(f"  {entry['package']:<38}{entry['cumulative_us'] / 1e3:>12.1f}")
+    
+    if args.output:
+        document = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": {
+                module: {
+                    "cumulative_us": result["cumulative_us"],
+                    "heaviest": heaviest(result["imported"], args.top),
+                    **({"error": result["error"]} if "error" in result else {}),
+                }
+                for module, result in results.items()
+            },
+        }
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+        print(f"\nWrote results to {args.output}")
+    
+    return 1 if any("error" in result for result in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
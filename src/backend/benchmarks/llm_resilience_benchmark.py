@@ -0,0 +1,109 @@
+"""Benchmark of hedged LLM requests against a fake provider with a slow tail.
+
+Requests go through OpenAILLM and LLMResilience as in the server, but are
+answered by FakeChatModel: most take --fast seconds and a --slow-rate
+fraction take --slow seconds. The first --warmup requests fill the latency
+window that hedging needs and are left out of the results.
+
+Usage:
+    python src/backend/benchmarks/llm_resilience_benchmark.py
+    python src/backend/benchmarks/llm_resilience_benchmark.py --percentiles 0,90,95 --requests 1000
+    python src/backend/benchmarks/llm_resilience_benchmark.py --output hedging.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+import platform
+from typing import Dict, List, Any
+
+# Add the project root to the Python path (same layout as run_server.py)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, "..", ".."))
+sys.path.insert(0, project_root)
+
+from backend.LLMcontrols.llm import OpenAILLM, LLMResilience, FakeChatModel
+
+
+def percentile(ordered: List[float], percent: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    rank = math.ceil(percent / 100 * len(ordered)) - 1
+    return ordered[min(len(ordered) - 1, max(0, rank))]
+
+
+async def run_case(hedge_percentile: float, args: argparse.Namespace) -> Dict[str, Any]:
+    """Send the requests one after another with hedging at a percentile (0 for none)."""
+    fake = FakeChatModel(
+        latency=lambda rng: args.slow if rng.random() < args.slow_rate else args.fast,
+        seed=args.seed
+    )
+    resilience = LLMResilience(timeout=args.slow * 10, hedge_percentile=hedge_percentile)
+    llm = OpenAILLM(model_name="fake", api_key="benchmark", chat_model=fake, resilience=resilience)
+    
+    latencies = []
+    for i in range(args.warmup + args.requests):
+        started = time.perf_counter()
+        response = await llm.generate(f"request {i}")
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        if i >= args.warmup:
+            latencies.append(time.perf_counter() - started)
+    
+    ordered = sorted(latencies)
+    model = resilience.stats()["models"]["fake"]
+    return {
+        "hedge_percentile": hedge_percentile,
+        "p50_ms": percentile(ordered, 50) * 1e3,
+        "p95_ms": percentile(ordered, 95) * 1e3,
+        "p99_ms": percentile(ordered, 99) * 1e3,
+        # Requests that waited for a slow response, i.e. were not rescued by a hedge
+        "slow_calls": sum(latency >= (args.fast + args.slow) / 2 for latency in latencies),
+        "extra_requests": fake.calls / (args.warmup + args.requests) - 1,
+        "hedge_win_rate": model["hedge_win_rate"],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark hedged LLM requests against a fake provider.")
+    parser.add_argument("--percentiles", default="0,90",
+                        help="Comma-separated hedging percentiles to compare; 0 disables hedging (default: %(default)s)")
+    parser.add_argument("--requests", type=int, default=180, help="Measured requests per case")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests sent first")
+    parser.add_argument("--fast", type=float, default=0.01, help="Latency of most responses in seconds")
+    parser.add_argument("--slow", type=float, default=0.3, help="Latency of the slow tail in seconds")
+    parser.add_argument("--slow-rate", type=float, default=0.1, help="Fraction of slow responses")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the fake provider")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+    
+    percentiles = [float(value) for value in args.percentiles.split(",") if value]
+    results = [asyncio.run(run_case(value, args)) for value in percentiles]
+    
+    print(f"{'hedging':<10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'slow calls':>12}{'extra reqs':>12}{'hedge wins':>12}")
+    for result in results:
+        label = f"p{result['hedge_percentile']:g}" if result["hedge_percentile"] else "off"
+        print(
+            f"{label:<10}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+            f"{result['slow_calls']:>12}{result['extra_requests']:>12.1%}{result['hedge_win_rate']:>12.1%}"
+        )
+    
+    if args.output:
+        document = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {key: value for key, value in vars(args).items() if key != "output"},
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+        print(f"\nWrote results to {args.output}")
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
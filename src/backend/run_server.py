@@ -2,6 +2,7 @@
 
 import os
 import sys
+import argparse
 import uvicorn
 
 # Get the directory of this script
@@ -11,14 +12,34 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.abspath(os.path.join(script_dir, '..'))
 sys.path.insert(0, project_root)
 
-# Import the app
-from backend.LLMcontrols.main import app
-
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the LLMcontrols API")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("BACKEND_WORKERS", "1")),
+        help="Number of server processes (default: BACKEND_WORKERS or 1)"
+    )
+    args = parser.parse_args()
+    
     # Get host and port from environment variables or use defaults
     host = os.getenv("BACKEND_HOST", "0.0.0.0")
     port = int(os.getenv("BACKEND_PORT", "8000"))
+    workers = max(1, args.workers)
+    
+    if workers > 1 and os.getenv("FLOW_DB_PATH") == ":memory:":
+        sys.exit("FLOW_DB_PATH=:memory: keeps flows in one process; use a database file with --workers")
+    
+    # Read by the app to share stores and split LLM quotas between the workers
+    os.environ["LLMCONTROLS_WORKERS"] = str(workers)
+    # Worker processes import the app themselves and need the same import path
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [project_root, os.getenv("PYTHONPATH")]))
     
-    print(f"Starting LLMcontrols API on {host}:{port}")
+    print(f"Starting LLMcontrols API on {host}:{port} with {workers} worker(s)")
     print(f"API docs available at: http://{host if host != '0.0.0.0' else 'localhost'}:{port}/docs")
-    uvicorn.run(app, host=host, port=port) 
\ No newline at end of file
+    if workers > 1:
+        # uvicorn needs an import string to start the app in each worker
+        uvicorn.run("backend.LLMcontrols.main:app", host=host, port=port, workers=workers)
+    else:
+        from backend.LLMcontrols.main import app
+        uvicorn.run(app, host=host, port=port)
\ No newline at end of file